@@ -0,0 +1,80 @@
+"""
+Handled requests per second of crawlee's request queue in the "disk" and "memory" storage modes
+(see utils/crawlee_storage.py), with a no-op request handler so the queue is all that is measured.
+
+Run from the repository root:
+    python -m benchmarks.crawlee_storage
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+BENCH_REQUESTS = int(os.getenv("BENCH_REQUESTS", 5000))
+BENCH_CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", 10))
+
+
+async def measure(mode):
+    from crawlee import ConcurrencySettings
+    from crawlee.crawlers import BasicCrawler
+    from utils.crawlee_storage import create_storage_client
+
+    crawler = BasicCrawler(
+        storage_client=create_storage_client(mode),
+        concurrency_settings=ConcurrencySettings(
+            min_concurrency=BENCH_CONCURRENCY, desired_concurrency=BENCH_CONCURRENCY, max_concurrency=BENCH_CONCURRENCY
+        ),
+        configure_logging=False,
+    )
+
+    @crawler.router.default_handler
+    async def handler(context):
+        pass
+
+    urls = [f"https://www.google.com/maps/place/Bench+{i}/data=!4m2!3m1!1s0x0:0x{i:x}" for i in range(BENCH_REQUESTS)]
+    started = time.perf_counter()
+    stats = await crawler.run(urls)
+    elapsed = time.perf_counter() - started
+    storage_files = sum(len(names) for _, _, names in os.walk('storage'))
+    return {
+        'mode': mode,
+        'handled': stats.requests_finished,
+        'seconds': round(elapsed, 2),
+        'handled_per_second': round(stats.requests_finished / elapsed, 1),
+        'files_in_storage': storage_files,
+    }
+
+
+def main():
+    if len(sys.argv) > 1:
+        # Child: one mode per process, crawlee's storage client is process-wide
+        logging.disable(logging.INFO)
+        print(json.dumps(asyncio.run(measure(sys.argv[1]))))
+        return
+    results = []
+    for mode in ('disk', 'memory'):
+        with tempfile.TemporaryDirectory(prefix='crawlee-storage-bench-') as workdir:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.crawlee_storage', mode],
+                cwd=workdir, env={**os.environ, 'PYTHONPATH': REPO_ROOT},
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    disk, memory = results
+    print(json.dumps({
+        'requests': BENCH_REQUESTS,
+        'concurrency': BENCH_CONCURRENCY,
+        'results': results,
+        'speedup': round(memory['handled_per_second'] / disk['handled_per_second'], 1),
+    }, indent=4))
+
+
+if __name__ == "__main__":
+    main()
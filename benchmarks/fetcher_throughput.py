@@ -0,0 +1,112 @@
+"""
+End-to-end throughput benchmark for fetcher.py against the local mock task spreader.
+
+Run from the repository root:
+    MOCK_TOTAL_QUERIES=200 python -m benchmarks.fetcher_throughput
+
+Reports queries/hour, push latency and memory (fetcher + Chromium) over time.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_task_spreader import start_mock_server, MOCK_TOTAL_QUERIES
+from utils.process_stats import get_rss_bytes, get_process_tree_rss
+
+BENCH_DURATION = int(os.getenv("BENCH_DURATION", 1800))  # Hard stop, in seconds
+BENCH_SAMPLE_INTERVAL = float(os.getenv("BENCH_SAMPLE_INTERVAL", 5))
+BENCH_REPORT = os.path.abspath(os.getenv("BENCH_REPORT", "bench_report.json"))
+
+
+async def sample_memory(samples, started_at):
+    while True:
+        samples.append({
+            "elapsed": round(time.perf_counter() - started_at, 1),
+            "fetcher_rss_mb": round(get_rss_bytes() / 2**20, 1),
+            "tree_rss_mb": round(get_process_tree_rss() / 2**20, 1),
+        })
+        await asyncio.sleep(BENCH_SAMPLE_INTERVAL)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run():
+    server, state = start_mock_server(port=0)
+    host, port = server.server_address
+    os.environ["TASK_SPREADER_API_URL"] = f"http://{host}:{port}"
+    os.environ.setdefault("MACHINE_ID", "benchmark")
+
+    # The fetcher keeps its cache in the working directory, keep it away from a real one
+    workdir = tempfile.mkdtemp(prefix="fetcher-bench-")
+    os.chdir(workdir)
+
+    import fetcher
+
+    push_latencies = []
+    push_results_to_db = fetcher.push_results_to_db
+
+    def timed_push_results_to_db():
+        started = time.perf_counter()
+        try:
+            return push_results_to_db()
+        finally:
+            push_latencies.append(time.perf_counter() - started)
+
+    fetcher.push_results_to_db = timed_push_results_to_db
+
+    memory_samples = []
+    started_at = time.perf_counter()
+    sampler = asyncio.create_task(sample_memory(memory_samples, started_at))
+    fetcher_task = asyncio.create_task(fetcher.main())
+
+    # The fetcher is done once every query was leased and it came back for more
+    while time.perf_counter() - started_at < BENCH_DURATION and not fetcher_task.done():
+        snapshot = state.snapshot()
+        if MOCK_TOTAL_QUERIES and snapshot["leased"] >= MOCK_TOTAL_QUERIES and snapshot["empty_leases"]:
+            break
+        await asyncio.sleep(1)
+    elapsed = time.perf_counter() - started_at
+
+    for task in (fetcher_task, sampler):
+        task.cancel()
+    await asyncio.gather(fetcher_task, sampler, return_exceptions=True)
+    server.shutdown()
+
+    snapshot = state.snapshot()
+    report = {
+        "elapsed_seconds": round(elapsed, 1),
+        "mock": snapshot,
+        "queries_per_hour": round(snapshot["result_queries"] / elapsed * 3600, 1),
+        "push_latency_seconds": {
+            "count": len(push_latencies),
+            "p50": percentile(push_latencies, 50),
+            "p95": percentile(push_latencies, 95),
+            "max": max(push_latencies) if push_latencies else None,
+            "mean": statistics.mean(push_latencies) if push_latencies else None,
+        },
+        "memory": memory_samples,
+        "peak_tree_rss_mb": max((s["tree_rss_mb"] for s in memory_samples), default=None),
+    }
+    with open(BENCH_REPORT, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Processed {snapshot['result_queries']} queries in {elapsed:.1f}s "
+          f"({report['queries_per_hour']} queries/hour)")
+    print(f"Push latency: {report['push_latency_seconds']}")
+    print(f"Peak RSS (fetcher + browser): {report['peak_tree_rss_mb']} MB")
+    print(f"Report written to {BENCH_REPORT}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
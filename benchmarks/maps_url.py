@@ -0,0 +1,80 @@
+"""
+Micro-benchmark of the Maps URL codec: decodes, place keys and canonical URLs per second,
+against the regexes it replaces, and a check that every URL variant of a place and its canonical
+URL share one place key.
+
+Run from the repository root:
+    python -m benchmarks.maps_url
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.maps_url import decode, place_key, canonical_url
+
+BENCH_URLS = int(os.getenv("BENCH_URLS", 200_000))
+BENCH_VARIANTS = int(os.getenv("BENCH_VARIANTS", 4))  # URL variants per place
+
+
+def make_url(i, variant):
+    lat, lng = 32 + (i % 1000) / 1000, -84 - (i % 777) / 1000
+    zoom = (13, 15, 17, 21)[variant % 4]
+    tracking = ('', '?entry=ttu', '?hl=en&g_ep=EgoyMDI0', '?authuser=0')[variant % 4]
+    return (
+        f"https://www.google.com/maps/place/Bench+Place+{i}/@{lat + variant / 1e4:.7f},{lng:.7f},{zoom}z"
+        f"/data=!4m7!3m6!1s0x88f5b9ef{i:08x}:0x{i * 7919:x}!8m2!3d{lat:.7f}!4d{lng:.7f}"
+        f"!16s%2Fg%2F11b{i:07d}{tracking}"
+    )
+
+
+def legacy_place_id(url):
+    match = re.search(r"!1s(0x[0-9a-fA-F]+:0x[0-9a-fA-F]+)", url)
+    if match:
+        return match.group(1).lower()
+    match = re.search(r"!16s([^!?]+)", url)
+    if match:
+        return unquote(match.group(1))
+    return url.split('?', 1)[0]
+
+
+def legacy_coordinates(url):
+    match = re.search(r"@(-?\d+\.\d+),(-?\d+\.\d+)", url) or re.search(r"!3d(-?\d+\.\d+)!4d(-?\d+\.\d+)", url)
+    return (float(match.group(1)), float(match.group(2))) if match else None
+
+
+def rate(fn, urls):
+    started = time.perf_counter()
+    for url in urls:
+        fn(url)
+    return round(len(urls) / (time.perf_counter() - started))
+
+
+def main():
+    places = BENCH_URLS // BENCH_VARIANTS
+    urls = [make_url(i, variant) for i in range(places) for variant in range(BENCH_VARIANTS)]
+    random.shuffle(urls)
+
+    keys = {place_key(url) for url in urls}
+    canonical_keys = {place_key(canonical_url(url)) for url in urls}
+    report = {
+        'urls': len(urls),
+        'places': places,
+        'distinct_keys': len(keys),
+        'canonical_keys_match': canonical_keys == keys,
+        'legacy_place_id_per_sec': rate(legacy_place_id, urls),
+        'legacy_id_and_coordinates_per_sec': rate(lambda url: (legacy_place_id(url), legacy_coordinates(url)), urls),
+        'decode_per_sec': rate(decode, urls),
+        'place_key_per_sec': rate(place_key, urls),
+        'canonical_url_per_sec': rate(canonical_url, urls),
+    }
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
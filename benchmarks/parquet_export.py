@@ -0,0 +1,103 @@
+"""
+Size and scan time of the Parquet export against the JSON the results are kept in today.
+
+Run from the repository root (requires pyarrow):
+    python -m benchmarks.parquet_export
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.parquet_export import ParquetExporter
+
+BENCH_ROWS = int(os.getenv("BENCH_ROWS", 200_000))
+INDUSTRIES = ['restaurant', 'dentist', 'plumber', 'gym', 'bakery']
+
+
+def make_record(i, industry):
+    scraped_at = datetime.now(timezone.utc) - timedelta(days=random.randrange(3))
+    return {
+        'title': f"Bench Place {i}",
+        'category': industry.title(),
+        'address': f"{i} Main St, Columbus, GA 31901",
+        'phone': f"+1706555{i % 10000:04d}",
+        'website': f"https://example.com/{i}",
+        'email': f"info@{i}.example.com",
+        'social_links': [f"https://www.facebook.com/{i}", f"https://www.instagram.com/{i}"],
+        'star_rating': round(random.uniform(1, 5), 1),
+        'review_count': random.randrange(1000),
+        'price_level': random.choice(['$', '$$', '$$$', None]),
+        'current_status': random.choice(['Open', 'Closed', 'Opens soon']),
+        'source_url': f"https://www.google.com/maps/place/Bench+Place+{i}/data=!4m7!3m6!1s0x0:0x{i:x}",
+        'scraped_at': scraped_at.isoformat(),
+        'coordinates': {'latitude': 32.4 + random.random(), 'longitude': -84.9 + random.random()},
+        'open_hours': {day: '9 AM-5 PM' for day in ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')},
+        'review_summary': {'total': random.randrange(50), 'avg_rating': round(random.uniform(1, 5), 2)},
+    }
+
+
+def main():
+    import pyarrow.dataset as ds
+    records = []
+    for i in range(BENCH_ROWS):
+        industry = random.choice(INDUSTRIES)
+        records.append((i, industry, make_record(i, industry)))
+    workdir = tempfile.mkdtemp(prefix='parquet-bench-')
+    try:
+        json_path = os.path.join(workdir, 'results.json')
+        started = time.perf_counter()
+        with open(json_path, 'w') as f:
+            json.dump([record for _, _, record in records], f, indent=4)
+        json_write = time.perf_counter() - started
+
+        export_dir = os.path.join(workdir, 'exports')
+        exporter = ParquetExporter(export_dir, batch_size=50_000)
+        started = time.perf_counter()
+        for query_id, industry, record in records:
+            exporter.add('usa', industry, query_id, record)
+        enqueue = time.perf_counter() - started
+        exporter.close()
+        parquet_write = time.perf_counter() - started
+
+        parquet_bytes = sum(
+            os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(export_dir) for name in names
+        )
+
+        # Same question on both: mean rating of the restaurants
+        started = time.perf_counter()
+        with open(json_path) as f:
+            ratings = [r['star_rating'] for r in json.load(f) if r['category'] == 'Restaurant']
+        json_scan = time.perf_counter() - started
+
+        started = time.perf_counter()
+        table = ds.dataset(export_dir, format='parquet', partitioning='hive').to_table(
+            columns=['star_rating'], filter=ds.field('industry') == 'restaurant'
+        )
+        parquet_scan = time.perf_counter() - started
+
+        report = {
+            'rows': BENCH_ROWS,
+            'json_bytes': os.path.getsize(json_path),
+            'parquet_bytes': parquet_bytes,
+            'size_ratio': round(os.path.getsize(json_path) / parquet_bytes, 1),
+            'json_write_seconds': round(json_write, 2),
+            'parquet_enqueue_seconds': round(enqueue, 2),
+            'parquet_write_seconds': round(parquet_write, 2),
+            'json_scan_seconds': round(json_scan, 3),
+            'parquet_scan_seconds': round(parquet_scan, 3),
+            'scanned_rows': {'json': len(ratings), 'parquet': table.num_rows},
+        }
+        print(json.dumps(report, indent=4))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
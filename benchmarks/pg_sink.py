@@ -0,0 +1,106 @@
+"""
+Rows/sec benchmark for the Postgres sink (COPY + staging upsert) against row-by-row inserts.
+
+Start a local Postgres container and run from the repository root:
+    docker run --rm -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres --name pg-bench postgres:16
+    PG_PASSWORD=postgres PG_DATABASE=postgres python -m benchmarks.pg_sink
+"""
+import os
+import sys
+import time
+import random
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pg_sink import PostgresSink, COLUMNS, KEY_COLUMNS, get_pool
+
+BENCH_ROWS = int(os.getenv("BENCH_ROWS", 100_000))
+BENCH_BATCH_SIZES = [int(size) for size in os.getenv("BENCH_BATCH_SIZES", "500,2000,5000,20000").split(',')]
+BENCH_UPDATE_RATIO = float(os.getenv("BENCH_UPDATE_RATIO", 0.3))  # Share of rows hitting an existing key
+BENCH_TABLE = os.getenv("BENCH_TABLE", "places_bench")
+
+
+def make_rows(count, offset=0):
+    rows = []
+    for i in range(count):
+        # Reuse some keys so the upsert path is exercised too
+        key = random.randrange(offset) if offset and random.random() < BENCH_UPDATE_RATIO else offset + i
+        rows.append({
+            'place_id': f"0x{key:x}:0x{key * 7919:x}",
+            'query_id': key % 1000,
+            'title': f"Bench Place {key}",
+            'category': 'restaurant',
+            'address': f"{key} Main St, Columbus, GA 31901",
+            'phone': f"+1706555{key % 10000:04d}",
+            'website': f"https://example.com/{key}",
+            'email': f"info@{key}.example.com",
+            'social_links': [f"https://www.facebook.com/{key}"],
+            'star_rating': round(random.uniform(1, 5), 1),
+            'review_count': random.randrange(1000),
+            'price_level': '$$',
+            'current_status': 'Open',
+            'source_url': f"https://www.google.com/maps/place/{key}",
+            'scraped_at': datetime.now(timezone.utc).isoformat(),
+        })
+    return rows
+
+
+def reset_table():
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        conn.commit()
+    finally:
+        pool.putconn(conn)
+
+
+def bench_sink(rows, batch_size):
+    reset_table()
+    sink = PostgresSink(table=BENCH_TABLE, batch_size=batch_size)
+    started = time.perf_counter()
+    sink.write(rows)
+    sink.close()
+    return len(rows) / (time.perf_counter() - started)
+
+
+def bench_row_by_row(rows):
+    reset_table()
+    PostgresSink(table=BENCH_TABLE)  # Creates the table
+    names = list(COLUMNS)
+    updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in names if name not in KEY_COLUMNS)
+    statement = (
+        f"INSERT INTO {BENCH_TABLE} ({', '.join(names)}) VALUES ({', '.join(['%s'] * len(names))}) "
+        f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET {updates}"
+    )
+    from psycopg2.extras import Json
+
+    pool = get_pool()
+    conn = pool.getconn()
+    started = time.perf_counter()
+    try:
+        with conn.cursor() as cur:
+            for row in rows:
+                cur.execute(statement, [
+                    Json(row[name]) if name == 'social_links' else row[name] for name in names
+                ])
+        conn.commit()
+    finally:
+        pool.putconn(conn)
+    return len(rows) / (time.perf_counter() - started)
+
+
+def main():
+    rows = make_rows(BENCH_ROWS // 2) + make_rows(BENCH_ROWS - BENCH_ROWS // 2, offset=BENCH_ROWS // 2)
+    print(f"Benchmarking {len(rows)} rows ({BENCH_UPDATE_RATIO:.0%} of the second half are updates)")
+    baseline_rows = rows[:min(len(rows), 20_000)]
+    print(f"row-by-row INSERT ... ON CONFLICT: {bench_row_by_row(baseline_rows):,.0f} rows/sec")
+    for batch_size in BENCH_BATCH_SIZES:
+        print(f"COPY + upsert, batch size {batch_size}: {bench_sink(rows, batch_size):,.0f} rows/sec")
+    reset_table()
+
+
+if __name__ == "__main__":
+    main()
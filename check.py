@@ -6,11 +6,8 @@ import json
 from datetime import timedelta
 
 import requests
-from crawlee import ConcurrencySettings
-from crawlee.crawlers import PlaywrightCrawler, PlaywrightCrawlingContext
 from dotenv import load_dotenv
 from utils.enums import Status
-from utils.google_maps_utils import google_map_consent_check
 
 load_dotenv('.env')
 LOCAL_STORAGE = os.getenv("LOCAL_STORAGE_MODE", "false").lower() == "true"
@@ -71,4 +68,5 @@ def check_db_schema():
         print(f"Schema validation error: {str(e)}")
         raise
 
-check_db_schema()
+if __name__ == "__main__":
+  check_db_schema()
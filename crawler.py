@@ -1,11 +1,23 @@
 import re
+import atexit
+import asyncio
 from datetime import datetime, timedelta
-from urllib.parse import urlparse
 
 from crawlee.crawlers import PlaywrightCrawler, PlaywrightCrawlingContext
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from dotenv import load_dotenv
 from utils.enums import Status
 from utils.google_maps_utils import google_map_consent_check
+from utils.adaptive_timeouts import AdaptiveTimeouts
+from utils.stats import register_stats
+from utils.postprocess import PostProcessor
+from utils.maps_url import get_coordinates, decode
+from utils.maps_rpc import RpcCapture, RpcStats
+from utils.crawlee_storage import create_storage_client
+from utils.async_profiler import AsyncProfiler
+from utils.page_tracing import PageTracer
+from utils.extraction_budget import ExtractionBudget, tier_stats
+from collections import Counter
 
 load_dotenv('.env')
 
@@ -17,36 +29,229 @@ os.environ['CRAWLEE_MAX_CONCURRENCY'] = '2'  # 👈 Controls concurrency without
 from crawlee.crawlers import PlaywrightCrawler
 from datetime import timedelta
 
-# Initialize crawler instance
+# Initialize crawler instance, CRAWLEE_STORAGE_MODE=memory keeps its queue and state off the disk
 crawler = PlaywrightCrawler(
     request_handler_timeout=timedelta(minutes=10),
     max_request_retries=2,
+    storage_client=create_storage_client(os.getenv("CRAWLEE_STORAGE_MODE", "memory").lower()),
 )
 
+# Waits in the about and reviews tabs are learned from recent latencies, 10s is the ceiling. Each
+# wait is its own stage: the reviews tab opening, its sort menu, the first review page rendered
+# and the first review page captured from the RPC responses
+timeouts = AdaptiveTimeouts(
+    {'about': 10_000, 'reviews_tab': 10_000, 'reviews_sort_menu': 10_000, 'reviews_first_page': 10_000, 'reviews_rpc': 10_000},
+    multiplier=float(os.getenv("TIMEOUT_MULTIPLIER", 3)),
+    floor=int(os.getenv("TIMEOUT_FLOOR_MS", 2_000)),
+    percentile=int(os.getenv("TIMEOUT_PERCENTILE", 95)),
+    min_samples=int(os.getenv("TIMEOUT_MIN_SAMPLES", 20)),
+)
+register_stats('timeouts', timeouts.stats)
+
+
+async def wait_for_selector(page, selector, stage):
+    """Waits for selector under the stage's learned timeout, a timeout is counted before it is raised."""
+    try:
+        with timeouts.measure(stage):
+            return await page.wait_for_selector(selector, timeout=timeouts.get(stage))
+    except PlaywrightTimeoutError:
+        timeouts.record_timeout(stage)
+        raise
+
+# Review dates are parsed in worker processes, POSTPROCESS_WORKERS=0 parses them inline
+postprocessor = PostProcessor(workers=int(os.getenv("POSTPROCESS_WORKERS", 2)))
+register_stats('postprocess', postprocessor.stats)
+
+# Place overview and reviews are decoded from the Maps RPC responses, the DOM is the fallback
+RPC_EXTRACTION_ENABLED = os.getenv("RPC_EXTRACTION_ENABLED", "true").lower() == "true"
+rpc_stats = RpcStats()
+register_stats('rpc_extraction', rpc_stats.stats)
+# request id -> RpcCapture of the page handling it
+rpc_captures = {}
+
+# Each place gets PLACE_BUDGET_SECONDS, about, photos and reviews are only extracted while it lasts
+PLACE_BUDGET_SECONDS = float(os.getenv("PLACE_BUDGET_SECONDS", 90))
+MIN_TIER_SECONDS = float(os.getenv("MIN_TIER_SECONDS", 2))
+tier_outcomes = Counter()
+register_stats('extraction_tiers', lambda: tier_stats(tier_outcomes))
+
+# Sampling profiler of the event loop, see utils/async_profiler.py, SIGUSR2 toggles it
+profiler = AsyncProfiler(
+  os.getenv("PROFILER_DIR", "profiles"),
+  interval=float(os.getenv("PROFILER_INTERVAL_MS", 20)) / 1000,
+  window=float(os.getenv("PROFILER_WINDOW", 300)),
+)
+register_stats('profiler', profiler.stats)
+
+# Playwright traces of TRACE_SAMPLE_RATE of the pages, kept for failed and slow places, see utils/page_tracing.py
+page_tracer = PageTracer(
+  os.getenv("TRACE_DIR", "traces"),
+  sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", 0)),
+  latency_threshold=float(os.getenv("TRACE_LATENCY_THRESHOLD", 30)),
+  max_bytes=int(os.getenv("TRACE_MAX_MB", 500)) * 1024 * 1024,
+)
+register_stats('page_tracing', page_tracer.stats)
+# request id -> Trace of the page handling it
+traces = {}
+
+# Scraped records are also written as Parquet, see utils/parquet_export.py. crawler.py records carry
+# the open hours, review summary and last review date the nested columns are made for
+parquet_exporter = None
+if os.getenv("PARQUET_EXPORT_ENABLED", "false").lower() == "true":
+  from utils.parquet_export import ParquetExporter
+  parquet_exporter = ParquetExporter(
+    os.getenv("PARQUET_EXPORT_DIR", "exports"),
+    batch_size=int(os.getenv("PARQUET_BATCH_SIZE", 5000)),
+    flush_interval=float(os.getenv("PARQUET_FLUSH_INTERVAL", 60)),
+  )
+  register_stats('parquet_export', parquet_exporter.stats)
+  # Whatever is still buffered is written when the process exits
+  atexit.register(parquet_exporter.close)
+
+@crawler.pre_navigation_hook
+async def install_profiler(context) -> None:
+  # The crawler's loop only exists once it runs, install is a no-op after the first page
+  profiler.install(enabled=os.getenv("PROFILER_ENABLED", "false").lower() == "true")
+
+@crawler.pre_navigation_hook
+async def capture_rpc_responses(context) -> None:
+  if RPC_EXTRACTION_ENABLED:
+    rpc_captures[context.request.id] = RpcCapture(context.page)
+
+@crawler.pre_navigation_hook
+async def start_tracing(context) -> None:
+  # Started before navigation, so a slow page load is in the trace
+  trace = await page_tracer.start(context.page, context.request.url)
+  if trace:
+    traces[context.request.id] = trace
+
 @crawler.router.default_handler
 async def request_handler(context: PlaywrightCrawlingContext) -> None:
   url = context.request.url
-  await google_map_consent_check(context)
-
-  if context.page.url.startswith('https://consent.google.com/m?continue='):
-    return
+  failed = True
   try:
-    data = await process_business(context)
-    update_local_query_status(url, Status.PROCESSED.value)
-    save_results_local(url, data)
-  except Exception as e:
-    print(f"Error processing {url}: {e}")
-    update_local_query_status(url, Status.FAILED.value)
+    await google_map_consent_check(context)
+
+    if context.page.url.startswith('https://consent.google.com/m?continue='):
+      return
+    try:
+      data = await process_business(context)
+      update_local_query_status(url, Status.PROCESSED.value)
+      save_results_local(url, data)
+      if parquet_exporter:
+        parquet_exporter.add(os.getenv("COUNTRY"), context.request.user_data.get('industry'), None, data)
+      failed = False
+    except Exception as e:
+      print(f"Error processing {url}: {e}")
+      update_local_query_status(url, Status.FAILED.value)
+  finally:
+    await finish_request(context, failed)
+
+async def finish_request(context, failed) -> None:
+  """Drops the request's RPC capture and stops its trace, keeping it if the request failed."""
+  capture = rpc_captures.pop(context.request.id, None)
+  if capture:
+    capture.close()
+  trace = traces.pop(context.request.id, None)
+  if trace:
+    trace_path = await page_tracer.finish(trace, failed=failed)
+    if trace_path:
+      print(f"Trace of {context.request.url} written to {trace_path}")
+
+# Navigation failures never reach the request handler. crawlee calls error_handler for the
+# attempts it retries and failed_request_handler for the last one, both keep the trace
+
+@crawler.error_handler
+async def finish_retried_request(context, error) -> None:
+  await finish_request(context, failed=True)
+
+@crawler.failed_request_handler
+async def finish_failed_request(context, error) -> None:
+  await finish_request(context, failed=True)
 
 
 async def process_business(context: PlaywrightCrawlingContext) -> dict:
     page = context.page
     url = context.request.url
+    budget = ExtractionBudget(PLACE_BUDGET_SECONDS, min_tier_seconds=MIN_TIER_SECONDS, outcomes=tier_outcomes)
 
     # Scroll to load all content
     await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
     await page.wait_for_timeout(2000)
 
+    # Title, rating, contact details and hours, from the place RPC response if it decodes
+    overview = None
+    capture = rpc_captures.get(context.request.id)
+    if capture:
+        overview = await capture.place(decode(url).feature_id)
+    rpc_stats.record('place', 'rpc' if overview else 'dom')
+    if not overview:
+        overview = await process_overview(page, url)
+
+    # Headline
+    headline_el = await page.query_selector("div[aria-label*='About'] div[jslog*='metadata']")
+    headline = await headline_el.inner_text() if headline_el else ""
+
+    # Booking Link
+    book_el = await page.query_selector("a.M77dve")
+    book = await book_el.get_attribute("href") if book_el else None
+
+    # Check-in Info
+    check_in_el = await page.query_selector("div[data-item-id='place-info-links:'] .Io6YTe")
+    check_in = await check_in_el.inner_text() if check_in_el else None
+    budget.done('core')
+
+    # Photos, read before the about tab replaces the overview, in one round trip
+    photos = await budget.run('photos', lambda: page.evaluate("""
+        () => Array.from(document.querySelectorAll("div[role='listitem'] img[srcset]"))
+            .map(img => img.getAttribute("src"))
+            .filter(src => src && src.includes("lh3.googleusercontent.com"))
+    """), [])
+
+    # Cover Photo
+    cover_photo = photos[0] if photos else ""
+
+    # Attributes / Services / Email / Social Links
+    about_data = await budget.run('about', lambda: process_about(page), {})
+
+    # Reviews
+    review_summary, last_review_date = {}, None
+    reviews = await budget.run('reviews', lambda: process_reviews(context))
+    if reviews and len(reviews) > 0:
+        review_summary = {
+            'total': len(reviews),
+            'avg_rating': sum(r['rating'] for r in reviews if r.get('rating')) / len([r for r in reviews if r.get('rating')]),
+            'sample': reviews[:3]
+        }
+        last_review_date = reviews[0]['date'] if reviews[0].get('date') else None
+
+    return budget.annotate({
+        'url': url,
+        'title': overview['title'],
+        'star': overview['star'],
+        'review_count': overview['review_count'],
+        'headline': headline,
+        'category': overview['category'],
+        'address': overview['address'],
+        'open_hours': overview['open_hours'],
+        'check_in': check_in,
+        'book': book,
+        'website': overview['website'],
+        'phone': overview['phone'],
+        'pluscode': overview['pluscode'],
+        'coordinates': overview['coordinates'] or get_coordinates(url),
+        'photos': photos,
+        'cover_photo': cover_photo,
+        'attributes': about_data.get('attributes', {}),
+        'services': about_data.get('services', []),
+        'email': about_data.get('email'),
+        'social_links': about_data.get('social_links', []),
+        'review_summary': review_summary,
+        'last_review_date': last_review_date,
+        'scraped_at': datetime.utcnow().isoformat(),
+    })
+
+async def process_overview(page, url):
     # Title
     title_el = await page.query_selector("h1")
     title = await title_el.inner_text() if title_el else None
@@ -68,10 +273,6 @@ async def process_business(context: PlaywrightCrawlingContext) -> dict:
             except:
                 pass
 
-    # Headline
-    headline_el = await page.query_selector("div[aria-label*='About'] div[jslog*='metadata']")
-    headline = await headline_el.inner_text() if headline_el else ""
-
     # Category
     category_el = await page.query_selector("button.DkEaL")
     category = await category_el.inner_text() if category_el else None
@@ -94,14 +295,6 @@ async def process_business(context: PlaywrightCrawlingContext) -> dict:
     pluscode_el = await page.query_selector("button[aria-label*='Plus code']")
     pluscode = await pluscode_el.inner_text() if pluscode_el else None
 
-    # Booking Link
-    book_el = await page.query_selector("a.M77dve")
-    book = await book_el.get_attribute("href") if book_el else None
-
-    # Check-in Info
-    check_in_el = await page.query_selector("div[data-item-id='place-info-links:'] .Io6YTe")
-    check_in = await check_in_el.inner_text() if check_in_el else None
-
     # Open Hours
     open_hours = {}
     open_hours_el = await page.query_selector("div[aria-label*='Open']")
@@ -115,58 +308,21 @@ async def process_business(context: PlaywrightCrawlingContext) -> dict:
                     open_hours[day.strip()] = time.strip()
 
     # Coordinates
-    coordinates = parse_coordinate_from_map_url(url)
-
-    # Photos
-    photos = []
-    photo_section = await page.query_selector_all("div[role='listitem'] img[srcset]")
-    for img in photo_section:
-        src = await img.get_attribute("src")
-        if src and "lh3.googleusercontent.com" in src:
-            photos.append(src)
-
-    # Cover Photo
-    cover_photo = photos[0] if photos else ""
-
-    # Attributes / Services / Email / Social Links
-    about_data = await process_about(page)
-
-    # Reviews
-    review_summary, last_review_date = {}, None
-    reviews = await process_reviews(context)
-    if reviews and len(reviews) > 0:
-        review_summary = {
-            'total': len(reviews),
-            'avg_rating': sum(r['rating'] for r in reviews if r.get('rating')) / len([r for r in reviews if r.get('rating')]),
-            'sample': reviews[:3]
-        }
-        last_review_date = reviews[0]['date'] if reviews[0].get('date') else None
+    coordinates = get_coordinates(url)
 
     return {
-        'url': url,
         'title': title,
         'star': star,
         'review_count': review_count,
-        'headline': headline,
         'category': category,
         'address': address,
-        'open_hours': open_hours,
-        'check_in': check_in,
-        'book': book,
         'website': website,
         'phone': phone,
         'pluscode': pluscode,
         'coordinates': coordinates,
-        'photos': photos,
-        'cover_photo': cover_photo,
-        'attributes': about_data.get('attributes', {}),
-        'services': about_data.get('services', []),
-        'email': about_data.get('email'),
-        'social_links': about_data.get('social_links', []),
-        'review_summary': review_summary,
-        'last_review_date': last_review_date,
-        'scraped_at': datetime.utcnow().isoformat(),
+        'open_hours': open_hours,
     }
+
 async def process_about(page):
     data = {
         'about': [],
@@ -180,7 +336,7 @@ async def process_about(page):
         return data
 
     await page.click("button[aria-label*='About']")
-    await page.wait_for_selector("h2", timeout=1000 * 10)
+    await wait_for_selector(page, "h2", 'about')
 
     sections = await page.query_selector_all("div.fontBodyMedium")
 
@@ -234,9 +390,25 @@ async def process_reviews(context):
   if not (await page.query_selector("button[aria-label*='Reviews']")):
     return None
   await page.click("button[aria-label*='Reviews']")
+
+  # Opening the tab requests the first review page, the following ones are fetched from its token
+  capture = rpc_captures.get(context.request.id)
+  if capture:
+    reviews = None
+    try:
+      with timeouts.measure('reviews_rpc'):
+        await asyncio.wait_for(asyncio.shield(capture.first_reviews), timeouts.get('reviews_rpc') / 1000)
+    except asyncio.TimeoutError:
+      timeouts.record_timeout('reviews_rpc')
+    else:
+      # The first page is in, paging isn't bound by the wait
+      reviews = await capture.reviews(timeouts.get('reviews_rpc') / 1000, stop=reaches_a_year_ago)
+    rpc_stats.record('reviews', 'rpc' if reviews is not None else 'dom')
+    if reviews is not None:
+      return await postprocessor.process('reviews', reviews)
   
-  # Wait for either button to appear (with a 10-second timeout)
-  await page.wait_for_selector("button[aria-label*='relevant'], button[aria-label*='Sort']", timeout=1000 * 10)
+  # Wait for either button to appear
+  await wait_for_selector(page, "button[aria-label*='relevant'], button[aria-label*='Sort']", 'reviews_tab')
   
   # Check if the 'relevant' button exists and click it, otherwise click 'Sort' button
   relevant_button = await page.query_selector("button[aria-label*='relevant']")
@@ -246,8 +418,8 @@ async def process_reviews(context):
   elif sort_button:
     await sort_button.click()
   
-  # Wait for the selector to appear with a 10-second timeout
-  await page.wait_for_selector("div[id='action-menu'] div[data-index='1']", timeout=1000 * 10)
+  # Wait for the sort menu to appear
+  await wait_for_selector(page, "div[id='action-menu'] div[data-index='1']", 'reviews_sort_menu')
 
   # Check if the element exists, if not return None
   menu_item = await page.query_selector("div[id='action-menu'] div[data-index='1']")
@@ -258,7 +430,7 @@ async def process_reviews(context):
   await menu_item.click()
 
   # Wait for the next selector to appear
-  await page.wait_for_selector("div.d4r55", timeout=1000 * 10)
+  await wait_for_selector(page, "div.d4r55", 'reviews_first_page')
   await scroll_page(context, '.DxyBCb')
 
   reviews = await page.evaluate("""
@@ -296,12 +468,11 @@ async def process_reviews(context):
     });
   """)
   
-  for review in reviews:
-    if review.get("date"):
-      seconds_ago = parse_text_duration(review["date"])
-      review["date"] = (datetime.now() - timedelta(seconds=seconds_ago)).isoformat()
+  return await postprocessor.process('reviews', reviews)
 
-  return reviews
+def reaches_a_year_ago(reviews):
+  date = reviews[-1].get('date') if reviews else None
+  return bool(date and ("year ago" in date or "years ago" in date))
 
 async def scroll_page(context, scroll_container, limit=30):
   count = 0
@@ -345,38 +516,3 @@ async def scroll_page(context, scroll_container, limit=30):
       # Check the date condition
       if date and ("year ago" in date or "years ago" in date):
         break
-
-def parse_coordinate_from_map_url(url):
-  try:
-    url_obj = urlparse(url)
-    coordinate_match = re.search(r'!3d(-?\d+\.\d+)!4d(-?\d+\.\d+)', url_obj.path)
-    
-    if coordinate_match:
-      latitude = float(coordinate_match.group(1))
-      longitude = float(coordinate_match.group(2))
-      return {'latitude': latitude, 'longitude': longitude}
-    
-    return None
-  
-  except Exception as e:
-    print(f"Error parsing URL: {e}")
-    return None
-
-def parse_text_duration(duration_text):
-  """
-  Parses a duration string like "2 days ago", "3 weeks ago", etc., into a duration in seconds.
-  """
-  match = re.match(r"(\d+)\s*(second|minute|hour|day|week|month|year)s?\s*ago", duration_text.lower())
-  if not match:
-    return 0
-  value, unit = int(match.group(1)), match.group(2)
-  multiplier = {
-    "second": 1,
-    "minute": 60,
-    "hour": 3600,
-    "day": 86400,
-    "week": 604800,
-    "month": 2592000,  # Approximate, assumes 30 days per month
-    "year": 31536000,  # Approximate, assumes 365 days per year
-  }
-  return value * multiplier.get(unit, 0)
\ No newline at end of file
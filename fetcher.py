@@ -1,17 +1,45 @@
+import time
+PROCESS_STARTED = time.monotonic()  # Before the heavy imports, startup stats count from here
 import os
 import asyncio
-import time
 import json
 from datetime import timedelta, datetime, timezone
 import requests
-import re
-from decimal import Decimal
+from urllib.parse import urlparse
+from crawlee import Request
+from crawlee.browsers import BrowserPool
 from crawlee.crawlers import PlaywrightCrawler, PlaywrightCrawlingContext
+from crawlee.proxy_configuration import ProxyConfiguration
+from crawlee.sessions import SessionPool
 from dotenv import load_dotenv
-from utils.enums import Status
+from utils.enums import Status, PageVerdict, FailureReason
 from utils.google_maps_utils import google_map_consent_check
+from utils.maps_url import place_key
+from utils.result_reporter import StreamingReporter
+from utils.result_spool import ResultSpool
+from utils.browser_guard import BrowserRecycleGuard
+from utils.stats import register_stats, export_stats_periodically
+from utils.page_classifier import wait_for_place_or_block, BLOCK_VERDICTS
+from utils.host_throttle import HostThrottle
+from utils.retry_scheduler import RetryScheduler, classify_exception
+from utils.adaptive_timeouts import AdaptiveTimeouts
+from utils.postprocess import PostProcessor
+from utils.content_hash import ContentHashIndex
+from utils.spatial_index import SpatialIndex
+from utils.query_scheduler import YieldScheduler
+from utils.seen_filter import SeenPlaceFilter
+from utils.loop_watchdog import LoopLagMonitor, PageWatchdog
+from utils.asset_cache import AssetCache, is_static_url
+from utils.page_pool import PagePool
+from utils.warm_tabs import WarmTabPool
+from utils.pooled_crawler import PooledPageCrawler
+from utils.crawlee_storage import create_storage_client, BatchRequestQueue, StorageSnapshotter
+from utils.async_profiler import AsyncProfiler
+from utils.page_tracing import PageTracer
 import tempfile
 import shutil
+import socket
+import random
 
 load_dotenv('.env')
 
@@ -19,43 +47,313 @@ LOCAL_STORAGE = os.getenv("LOCAL_STORAGE_MODE", "false").lower() == "true"
 COUNTRY = os.getenv("COUNTRY", "usa_blockdata")
 MACHINE_ID = os.getenv("MACHINE_ID", None)
 TASK_SPREADER_API_URL = os.getenv("TASK_SPREADER_API_URL")
+# "batch" pushes all results once the batch is done, "stream" reports each query as it completes
+RESULTS_REPORTING_MODE = os.getenv("RESULTS_REPORTING_MODE", "batch").lower()
+REPORT_BATCH_SIZE = int(os.getenv("REPORT_BATCH_SIZE", 20))
+REPORT_FLUSH_INTERVAL = float(os.getenv("REPORT_FLUSH_INTERVAL", 5))
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", 60))
+# Write results straight into Postgres (see utils/pg_sink.py), the spreader then only gets statuses
+PG_SINK_ENABLED = os.getenv("PG_SINK_ENABLED", "false").lower() == "true"
+# Scraped records are spilled to disk until pushed, only ids and statuses stay in memory
+RESULT_SPOOL_ENABLED = os.getenv("RESULT_SPOOL_ENABLED", "true").lower() == "true"
+RESULT_SPOOL_PATH = os.getenv("RESULT_SPOOL_PATH", "results_spool.jsonl")
+PUSH_CHUNK_SIZE = int(os.getenv("PUSH_CHUNK_SIZE", 1000))
+# Only new and changed records are pushed, compared against the content hashes of earlier pushes
+DELTA_PUSH_ENABLED = os.getenv("DELTA_PUSH_ENABLED", "false").lower() == "true"
+CONTENT_HASH_INDEX_PATH = os.getenv("CONTENT_HASH_INDEX_PATH", "content_hashes.sqlite")
+# Places scraped under different URLs are merged when they are this close and look the same
+SPATIAL_DEDUP_ENABLED = os.getenv("SPATIAL_DEDUP_ENABLED", "false").lower() == "true"
+SPATIAL_INDEX_PATH = os.getenv("SPATIAL_INDEX_PATH", "places_index.sqlite")
+DEDUP_RADIUS_M = float(os.getenv("DEDUP_RADIUS_M", 50))
+DEDUP_TITLE_SIMILARITY = float(os.getenv("DEDUP_TITLE_SIMILARITY", 0.85))
+# Browsers are recycled after this many pages or once Chromium's RSS passes the limit
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", 200))
+BROWSER_MAX_RSS_MB = int(os.getenv("BROWSER_MAX_RSS_MB", 2048))
+BROWSER_GUARD_INTERVAL = float(os.getenv("BROWSER_GUARD_INTERVAL", 30))
+# Sessions (cookies, fingerprint, proxy) are retired when Google walls them off
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", 20))
+SESSION_MAX_USAGE = int(os.getenv("SESSION_MAX_USAGE", 50))
+SESSION_MAX_ERROR_SCORE = float(os.getenv("SESSION_MAX_ERROR_SCORE", 3))
+SESSION_ISOLATION = os.getenv("SESSION_ISOLATION", "false").lower() == "true"
+BROWSER_FINGERPRINTS = os.getenv("BROWSER_FINGERPRINTS", "false").lower() == "true"
+# One crawler runs for the whole process and batches are added to it, so the browser stays up between batches
+CRAWLER_KEEP_ALIVE = os.getenv("CRAWLER_KEEP_ALIVE", "true").lower() == "true"
+# "memory" keeps crawlee's request queue and state off the disk, queries are durable in the spreader and the cache
+CRAWLEE_STORAGE_MODE = os.getenv("CRAWLEE_STORAGE_MODE", "memory").lower()
+CRAWLEE_SNAPSHOT_INTERVAL = float(os.getenv("CRAWLEE_SNAPSHOT_INTERVAL", 0))
+CRAWLEE_SNAPSHOT_DIR = os.getenv("CRAWLEE_SNAPSHOT_DIR", "storage_snapshots")
+# Browsers that opened no page for this long are closed, kept high so pooled pages don't strand their browser
+BROWSER_IDLE_TIMEOUT = float(os.getenv("BROWSER_IDLE_TIMEOUT", 300))
+LOCAL_PROXY_URL = os.getenv("LOCAL_PROXY_URL")
+BLOCK_BACKOFF_BASE = float(os.getenv("BLOCK_BACKOFF_BASE", 5))
+BLOCK_BACKOFF_MAX = float(os.getenv("BLOCK_BACKOFF_MAX", 600))
+# Failed queries are retried later with exponential backoff, each failure reason has its own budget
+RETRY_BUDGETS = {
+    FailureReason.TIMEOUT: int(os.getenv("RETRY_BUDGET_TIMEOUT", 2)),
+    FailureReason.BLOCK: int(os.getenv("RETRY_BUDGET_BLOCK", 3)),
+    FailureReason.PARSE: int(os.getenv("RETRY_BUDGET_PARSE", 1)),
+    FailureReason.NAVIGATION: int(os.getenv("RETRY_BUDGET_NAVIGATION", 2)),
+}
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 30))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 900))
+# Timeouts are learned from recent latencies per stage, the fixed values below are the ceilings
+TIMEOUT_MULTIPLIER = float(os.getenv("TIMEOUT_MULTIPLIER", 3))
+TIMEOUT_FLOOR_MS = int(os.getenv("TIMEOUT_FLOOR_MS", 5_000))
+TIMEOUT_PERCENTILE = int(os.getenv("TIMEOUT_PERCENTILE", 95))
+TIMEOUT_MIN_SAMPLES = int(os.getenv("TIMEOUT_MIN_SAMPLES", 20))
+# CPU-bound post-processing (regexes, phone and coordinate parsing) runs in worker processes, 0 runs it inline
+POSTPROCESS_WORKERS = int(os.getenv("POSTPROCESS_WORKERS", 2))
+POSTPROCESS_QUEUE_SIZE = int(os.getenv("POSTPROCESS_QUEUE_SIZE", 200))
+POSTPROCESS_BATCH_SIZE = int(os.getenv("POSTPROCESS_BATCH_SIZE", 16))
+# Places scraped recently by any node of the fleet are skipped, nodes share Bloom filter snapshots
+SEEN_FILTER_ENABLED = os.getenv("SEEN_FILTER_ENABLED", "false").lower() == "true"
+SEEN_FILTER_DIR = os.getenv("SEEN_FILTER_DIR", "seen_filter")
+SEEN_FILTER_SHARED_DIR = os.getenv("SEEN_FILTER_SHARED_DIR")
+SEEN_FILTER_CAPACITY = int(os.getenv("SEEN_FILTER_CAPACITY", 10_000_000))
+SEEN_FILTER_ERROR_RATE = float(os.getenv("SEEN_FILTER_ERROR_RATE", 0.01))
+SEEN_FILTER_WINDOW_HOURS = float(os.getenv("SEEN_FILTER_WINDOW_HOURS", 24))
+# Scraped records are also written as Parquet, partitioned by country, industry and scrape date
+PARQUET_EXPORT_ENABLED = os.getenv("PARQUET_EXPORT_ENABLED", "false").lower() == "true"
+PARQUET_EXPORT_DIR = os.getenv("PARQUET_EXPORT_DIR", "exports")
+PARQUET_BATCH_SIZE = int(os.getenv("PARQUET_BATCH_SIZE", 5000))
+PARQUET_FLUSH_INTERVAL = float(os.getenv("PARQUET_FLUSH_INTERVAL", 60))
+# Queries are crawled in order of expected valid results per second, learned per industry, region cell and zoom
+QUERY_SCHEDULING_ENABLED = os.getenv("QUERY_SCHEDULING_ENABLED", "false").lower() == "true"
+QUERY_YIELD_STATS_PATH = os.getenv("QUERY_YIELD_STATS_PATH", "query_yield_stats.json")
+QUERY_MIN_SHARE = float(os.getenv("QUERY_MIN_SHARE", 0.05))
+QUERY_CELL_DEGREES = float(os.getenv("QUERY_CELL_DEGREES", 0.5))
+# Maps' static JS/CSS/fonts are served to pages from a local disk cache instead of downloaded per context
+ASSET_CACHE_ENABLED = os.getenv("ASSET_CACHE_ENABLED", "false").lower() == "true"
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", "asset_cache")
+ASSET_CACHE_MAX_MB = int(os.getenv("ASSET_CACHE_MAX_MB", 512))
+# Tabs keep the Maps app loaded and open places with in-app navigation, recycled after WARM_TAB_MAX_PLACES
+WARM_TABS_ENABLED = os.getenv("WARM_TABS_ENABLED", "false").lower() == "true"
+WARM_TAB_MAX_PLACES = int(os.getenv("WARM_TAB_MAX_PLACES", 50))
+# Pages (with their context, cookies and routes) are set up once and reused for PAGE_POOL_MAX_USES requests
+PAGE_POOL_ENABLED = os.getenv("PAGE_POOL_ENABLED", "false").lower() == "true"
+PAGE_POOL_MAX_USES = int(os.getenv("PAGE_POOL_MAX_USES", 50))
+# Viewport of pooled pages as WIDTHxHEIGHT, the fingerprint's when empty
+PAGE_VIEWPORT = os.getenv("PAGE_VIEWPORT", "")
+# Sampling profiler of the event loop, on from the start on PROFILER_SAMPLE_RATE of the nodes, SIGUSR2 toggles it
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", 1))
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", 20))
+PROFILER_WINDOW = float(os.getenv("PROFILER_WINDOW", 300))
+PROFILER_DIR = os.getenv("PROFILER_DIR", "profiles")
+# Playwright traces of TRACE_SAMPLE_RATE of the pages, kept when the request failed or took TRACE_LATENCY_THRESHOLD seconds
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0))
+TRACE_LATENCY_THRESHOLD = float(os.getenv("TRACE_LATENCY_THRESHOLD", 30))
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+TRACE_MAX_MB = int(os.getenv("TRACE_MAX_MB", 500))
+# Event loop stalls are reported with the call site that blocked the loop
+LOOP_LAG_THRESHOLD_MS = int(os.getenv("LOOP_LAG_THRESHOLD_MS", 250))
+# Pages stuck in a stage longer than its deadline are closed: the learned timeout plus the grace for
+# navigation, place panel and extraction, the fixed deadline for the other stages
+PAGE_STAGE_DEADLINE = float(os.getenv("PAGE_STAGE_DEADLINE", 120))
+PAGE_STAGE_GRACE = float(os.getenv("PAGE_STAGE_GRACE", 30))
+STATS_PATH = os.getenv("STATS_PATH", "fetcher_stats.json")
+STATS_INTERVAL = float(os.getenv("STATS_INTERVAL", 30))
 
 if not TASK_SPREADER_API_URL:
     raise Exception("TASK_SPREADER_API_URL is not set")
 
 queries = {"country": COUNTRY, "machine_id": MACHINE_ID, "queries": []}
+query_index = None
+reporter = None
+pg_sink = None
+result_spool = ResultSpool(RESULT_SPOOL_PATH) if RESULT_SPOOL_ENABLED else None
+content_index = ContentHashIndex(CONTENT_HASH_INDEX_PATH) if DELTA_PUSH_ENABLED else None
+spatial_index = SpatialIndex(
+    SPATIAL_INDEX_PATH, radius_m=DEDUP_RADIUS_M, title_similarity=DEDUP_TITLE_SIMILARITY
+) if SPATIAL_DEDUP_ENABLED else None
 
 # Set concurrency limits
 MAX_CONCURRENCY = 2
 semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
 
-# Email & Social Patterns
-EMAIL_PATTERN = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-OBFUSCATED_EMAIL_PATTERN = r"([a-zA-Z0-9._%+-]+)\s*$$at$$\s*([a-zA-Z0-9.-]+)\s*$$dot$$\s*([a-zA-Z]{2,})"
-SOCIAL_DOMAINS = {
-    'twitter.com', 'x.com', 'facebook.com', 'linkedin.com',
-    'instagram.com', 'youtube.com', 'tiktok.com'
-}
-
 # Initialize crawler instance
-crawler = PlaywrightCrawler(
+if BROWSER_FINGERPRINTS:
+    from crawlee.fingerprint_suite import DefaultFingerprintGenerator
+browser_pool = BrowserPool.with_default_plugin(
+    fingerprint_generator=DefaultFingerprintGenerator() if BROWSER_FINGERPRINTS else None,
+    # One context per page, so every session keeps its own cookies and fingerprint
+    use_incognito_pages=SESSION_ISOLATION,
+    browser_inactive_threshold=timedelta(seconds=BROWSER_IDLE_TIMEOUT),
+)
+session_pool = SessionPool(
+    max_pool_size=SESSION_POOL_SIZE,
+    create_session_settings={
+        'max_usage_count': SESSION_MAX_USAGE,
+        'max_error_score': SESSION_MAX_ERROR_SCORE,
+    },
+)
+proxy_configuration = ProxyConfiguration(proxy_urls=[LOCAL_PROXY_URL]) if LOCAL_PROXY_URL else None
+storage_client = create_storage_client(CRAWLEE_STORAGE_MODE)
+asset_cache = AssetCache(ASSET_CACHE_DIR, max_bytes=ASSET_CACHE_MAX_MB * 1024 * 1024) if ASSET_CACHE_ENABLED else None
+
+async def create_pooled_page(proxy_info=None):
+    crawlee_page = await browser_pool.new_page(proxy_info=proxy_info)
+    return crawlee_page.page
+
+async def set_up_pooled_page(page):
+    if asset_cache:
+        await page.route(is_static_url, asset_cache.handle)
+    if PAGE_VIEWPORT:
+        width, height = PAGE_VIEWPORT.lower().split('x')
+        await page.set_viewport_size({'width': int(width), 'height': int(height)})
+
+async def reset_pooled_page(page):
+    # Unloads the previous place, cookies (consent included) and routes stay
+    await page.goto('about:blank')
+
+if WARM_TABS_ENABLED:
+    page_pool = WarmTabPool(
+        create_pooled_page, setup=set_up_pooled_page, usable=lambda page: not browser_guard.is_retired(page),
+        max_uses=WARM_TAB_MAX_PLACES, max_idle=MAX_CONCURRENCY * 2,
+    )
+elif PAGE_POOL_ENABLED:
+    page_pool = PagePool(
+        create_pooled_page, setup=set_up_pooled_page, reset=reset_pooled_page,
+        usable=lambda page: not browser_guard.is_retired(page),
+        max_uses=PAGE_POOL_MAX_USES, max_idle=MAX_CONCURRENCY * 2,
+    )
+else:
+    page_pool = None
+
+# The long-lived crawler's requests, crawlee's queue would hold every request it ever handled
+batch_queue = BatchRequestQueue() if CRAWLER_KEEP_ALIVE else None
+crawler_options = dict(
+    browser_pool=browser_pool,
+    session_pool=session_pool,
+    storage_client=storage_client,
+    request_manager=batch_queue,
+    proxy_configuration=proxy_configuration,
     request_handler_timeout=timedelta(minutes=10),
     max_request_retries=2,
+    keep_alive=CRAWLER_KEEP_ALIVE,
+)
+if page_pool:
+    # Requests run in pooled pages checked out per session and proxy, crawlee opens no page of its own
+    crawler = PooledPageCrawler(page_pool, session_isolation=SESSION_ISOLATION, **crawler_options)
+else:
+    crawler = PlaywrightCrawler(**crawler_options)
+crawler_task = None
+storage_snapshotter = StorageSnapshotter(
+    storage_client, CRAWLEE_SNAPSHOT_DIR, interval=CRAWLEE_SNAPSHOT_INTERVAL,
+    request_managers={'batches': batch_queue} if batch_queue else None,
+) if CRAWLEE_SNAPSHOT_INTERVAL > 0 else None
+batch_number = 0
+# Seconds since process start, see PROCESS_STARTED
+startup = {'imports_s': round(time.monotonic() - PROCESS_STARTED, 2), 'first_lease_s': None, 'browser_ready_s': None, 'first_record_s': None}
+host_throttle = HostThrottle(base_delay=BLOCK_BACKOFF_BASE, max_delay=BLOCK_BACKOFF_MAX)
+page_verdicts = {verdict.value: 0 for verdict in PageVerdict}
+timeouts = AdaptiveTimeouts(
+    {'goto': 90_000, 'place': 60_000, 'extract': 600_000},
+    multiplier=TIMEOUT_MULTIPLIER,
+    floor=TIMEOUT_FLOOR_MS,
+    percentile=TIMEOUT_PERCENTILE,
+    min_samples=TIMEOUT_MIN_SAMPLES,
+)
+postprocessor = PostProcessor(
+    workers=POSTPROCESS_WORKERS,
+    queue_size=POSTPROCESS_QUEUE_SIZE,
+    batch_size=POSTPROCESS_BATCH_SIZE,
 )
+seen_filter = SeenPlaceFilter(
+    SEEN_FILTER_DIR,
+    MACHINE_ID or socket.gethostname(),
+    capacity=SEEN_FILTER_CAPACITY,
+    error_rate=SEEN_FILTER_ERROR_RATE,
+    window_hours=SEEN_FILTER_WINDOW_HOURS,
+    shared_dir=SEEN_FILTER_SHARED_DIR,
+) if SEEN_FILTER_ENABLED else None
+skipped_seen = 0
+parquet_exporter = None
+query_scheduler = YieldScheduler(
+    QUERY_YIELD_STATS_PATH, cell_degrees=QUERY_CELL_DEGREES, min_share=QUERY_MIN_SHARE
+) if QUERY_SCHEDULING_ENABLED else None
+retried_tab_seconds = {}  # url -> tab time of the attempts of a query waiting for a retry
+retry_scheduler = RetryScheduler(RETRY_BUDGETS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY)
+carried_retries = {}  # url -> query waiting for a retry that falls due in a later batch
+browser_guard = BrowserRecycleGuard(
+    browser_pool,
+    max_pages=BROWSER_MAX_PAGES,
+    max_rss_mb=BROWSER_MAX_RSS_MB,
+    check_interval=BROWSER_GUARD_INTERVAL,
+)
+loop_monitor = LoopLagMonitor(threshold=LOOP_LAG_THRESHOLD_MS / 1000)
+profiler = AsyncProfiler(PROFILER_DIR, interval=PROFILER_INTERVAL_MS / 1000, window=PROFILER_WINDOW)
+page_tracer = PageTracer(
+    TRACE_DIR,
+    sample_rate=TRACE_SAMPLE_RATE,
+    latency_threshold=TRACE_LATENCY_THRESHOLD,
+    max_bytes=TRACE_MAX_MB * 1024 * 1024,
+) if TRACE_SAMPLE_RATE > 0 else None
+
+def get_stage_deadline(stage):
+    if stage == 'throttle':
+        return float('inf')  # Waiting out a host backoff, the page is idle but not stuck
+    if stage in timeouts.ceilings:
+        return timeouts.get(stage) / 1000 + PAGE_STAGE_GRACE
+    return PAGE_STAGE_DEADLINE
 
-def extract_emails(text):
-    """Extract both standard and obfuscated emails"""
-    matches = set(re.findall(EMAIL_PATTERN, text))
-    obfuscated_matches = [f"{m[0]}@{m[1]}.{m[2]}" for m in re.findall(OBFUSCATED_EMAIL_PATTERN, text)]
-    return list(matches.union(obfuscated_matches))
+page_watchdog = PageWatchdog(get_stage_deadline)
+register_stats('browser', browser_guard.stats)
+register_stats('startup', lambda: startup)
+if storage_snapshotter:
+    register_stats('crawlee_storage', storage_snapshotter.stats)
+register_stats('event_loop', loop_monitor.stats)
+register_stats('profiler', profiler.stats)
+if page_tracer:
+    register_stats('page_tracing', page_tracer.stats)
+if asset_cache:
+    register_stats('asset_cache', asset_cache.stats)
+if page_pool:
+    register_stats('page_pool', page_pool.stats)
+register_stats('page_watchdog', page_watchdog.stats)
+register_stats('host_throttle', host_throttle.stats)
+register_stats('retries', retry_scheduler.stats)
+register_stats('timeouts', timeouts.stats)
+register_stats('postprocess', postprocessor.stats)
+if content_index:
+    register_stats('delta_push', content_index.stats)
+if spatial_index:
+    register_stats('spatial_dedup', spatial_index.stats)
+if query_scheduler:
+    register_stats('query_yield', query_scheduler.stats)
+if seen_filter:
+    register_stats('seen_filter', lambda: {**seen_filter.stats(), 'skipped': skipped_seen})
+register_stats('sessions', lambda: {
+    'usable': session_pool.usable_session_count,
+    'retired': session_pool.retired_session_count,
+    'page_verdicts': page_verdicts,
+})
 
-async def safe_page_goto(context: PlaywrightCrawlingContext, url: str, timeout=90_000):
+async def safe_page_goto(context: PlaywrightCrawlingContext, url: str, timeout=None, navigation=None):
+    """Navigate to url, returns None on success or the FailureReason. The response status goes into `navigation`."""
     try:
-        await context.page.goto(url, timeout=timeout)
-        return True
+        with timeouts.measure('goto'):
+            response = await context.page.goto(url, timeout=timeout or timeouts.get('goto'))
+        if navigation is not None and response:
+            navigation['status'] = response.status
+        return None
     except Exception as e:
-        context.log.error(f"Navigation to {url} timed out: {e}")
-        return False
+        context.log.error(f"Navigation to {url} failed: {e}")
+        reason = classify_exception(e)
+        if reason == FailureReason.TIMEOUT:
+            timeouts.record_timeout('goto')
+            return reason
+        return FailureReason.NAVIGATION
+
+def handle_unusable_page(context: PlaywrightCrawlingContext, host, verdict):
+    context.log.warning(f"Unusable page ({verdict.value}) for {context.request.url}")
+    if verdict in BLOCK_VERDICTS:
+        # The session is walled off for good, drop it and give the host a rest
+        if context.session:
+            context.session.retire()
+        host_throttle.record_block(host)
+    elif context.session:
+        context.session.mark_bad()
 
 async def process_business(context: PlaywrightCrawlingContext):
     page = context.page
@@ -74,13 +372,13 @@ async def process_business(context: PlaywrightCrawlingContext):
         'current_status': None,
         'source_url': url,
         'scraped_at': datetime.now(timezone.utc).isoformat(),
-        'coordinates': parse_coordinate_from_map_url(url),
+        'coordinates': None,
     }
 
     try:
         # Wait for title or fallback to body
         try:
-            await page.wait_for_selector("h1", timeout=60_000)
+            await page.wait_for_selector("h1", timeout=timeouts.get('place'))
         except:
             context.log.warning("Timed out waiting for h1 - trying body")
             content = await page.content()
@@ -105,10 +403,8 @@ async def process_business(context: PlaywrightCrawlingContext):
         # Phone
         phone_el = await page.query_selector("button[aria-label*='Phone']")
         if phone_el:
-            phone = await phone_el.inner_text()
-            result['phone'] = re.sub(r"[^\d+]", "", phone)
-            if not result['phone'].startswith('+'):
-                result['phone'] = f"+1{result['phone']}"
+            # Normalized by the post-processing workers
+            result['phone_text'] = await phone_el.inner_text()
 
         # Website
         website_el = await page.query_selector("a[data-item-id='authority']")
@@ -120,23 +416,15 @@ async def process_business(context: PlaywrightCrawlingContext):
         if email_link:
             result['email'] = (await email_link.inner_text()).strip()
         else:
-            # Fallback: scan body text
+            # Fallback: the body text is scanned for emails by the post-processing workers
             try:
-                page_text = await page.inner_text("body")
-                emails = extract_emails(page_text)
-                if emails:
-                    result['email'] = emails[0]
+                result['body_text'] = await page.inner_text("body")
             except Exception as e:
-                context.log.warning(f"Regex email extraction failed: {e}")
+                context.log.warning(f"Reading body text failed: {e}")
 
-        # Social Links
-        all_links = await page.evaluate("Array.from(document.querySelectorAll('a')).map(a => a.href)")
-        result['social_links'] = [
-            link for link in all_links
-            if any(domain in link for domain in SOCIAL_DOMAINS)
-        ]
+        # Social Links, filtered by the post-processing workers
+        result['social_links'] = await page.evaluate("Array.from(document.querySelectorAll('a')).map(a => a.href)")
 
-        context.log.info(f"Scraped data: {result}")
         return result
     except Exception as e:
         context.log.error(f"Exception during scraping: {e}")
@@ -144,39 +432,47 @@ async def process_business(context: PlaywrightCrawlingContext):
     
     finally:
         #update_query_status(url, status)
-        await context.page.close()  # 👈 Add this line
+        if not (page_pool and page_pool.owns(context.page)):
+            await context.page.close()  # 👈 Add this line
 
 # === Utility Functions Below ===
 
-def parse_coordinate_from_map_url(url):
-    try:
-        # Match format 1: /search/.../@lat,lng,zoom
-        match = re.search(r"@(-?\d+\.\d+),(-?\d+\.\d+)", url)
-        if match:
-            return {
-                'latitude': float(match.group(1)),
-                'longitude': float(match.group(2))
-            }
-        
-        # Match format 2: !3dlat!4dlng
-        match = re.search(r"!3d(-?\d+\.\d+)!4d(-?\d+\.\d+)", url)
-        if match:
-            return {
-                'latitude': float(match.group(1)),
-                'longitude': float(match.group(2))
-            }
-
-        return None
-    except Exception as e:
-        print(f"Error parsing coordinates: {e}")
-        return None
 def get_queries_to_process():
     global queries
     urls = get_queries_to_process_from_cache()
     if not urls:
         urls = get_queries_to_process_from_db()
+    if urls and query_scheduler:
+        urls = order_queries(urls)
     return urls
 
+def skip_seen_queries(urls):
+    """Urls left to crawl, places another node (or this one) scraped recently are reported as processed and skipped."""
+    global skipped_seen
+    remaining = []
+    for url in urls:
+        key = place_key(url)
+        if not seen_filter.seen(key):
+            remaining.append(url)
+            continue
+        query = get_query_from_queries(url)
+        query['status'] = Status.PROCESSED.value
+        # No rows are sent for it, the place key points at the rows scraped earlier
+        query['skipped'] = {'reason': 'seen', 'place_key': key}
+        skipped_seen += 1
+        if reporter:
+            report_query(url, [])
+    if len(remaining) < len(urls):
+        cache_queries()
+        print(f"Skipped {len(urls) - len(remaining)} places scraped recently")
+    return remaining
+
+def order_queries(urls):
+    """Urls in order of expected yield, see utils/query_scheduler.py."""
+    by_url = {q['url']: q for q in queries['queries']}
+    ordered = query_scheduler.order([by_url[url] for url in urls if url in by_url])
+    return [q['url'] for q in ordered] + [url for url in urls if url not in by_url]
+
 def get_queries_to_process_from_db():
     global queries
     retries = [10, 20, 30]
@@ -184,6 +480,7 @@ def get_queries_to_process_from_db():
     for i, delay in enumerate(retries):
         try:
             response = requests.get(url, timeout=60)
+            response.raise_for_status()
             data = response.json()
             raw_queries = data['queries']
             queries['country'] = data.get('country')
@@ -199,6 +496,8 @@ def get_queries_to_process_from_db():
                 "status": Status.PENDING.value
             } for q in raw_queries]
             cache_queries()
+            if result_spool:
+                result_spool.clear()  # Leftovers of a batch that had nothing valid to push
             print(f"Received {len(data['queries'])} queries from database")
             return [q["url"] for q in queries["queries"]]
         except requests.ReadTimeout:
@@ -229,7 +528,11 @@ def get_queries_to_process_from_cache():
             except json.JSONDecodeError:
                 print("Invalid JSON in cache file, ignoring cache")
                 return None
-            pending_queries = [q for q in cached_queries['queries'] if q['status'] == Status.PENDING.value]
+            # Queries left in progress by a crashed run are processed again
+            pending_queries = [
+                q for q in cached_queries['queries']
+                if q['status'] in (Status.PENDING.value, Status.IN_PROGRESS.value)
+            ]
             if len(pending_queries) == 0:
                 print("All queries processed, pushing results...")
                 queries['queries'] = cached_queries['queries']
@@ -240,12 +543,26 @@ def get_queries_to_process_from_cache():
     except FileNotFoundError:
         return None
 
+def index_queries():
+    """Lookup tables of the leased queries by url and by place key, rebuilt when the queries change."""
+    global query_index
+    if query_index is None or query_index['source'] is not queries['queries'] or query_index['size'] != len(queries['queries']):
+        query_index = {
+            'source': queries['queries'],
+            'size': len(queries['queries']),
+            'by_url': {q['url']: q for q in queries['queries']},
+            'by_key': {place_key(q['url']): q for q in queries['queries']},
+        }
+    return query_index
+
 def get_query_from_queries(query_url):
-    global queries
-    for query in queries['queries']:
-        if query_url == query['url']:
-            return query
-    raise Exception(f"Query {query_url} not found in queries")
+    # Another variant of a place url (zoom, viewport, tracking parameters) finds it by its place key,
+    # a search url only matches another with the same viewport and query
+    index = index_queries()
+    query = index['by_url'].get(query_url) or index['by_key'].get(place_key(query_url))
+    if query is None:
+        raise Exception(f"Query {query_url} not found in queries")
+    return query
 
 def update_query_status(query_url, status):
     global queries
@@ -258,49 +575,172 @@ def update_query_status(query_url, status):
 
 def save_query_results(query_url, links):
     query = get_query_from_queries(query_url)
-    query['results'] = links
+    if spatial_index:
+        for result in links:
+            result['place_key'] = resolve_place_key(result)
+    if parquet_exporter:
+        for result in links:
+            parquet_exporter.add(
+                queries.get('country') or COUNTRY, query.get('metadata', {}).get('industry'), query.get('id'), result
+            )
+    if seen_filter:
+        seen_filter.add(place_key(query_url))
+        for result in links:
+            seen_filter.add(get_result_place_key(result))
+    if result_spool:
+        # Only the position and count stay in memory, the records live in the spool
+        query['spool_offset'] = result_spool.append(query.get('id'), links)
+        query['result_count'] = len(links)
+    else:
+        query['results'] = links
     cache_queries()
 
+def report_query(query_url, results):
+    query = get_query_from_queries(query_url)
+    rows = build_result_rows(query.get('id'), results) if query['status'] == Status.PROCESSED.value else []
+    if content_index:
+        rows = build_delta_rows(rows)
+    reporter.report(query.get('id'), query['status'], rows, skipped=query.get('skipped'))
+
+def query_status(query_id, query):
+    status = {"id": query_id, "status": query['status']}
+    if query.get('skipped'):
+        status['skipped'] = query['skipped']
+    return status
+
+def mark_queries_reported(query_ids):
+    query_ids = set(query_ids)
+    for query in queries['queries']:
+        if query.get('id') in query_ids:
+            query['reported'] = True
+    cache_queries()
+    if content_index:
+        content_index.commit(query_ids)
+
 def count_queries_results():
-    return sum(len(q['results']) for q in queries['queries'] if q.get('status') == Status.PROCESSED.value)
+    return sum(
+        q.get('result_count', len(q.get('results', [])))
+        for q in queries['queries'] if q.get('status') == Status.PROCESSED.value
+    )
 
-def push_results_to_db():
-    global queries
-    num_queries_results = count_queries_results()
-    print(f"Pushing {num_queries_results} results to database...")
+def get_result_place_key(result):
+    return result.get('place_key') or place_key(result['source_url'])
+
+def resolve_place_key(result):
+    """Key of the place a result belongs to, the key of a near-duplicate already indexed if there is one."""
+    key = place_key(result['source_url'])
+    coordinates = result.get('coordinates')
+    if not coordinates:
+        return key
+    return spatial_index.resolve(
+        key, coordinates['latitude'], coordinates['longitude'], result.get('title'), result.get('phone')
+    )
+
+def merge_duplicate_rows(rows):
+    """
+    Rows of the same place merged into one: the latest row wins, its empty fields are filled
+    from the older ones and social links are combined. Ids of merged queries go to `merged_ids`.
+    """
+    merged = {}
+    for row in rows:
+        place_key = get_result_place_key(row)
+        previous = merged.get(place_key)
+        if previous is None:
+            merged[place_key] = row
+            continue
+        combined = {field: value if value is not None else previous.get(field) for field, value in row.items()}
+        combined['social_links'] = sorted(set(previous.get('social_links', [])) | set(row.get('social_links', [])))
+        merged_ids = previous.get('merged_ids', []) + ([previous['id']] if previous['id'] != row['id'] else [])
+        if merged_ids:
+            combined['merged_ids'] = merged_ids
+        merged[place_key] = combined
+    return list(merged.values())
+
+def build_result_rows(query_id, results):
+    rows = []
+    for result in results:
+        # Validate and transform each result
+        if not (result.get('title') or result.get('address') or result.get('website')):
+            continue
+        rows.append({
+            'id': query_id,
+            'title': result.get('title'),
+            'category': result.get('category'),
+            'address': result.get('address'),
+            'phone': result.get('phone'),
+            'website': result.get('website'),
+            'email': result.get('email'),
+            'social_links': result.get('social_links', []),
+            'star_rating': float(result.get('star_rating')) if result.get('star_rating') else None,
+            'review_count': int(result.get('review_count')) if result.get('review_count') else None,
+            'price_level': result.get('price_level'),
+            'current_status': result.get('current_status'),
+            'source_url': result.get('source_url'),
+            'scraped_at': result.get('scraped_at')
+        })
+        if result.get('place_key'):
+            rows[-1]['place_key'] = result['place_key']
+    return rows
+
+def build_delta_rows(rows):
+    """
+    Rows reduced to what changed since the last push: full rows for new places, the changed
+    fields for changed ones and a "seen at" touch for the rest. The Postgres sink upserts full
+    rows, it gets new and changed rows as they are and unchanged ones are left out.
+    """
+    deltas = []
+    for row in rows:
+        delta = content_index.diff(row['id'], get_result_place_key(row), row)
+        if not PG_SINK_ENABLED:
+            deltas.append(delta)
+        elif delta['change'] != 'unchanged':
+            deltas.append(row)
+    return deltas
+
+def iter_result_rows(pending_queries):
+    """Rows of the given queries, streamed from the spool when it is enabled."""
+    if result_spool:
+        for offset, query_id, result in result_spool:
+            query = pending_queries.get(query_id)
+            # Entries left by an earlier, interrupted attempt at the same query are skipped
+            if query and offset >= query.get('spool_offset', 0):
+                yield from build_result_rows(query_id, [result])
+    else:
+        for query_id, query in pending_queries.items():
+            yield from build_result_rows(query_id, query.get('results', []))
+
+def iter_chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def get_pg_sink():
+    global pg_sink
+    if pg_sink is None:
+        from utils.pg_sink import PostgresSink
+        pg_sink = PostgresSink()
+    return pg_sink
+
+def write_results_to_pg(rows):
+    sink = get_pg_sink()
+    try:
+        sink.write([
+            {**row, 'place_id': get_result_place_key(row), 'query_id': row['id']}
+            for row in rows
+        ])
+        sink.flush()
+    except Exception:
+        sink.reset()  # The caller retries the whole set of rows
+        raise
+    print(f"Wrote {len(rows)} results to Postgres")
+
+def post_results(payload):
     url = f"{TASK_SPREADER_API_URL}/queries/results"
-    inserts = []
-    for query in queries['queries']:
-        if query['status'] == Status.PROCESSED.value:
-            for result in query.get('results', []):
-                # Validate and transform each result
-                if not (result.get('title') or result.get('address') or result.get('website')):
-                    continue
-                result_dict = {
-                    'id': query.get('id'),
-                    'title': result.get('title'),
-                    'category': result.get('category'),
-                    'address': result.get('address'),
-                    'phone': result.get('phone'),
-                    'website': result.get('website'),
-                    'email': result.get('email'),
-                    'social_links': result.get('social_links', []),
-                    'star_rating': float(result.get('star_rating')) if result.get('star_rating') else None,
-                    'review_count': int(result.get('review_count')) if result.get('review_count') else None,
-                    'price_level': result.get('price_level'),
-                    'current_status': result.get('current_status'),
-                    'source_url': result.get('source_url'),
-                    'scraped_at': result.get('scraped_at')
-                }
-                inserts.append(result_dict)
-    if not inserts:
-        print("No valid data to insert.")
-        return
-    payload = {
-        "country": COUNTRY,
-        "machine_id": MACHINE_ID,
-        "queries": inserts
-    }
     for i in range(3):  # Retry up to 3 times
         try:
             response = requests.post(
@@ -312,14 +752,58 @@ def push_results_to_db():
             if response.status_code != 200:
                 print(f"Failed to push results: {response.status_code}, {response.text}")
                 continue
-            clear_queries()
-            print("Results pushed successfully.")
             return
         except requests.ConnectionError as e:
             print(f"Connection failed: {e}. Retrying...")
             time.sleep(10 * (i + 1))
     raise Exception("Failed to push results to database after multiple attempts.")
 
+def push_results_to_db():
+    global queries
+    num_queries_results = count_queries_results()
+    print(f"Pushing {num_queries_results} results to database...")
+    # Queries already acknowledged by the streaming reporter are not sent again
+    pending_queries = {
+        q.get('id'): q for q in queries['queries']
+        if q['status'] == Status.PROCESSED.value and not q.get('reported')
+    }
+    pushed = 0
+    # Rows are sent in chunks so a large batch never has to be held in memory at once
+    if spatial_index:
+        spatial_index.flush()
+    for chunk in iter_chunks(iter_result_rows(pending_queries), PUSH_CHUNK_SIZE):
+        rows = merge_duplicate_rows(chunk) if spatial_index else chunk
+        if content_index:
+            rows = build_delta_rows(rows)
+        if PG_SINK_ENABLED:
+            if rows:
+                write_results_to_pg(rows)
+        else:
+            post_results({
+                "country": COUNTRY,
+                "machine_id": MACHINE_ID,
+                "queries": rows
+            })
+        if content_index:
+            content_index.commit({row['id'] for row in chunk})
+        pushed += len(chunk)
+    # Skipped queries have no rows, only their status says which place they were skipped for
+    skipped = {query_id: q for query_id, q in pending_queries.items() if q.get('skipped')}
+    if not pushed and not skipped:
+        print("No valid data to insert.")
+        return
+    if PG_SINK_ENABLED or skipped:
+        post_results({
+            "country": COUNTRY,
+            "machine_id": MACHINE_ID,
+            "queries": [],
+            "statuses": [
+                query_status(query_id, q) for query_id, q in (pending_queries if PG_SINK_ENABLED else skipped).items()
+            ]
+        })
+    clear_queries()
+    print("Results pushed successfully.")
+
 def cache_queries():
     global queries
     with tempfile.NamedTemporaryFile(mode='w', delete=False) as f:
@@ -331,48 +815,262 @@ def clear_queries():
     global queries
     queries['queries'] = []
     cache_queries()
+    if result_spool:
+        result_spool.clear()
+    if content_index:
+        content_index.discard()
+
+if asset_cache and not page_pool:
+    @crawler.pre_navigation_hook
+    async def install_asset_cache(context) -> None:
+        await context.page.route(is_static_url, asset_cache.handle)
 
 @crawler.router.default_handler
 async def request_handler(context: PlaywrightCrawlingContext) -> None:
     async with semaphore:
         url = context.request.url
         status = Status.FAILED.value
+        failure = None
+        results = []
         context.log.info(f'Processing URL: {url}')
+        handler_started = time.perf_counter()
+        pooled = page_pool.entry_for(context.page) if page_pool else None
+        trace = await page_tracer.start(context.page, url) if page_tracer else None
+        watched = page_watchdog.start(context.page, url)
+        browser_guard.page_served(context.page)
+        update_query_status(url, Status.IN_PROGRESS.value)
+        if reporter:
+            reporter.track(get_query_from_queries(url).get('id'))
+        host = urlparse(url).netloc
         try:
-            if not await safe_page_goto(context, url):
+            watched.stage('throttle')
+            await host_throttle.wait(host)
+            watched.stage('goto')
+            navigation = {}  # No status after an in-app navigation, only a page load has one
+            if WARM_TABS_ENABLED:
+                failure = await page_pool.open(
+                    pooled, url, timeouts.get('place'), lambda: safe_page_goto(context, url, navigation=navigation)
+                )
+            else:
+                failure = await safe_page_goto(context, url, navigation=navigation)
+            if failure:
                 return
             # Handle Google consent banner
+            watched.stage('consent')
             await google_map_consent_check(context)
             # Skip redirect pages
             if context.page.url.startswith('https://consent.google.com/m?continue='):
+                failure = FailureReason.NAVIGATION
+                return
+            # Returns as soon as either the place or a block page shows up
+            watched.stage('place')
+            place_timeout = timeouts.get('place')
+            started = time.perf_counter()
+            verdict = await wait_for_place_or_block(context.page, timeout=place_timeout, status=navigation.get('status'))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if verdict == PageVerdict.OK:
+                timeouts.record('place', elapsed_ms)
+            elif elapsed_ms >= place_timeout:
+                timeouts.record_timeout('place')
+            page_verdicts[verdict.value] += 1
+            if verdict != PageVerdict.OK:
+                handle_unusable_page(context, host, verdict)
+                failure = FailureReason.BLOCK if verdict in BLOCK_VERDICTS else FailureReason.PARSE
                 return
-            data = await process_business(context)
-            if data and validate_result(data):
+            host_throttle.record_success(host)
+            if context.session:
+                context.session.mark_good()
+            watched.stage('extract')
+            try:
+                with timeouts.measure('extract'):
+                    data = await asyncio.wait_for(process_business(context), timeouts.get('extract') / 1000)
+            except asyncio.TimeoutError:
+                timeouts.record_timeout('extract')
+                raise
+            valid = False
+            if data:
+                watched.stage('postprocess')
+                data, valid = await postprocessor.process('record', data)
+                context.log.info(f"Scraped data: {data}")
+            if valid:
                 status = Status.PROCESSED.value
-                save_query_results(url, [data])
+                results = [data]
+                save_query_results(url, results)
+                if startup['first_record_s'] is None:
+                    startup['first_record_s'] = round(time.monotonic() - PROCESS_STARTED, 2)
+                    print(f"First record scraped {startup['first_record_s']}s after start")
             else:
                 context.log.warning(f"No valid data extracted from {url}")
+                failure = FailureReason.PARSE
         except Exception as e:
             context.log.error(f"Error processing page {url}: {e}")
             status = Status.FAILED.value
+            failure = FailureReason.TIMEOUT if watched.closed_by_watchdog else classify_exception(e)
         finally:
+            page_watchdog.finish(watched)
+            if trace:
+                trace_path = await page_tracer.finish(trace, failed=status != Status.PROCESSED.value)
+                if trace_path:
+                    context.log.info(f"Trace of {url} written to {trace_path}")
+            if pooled and (status != Status.PROCESSED.value or watched.closed_by_watchdog):
+                # A page that failed a place may be left anywhere in the app, it is replaced once the crawler releases it
+                pooled.healthy = False
+            if status == Status.FAILED.value and failure and retry_scheduler.schedule(url, failure):
+                # Not failed yet, it stays leased (and heartbeated) until its retry runs
+                status = Status.PENDING.value
             update_query_status(url, status)
+            if query_scheduler:
+                tab_seconds = retried_tab_seconds.pop(url, 0) + time.perf_counter() - handler_started
+                if status == Status.PENDING.value:
+                    # Sampled once the query has its final outcome, a failure that is retried isn't a zero yield
+                    retried_tab_seconds[url] = tab_seconds
+                else:
+                    query_scheduler.record(get_query_from_queries(url).get('metadata'), len(results), tab_seconds)
+            if reporter and status != Status.PENDING.value:
+                report_query(url, results)
             await asyncio.sleep(1)  # Rate limiting
 
-def validate_result(result):
-    if not result['title'] and not result['address'] and not result['website']:
-        return False
-    return True
+def start_crawler():
+    """Starts the long-lived crawler, batches are then added with run_batch."""
+    global crawler_task
+    crawler_task = asyncio.create_task(crawler.run())
+
+async def warm_up_browser():
+    """Launches the browser (and fills the page pool) while the first lease is requested."""
+    while not browser_pool.active:
+        await asyncio.sleep(0.05)
+    try:
+        if page_pool:
+            proxy_info = await proxy_configuration.new_proxy_info(None, None, None) if proxy_configuration else None
+            pooled = await page_pool.checkout((None, proxy_info.url if proxy_info else None), proxy_info=proxy_info)
+            await page_pool.release(pooled)
+        else:
+            crawlee_page = await browser_pool.new_page()
+            await crawlee_page.page.close()
+    except Exception as e:
+        print(f"[WARNING] Browser warm-up failed: {e}")
+        return
+    startup['browser_ready_s'] = round(time.monotonic() - PROCESS_STARTED, 2)
+
+async def run_batch(requests):
+    if not CRAWLER_KEEP_ALIVE:
+        await crawler.run(requests)
+        return
+    if crawler_task is None or crawler_task.done():
+        start_crawler()
+    await batch_queue.next_batch()
+    await crawler.add_requests(requests, wait_for_all_requests_to_be_added=True)
+    request_manager = await crawler.get_request_manager()
+    while not await request_manager.is_finished():
+        if crawler_task.done():
+            raise Exception(f"Crawler stopped: {crawler_task.exception() if not crawler_task.cancelled() else 'cancelled'}")
+        await asyncio.sleep(0.5)
+
+def retry_requests(retries):
+    return [Request.from_url(url, unique_key=f"{url}#{batch_number}-retry-{attempt}") for url, attempt in retries]
+
+async def run_with_retries(urls, retries=()):
+    """
+    Runs the leased urls along with the carried retries that are due. Retries that fall due while
+    the batch runs are run right after it, later ones are carried into a following batch.
+    """
+    global batch_number
+    batch_number += 1
+    # Keys are unique per batch, a url is never deduplicated against an earlier run of it
+    await run_batch([Request.from_url(url, unique_key=f"{url}#{batch_number}") for url in urls] + retry_requests(retries))
+    while due := retry_scheduler.pop_due():
+        print(f"Retrying {len(due)} failed queries")
+        await run_batch(retry_requests(due))
+    # Only now, the carried retries of this batch were popped off the schedule and their attempts still count
+    retry_scheduler.prune()
+
+def carry_pending_retries():
+    """Takes the queries waiting for a retry out of the batch, they are neither pushed nor leased again from the cache."""
+    pending = retry_scheduler.pending_urls()
+    if not pending:
+        return
+    kept = []
+    for query in queries['queries']:
+        if query['url'] in pending and query['status'] == Status.PENDING.value:
+            carried_retries[query['url']] = query
+        else:
+            kept.append(query)
+    queries['queries'] = kept
+    cache_queries()
+
+def merge_due_retries(urls):
+    """Adds the carried queries whose retry is due to the leased ones, returns them as (url, attempt)."""
+    releases = carried_retries.keys() & set(urls or ())
+    if releases:
+        # Leased again as new queries, they start over
+        retry_scheduler.discard(releases)
+        for url in releases:
+            del carried_retries[url]
+            retried_tab_seconds.pop(url, None)
+    due = [(url, attempt) for url, attempt in retry_scheduler.pop_due() if url in carried_retries]
+    if due:
+        queries['queries'] = queries['queries'] + [carried_retries.pop(url) for url, _ in due]
+        cache_queries()
+    return due
 
 async def main():
-    global queries
+    global queries, reporter, parquet_exporter
     print("Fetcher started")
+    if PARQUET_EXPORT_ENABLED:
+        from utils.parquet_export import ParquetExporter
+        parquet_exporter = ParquetExporter(
+            PARQUET_EXPORT_DIR, batch_size=PARQUET_BATCH_SIZE, flush_interval=PARQUET_FLUSH_INTERVAL
+        )
+        register_stats('parquet_export', parquet_exporter.stats)
+    background_tasks = [
+        asyncio.create_task(browser_guard.run()),
+        asyncio.create_task(loop_monitor.run()),
+        asyncio.create_task(page_watchdog.run()),
+        asyncio.create_task(export_stats_periodically(STATS_PATH, STATS_INTERVAL)),
+    ]
+    if storage_snapshotter:
+        background_tasks.append(asyncio.create_task(storage_snapshotter.run()))
+    profiler.install(enabled=PROFILER_ENABLED and random.random() < PROFILER_SAMPLE_RATE)
+    if CRAWLER_KEEP_ALIVE:
+        start_crawler()
+        background_tasks.append(asyncio.create_task(warm_up_browser()))
     try:
         while True:
-            urls = get_queries_to_process()
-            if urls:
+            # In a thread, the lease request and its retries don't hold up the browser launch
+            urls = await asyncio.to_thread(get_queries_to_process)
+            if startup['first_lease_s'] is None:
+                startup['first_lease_s'] = round(time.monotonic() - PROCESS_STARTED, 2)
+            retries = merge_due_retries(urls)
+            if urls or retries:
                 original_queries = {q['url']: q for q in queries['queries']}
-                await crawler.run(urls)
+                if RESULTS_REPORTING_MODE == "stream":
+                    reporter = StreamingReporter(
+                        TASK_SPREADER_API_URL, COUNTRY, MACHINE_ID,
+                        batch_size=REPORT_BATCH_SIZE,
+                        flush_interval=REPORT_FLUSH_INTERVAL,
+                        heartbeat_interval=HEARTBEAT_INTERVAL,
+                        on_reported=mark_queries_reported,
+                        sink=write_results_to_pg if PG_SINK_ENABLED else None,
+                    )
+                    reporter.start()
+                    for query in carried_retries.values():
+                        # Waiting for a later batch, still leased
+                        reporter.track(query.get('id'))
+                try:
+                    if seen_filter and urls:
+                        # Multi-MB snapshots are read and written, off the event loop
+                        await asyncio.to_thread(seen_filter.sync)
+                        urls = skip_seen_queries(urls)
+                    await run_with_retries(urls or [], retries)
+                finally:
+                    if query_scheduler:
+                        query_scheduler.save()
+                    if reporter:
+                        await reporter.stop()
+                        reporter = None
+                    if page_pool and not CRAWLER_KEEP_ALIVE:
+                        # The browser closes with the run, the pooled pages with it
+                        await page_pool.close()
                 # Merge metadata back
                 for query in queries['queries']:
                     if query['url'] in original_queries:
@@ -380,7 +1078,12 @@ async def main():
                             'id': original_queries[query['url']].get('id'),
                             'metadata': original_queries[query['url']].get('metadata', {})
                         })
+                carry_pending_retries()
                 push_results_to_db()
+                if seen_filter:
+                    await asyncio.to_thread(seen_filter.sync)
+            elif carried_retries:
+                await asyncio.sleep(min(60, retry_scheduler.next_due_in()))
             else:
                 print("No more URLs to process.")
                 await asyncio.sleep(60)
@@ -395,6 +1098,18 @@ async def main():
         else:
             print(f"Unexpected error: {error_msg}")
         raise
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        if crawler_task:
+            crawler.stop()
+            crawler_task.cancel()
+        profiler.stop()
+        postprocessor.close()
+        if spatial_index:
+            spatial_index.close()
+        if parquet_exporter:
+            parquet_exporter.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,230 @@
+import os
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote_plus
+
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+# Local stand-in for the task spreader API, used for development and benchmarks
+MOCK_HOST = os.getenv("MOCK_HOST", "127.0.0.1")
+MOCK_PORT = int(os.getenv("MOCK_PORT", 8765))
+MOCK_BATCH_SIZE = int(os.getenv("MOCK_BATCH_SIZE", 20))
+MOCK_TOTAL_QUERIES = int(os.getenv("MOCK_TOTAL_QUERIES", 0))  # 0 = unlimited
+MOCK_LATENCY_MS = int(os.getenv("MOCK_LATENCY_MS", 0))
+MOCK_LATENCY_JITTER_MS = int(os.getenv("MOCK_LATENCY_JITTER_MS", 0))
+MOCK_ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", 0))
+MOCK_REPLAY_DIR = os.getenv("MOCK_REPLAY_DIR")  # Saved place pages (*.html) to serve instead of the synthetic one
+MOCK_INDUSTRIES = ['restaurant', 'accounting firm', 'dentist', 'plumber', 'hair salon']
+
+SCHEMA = {
+    "laptopfifo": {
+        "required_fields": {
+            'email': 'text', 'social_links': 'jsonb', 'star_rating': 'numeric', 'plus_code': 'text',
+            'booking_link': 'text', 'check_in_info': 'text', 'coordinates': 'jsonb'
+        }
+    }
+}
+
+SYNTHETIC_PLACE_PAGE = """<!DOCTYPE html>
+<html><head><title>{title} - Google Maps</title></head>
+<body>
+<h1>{title}</h1>
+<button class="DkEaL">{industry}</button>
+<button data-item-id="address" aria-label="Address: {number} Main St, Columbus, GA 31901">{number} Main St</button>
+<button aria-label="Phone: (706) 555-{phone}">(706) 555-{phone}</button>
+<a data-item-id="authority" href="https://example.com/{slug}">example.com</a>
+<a href="mailto:info@{slug}.example.com">info@{slug}.example.com</a>
+<a href="https://www.facebook.com/{slug}">Facebook</a>
+<a href="https://www.instagram.com/{slug}">Instagram</a>
+</body></html>
+"""
+
+
+class MockState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_query_id = 1
+        self.leased = 0
+        self.empty_leases = 0
+        self.result_posts = 0
+        self.result_rows = 0
+        self.result_bytes = 0
+        self.result_query_ids = set()
+        self.reported_statuses = 0
+        self.heartbeats = 0
+        self.errors_injected = 0
+        self.replay_pages = []
+        if MOCK_REPLAY_DIR:
+            self.replay_pages = sorted(
+                os.path.join(MOCK_REPLAY_DIR, name)
+                for name in os.listdir(MOCK_REPLAY_DIR) if name.endswith('.html')
+            )
+
+    def lease(self, base_url):
+        with self.lock:
+            size = MOCK_BATCH_SIZE
+            if MOCK_TOTAL_QUERIES:
+                size = min(size, MOCK_TOTAL_QUERIES - self.leased)
+            if size <= 0:
+                self.empty_leases += 1
+                return []
+            batch = []
+            for _ in range(size):
+                query_id = self.next_query_id
+                self.next_query_id += 1
+                batch.append(make_query(base_url, query_id))
+            self.leased += size
+            return batch
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "leased": self.leased,
+                "empty_leases": self.empty_leases,
+                "result_posts": self.result_posts,
+                "result_rows": self.result_rows,
+                "result_bytes": self.result_bytes,
+                "result_queries": len(self.result_query_ids),
+                "reported_statuses": self.reported_statuses,
+                "heartbeats": self.heartbeats,
+                "errors_injected": self.errors_injected,
+            }
+
+
+def make_query(base_url, query_id):
+    # Spread places on a small grid around Columbus, GA like the URLs in test.py
+    latitude = round(32.2742073 + (query_id % 100) * 0.001, 7)
+    longitude = round(-84.9989355 - (query_id // 100) * 0.001, 7)
+    name = quote_plus(f"Bench Place {query_id}")
+    return {
+        "id": query_id,
+        "query_url": (
+            f"{base_url}/maps/place/{name}/@{latitude},{longitude},15z"
+            f"/data=!4m7!3m6!1s0x0:0x{query_id:x}!8m2!3d{latitude}!4d{longitude}!16s%2Fg%2F{query_id}"
+        ),
+        "industry": MOCK_INDUSTRIES[query_id % len(MOCK_INDUSTRIES)],
+        "latitude": latitude,
+        "longitude": longitude,
+        "zoom_level": 15,
+    }
+
+
+def render_place_page(state, path):
+    if state.replay_pages:
+        index = sum(map(ord, path)) % len(state.replay_pages)
+        with open(state.replay_pages[index], 'r', encoding='utf-8') as f:
+            return f.read()
+    query_id = int(path.rsplit('0x', 1)[-1].split('!', 1)[0], 16) if '0x' in path else 0
+    return SYNTHETIC_PLACE_PAGE.format(
+        title=f"Bench Place {query_id}",
+        industry=MOCK_INDUSTRIES[query_id % len(MOCK_INDUSTRIES)],
+        number=100 + query_id,
+        phone=f"{query_id % 10000:04d}",
+        slug=f"bench-place-{query_id}",
+    )
+
+
+class MockTaskSpreaderHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _simulate_network(self):
+        delay = MOCK_LATENCY_MS + random.uniform(-MOCK_LATENCY_JITTER_MS, MOCK_LATENCY_JITTER_MS)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if MOCK_ERROR_RATE and random.random() < MOCK_ERROR_RATE:
+            with self.state.lock:
+                self.state.errors_injected += 1
+            self._send_json(503, {"error": "injected error"})
+            return False
+        return True
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_html(self, html):
+        data = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path.startswith('/maps/place/'):
+            # Replayed place pages are served without latency or errors, they stand in for Google
+            return self._send_html(render_place_page(self.state, self.path))
+        if parsed.path == '/stats':
+            return self._send_json(200, self.state.snapshot())
+        if not self._simulate_network():
+            return
+        if parsed.path == '/queries':
+            params = parse_qs(parsed.query)
+            base_url = f"http://{self.headers.get('Host')}"
+            return self._send_json(200, {
+                "country": params.get('country', [None])[0],
+                "queries": self.state.lease(base_url),
+            })
+        if parsed.path == '/queries/schema':
+            return self._send_json(200, SCHEMA)
+        self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if not self._simulate_network():
+            return
+        if parsed.path == '/queries/results':
+            payload = json.loads(body or b'{}')
+            rows = payload.get('queries', [])
+            # Streaming reports also acknowledge failed and empty queries through "statuses"
+            statuses = payload.get('statuses', [])
+            with self.state.lock:
+                self.state.result_posts += 1
+                self.state.result_rows += len(rows)
+                self.state.result_bytes += length
+                self.state.result_query_ids.update(row.get('id') for row in rows)
+                self.state.reported_statuses += len(statuses)
+            return self._send_json(200, {"inserted": len(rows)})
+        if parsed.path == '/queries/heartbeat':
+            payload = json.loads(body or b'{}')
+            with self.state.lock:
+                self.state.heartbeats += 1
+            return self._send_json(200, {"extended": len(payload.get('queries', []))})
+        self._send_json(404, {"error": "not found"})
+
+
+def start_mock_server(host=MOCK_HOST, port=MOCK_PORT):
+    """Start the mock task spreader in a background thread, returns (server, state)."""
+    state = MockState()
+    handler = type('BoundMockTaskSpreaderHandler', (MockTaskSpreaderHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, state
+
+
+if __name__ == "__main__":
+    server, state = start_mock_server()
+    host, port = server.server_address
+    print(f"Mock task spreader listening on http://{host}:{port}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"Mock stats: {state.snapshot()}")
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# fetcher.py refuses to load without a task spreader, tests never call it
+os.environ.setdefault("TASK_SPREADER_API_URL", "http://task-spreader.invalid")
@@ -0,0 +1,36 @@
+from crawlee.browsers import BrowserPool
+
+from utils.browser_guard import BrowserRecycleGuard
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.pages = [object()]
+
+
+def test_retired_browser_moves_to_crawlees_inactive_list():
+    # Fails once crawlee renames the private lists the guard moves browsers between
+    browser_pool = BrowserPool.with_default_plugin()
+    browser = FakeBrowser()
+    browser_pool._active_browsers.append(browser)
+    guard = BrowserRecycleGuard(browser_pool, max_pages=2)
+
+    guard.page_served(browser.pages[0])
+    assert list(browser_pool.active_browsers) == [browser]
+    guard.page_served(browser.pages[0])
+    assert list(browser_pool.active_browsers) == []
+    assert list(browser_pool.inactive_browsers) == [browser]
+    assert guard.is_retired(browser.pages[0])
+    assert guard.recycle_counts['pages'] == 1
+
+
+def test_refuses_a_pool_without_the_lists():
+    class OtherPool:
+        active_browsers = inactive_browsers = ()
+
+    try:
+        BrowserRecycleGuard(OtherPool())
+    except Exception as e:
+        assert '_active_browsers' in str(e)
+    else:
+        raise AssertionError("the guard started without crawlee's browser lists")
@@ -0,0 +1,77 @@
+import asyncio
+import tracemalloc
+
+from crawlee import Request
+
+from crawlee.storages import RequestQueue
+
+from utils.crawlee_storage import BatchRequestQueue, StorageSnapshotter, create_storage_client
+
+
+async def crawl_batches(batch_queue, batches, size=200):
+    """Runs batches through the queue like the long-lived crawler does, returns the requests held after each."""
+    held = []
+    for batch in range(batches):
+        await batch_queue.next_batch()
+        await batch_queue.add_requests_batched(
+            [Request.from_url(f"https://example.com/{batch}/{i}", unique_key=f"{batch}-{i}") for i in range(size)],
+            wait_for_all_requests_to_be_added=True,
+        )
+        while request := await batch_queue.fetch_next_request():
+            await batch_queue.mark_request_as_handled(request)
+        assert await batch_queue.is_finished()
+        held.append(len(batch_queue.pending) + len(batch_queue.in_progress) + len(batch_queue.unique_keys))
+    return held
+
+
+def test_memory_stays_flat_over_many_batches():
+    async def run():
+        batch_queue = BatchRequestQueue()
+        await crawl_batches(batch_queue, 10)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        held = await crawl_batches(batch_queue, 50)
+        grown = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        return held, grown
+
+    held, grown = asyncio.run(run())
+    # Only the unique keys of the batch that just ran, whatever the number of batches
+    assert max(held) <= 200
+    assert grown < 2 * 1024 * 1024
+
+
+def test_batch_queue_deduplicates_and_reclaims():
+    async def run():
+        batch_queue = BatchRequestQueue()
+        await batch_queue.next_batch()
+        await batch_queue.add_requests_batched([Request.from_url("https://example.com/a")] * 2)
+        request = await batch_queue.fetch_next_request()
+        assert await batch_queue.fetch_next_request() is None
+        await batch_queue.reclaim_request(request)
+        assert not await batch_queue.is_finished()
+        request = await batch_queue.fetch_next_request()
+        await batch_queue.mark_request_as_handled(request)
+        return await batch_queue.is_finished(), await batch_queue.get_total_count(), await batch_queue.get_handled_count()
+
+    assert asyncio.run(run()) == (True, 1, 1)
+
+
+def test_snapshot_holds_only_pending_requests(tmp_path):
+    async def run():
+        storage_client = create_storage_client('memory')
+        queue = await RequestQueue.open(name='snapshot-test', storage_client=storage_client)
+        batch_queue = BatchRequestQueue()
+        for manager in (queue, batch_queue):
+            await manager.add_requests_batched(
+                [Request.from_url(f"https://example.com/{i}") for i in range(5)], wait_for_all_requests_to_be_added=True
+            )
+            for _ in range(3):
+                await manager.mark_request_as_handled(await manager.fetch_next_request())
+        snapshotter = StorageSnapshotter(storage_client, str(tmp_path), request_managers={'batches': batch_queue}, chunk_size=1)
+        return (await snapshotter.collect())['request_queues']
+
+    request_queues = asyncio.run(run())
+    assert [request['url'] for request in request_queues['snapshot-test']['pending']] == ["https://example.com/3", "https://example.com/4"]
+    assert [request['url'] for request in request_queues['batches']['pending']] == ["https://example.com/3", "https://example.com/4"]
+    assert request_queues['batches']['handled_request_count'] == 3
@@ -0,0 +1,104 @@
+import asyncio
+
+import fetcher
+from utils.enums import FailureReason, Status
+from utils.retry_scheduler import RetryScheduler
+from tests.test_maps_url import PLACE_URL, PLACE_KEY
+
+
+class RecordingIndex:
+    def __init__(self, match=None):
+        self.match = match
+        self.calls = []
+
+    def resolve(self, place_key, lat, lng, title, phone):
+        self.calls.append((place_key, lat, lng, title, phone))
+        return self.match or place_key
+
+
+def test_resolve_place_key_without_coordinates(monkeypatch):
+    index = RecordingIndex()
+    monkeypatch.setattr(fetcher, 'spatial_index', index)
+    assert fetcher.resolve_place_key({'source_url': PLACE_URL, 'coordinates': None}) == PLACE_KEY
+    assert index.calls == []
+
+
+def test_resolve_place_key_takes_the_near_duplicate_key(monkeypatch):
+    index = RecordingIndex(match="cid:1")
+    monkeypatch.setattr(fetcher, 'spatial_index', index)
+    result = {
+        'source_url': PLACE_URL,
+        'coordinates': {'latitude': 32.27, 'longitude': -84.99},
+        'title': "Acaraje Restaurant",
+        'phone': "+17065550100",
+    }
+    assert fetcher.resolve_place_key(result) == "cid:1"
+    assert index.calls == [(PLACE_KEY, 32.27, -84.99, "Acaraje Restaurant", "+17065550100")]
+
+
+def scheduled_retries(monkeypatch, tmp_path, base_delay):
+    monkeypatch.chdir(tmp_path)  # cache_queries writes queries_cache.json
+    scheduler = RetryScheduler({FailureReason.TIMEOUT: 2}, base_delay=base_delay)
+    monkeypatch.setattr(fetcher, 'retry_scheduler', scheduler)
+    monkeypatch.setattr(fetcher, 'carried_retries', {})
+    monkeypatch.setattr(fetcher, 'queries', {'queries': [
+        {'url': "https://a", 'id': 1, 'status': Status.PROCESSED.value},
+        {'url': "https://b", 'id': 2, 'status': Status.PENDING.value},
+    ]})
+    scheduler.schedule("https://b", FailureReason.TIMEOUT)
+    return scheduler
+
+
+def test_pending_retries_are_carried_into_the_next_batch(monkeypatch, tmp_path):
+    scheduled_retries(monkeypatch, tmp_path, base_delay=0)
+    fetcher.carry_pending_retries()
+    assert [q['url'] for q in fetcher.queries['queries']] == ["https://a"]
+    fetcher.queries['queries'] = [{'url': "https://c", 'id': 3, 'status': Status.PENDING.value}]
+    assert fetcher.merge_due_retries(["https://c"]) == [("https://b", 1)]
+    assert [q['url'] for q in fetcher.queries['queries']] == ["https://c", "https://b"]
+    assert fetcher.carried_retries == {}
+
+
+def test_retries_not_due_stay_carried(monkeypatch, tmp_path):
+    scheduler = scheduled_retries(monkeypatch, tmp_path, base_delay=600)
+    fetcher.carry_pending_retries()
+    fetcher.queries['queries'] = []
+    assert fetcher.merge_due_retries(None) == []
+    assert list(fetcher.carried_retries) == ["https://b"]
+    assert scheduler.has_pending()
+
+
+def test_leased_again_drops_the_carried_retry(monkeypatch, tmp_path):
+    scheduler = scheduled_retries(monkeypatch, tmp_path, base_delay=0)
+    fetcher.carry_pending_retries()
+    fetcher.queries['queries'] = [{'url': "https://b", 'id': 4, 'status': Status.PENDING.value}]
+    assert fetcher.merge_due_retries(["https://b"]) == []
+    assert fetcher.carried_retries == {}
+    assert not scheduler.has_pending()
+
+
+def test_carried_retries_run_out_of_budget(monkeypatch, tmp_path):
+    scheduler = scheduled_retries(monkeypatch, tmp_path, base_delay=600)
+    monkeypatch.setattr(fetcher, 'batch_number', 0)
+    batches = []
+
+    async def failing_batch(requests):
+        # What the request handler does with a query that times out
+        for request in requests:
+            batches.append(request.unique_key)
+            status = Status.PENDING.value if scheduler.schedule("https://b", FailureReason.TIMEOUT) else Status.FAILED.value
+            fetcher.update_query_status("https://b", status)
+
+    monkeypatch.setattr(fetcher, 'run_batch', failing_batch)
+    for _ in range(5):
+        fetcher.carry_pending_retries()
+        if not fetcher.carried_retries:
+            break
+        scheduler.due = [(0, url) for _, url in scheduler.due]  # Due by the next lease
+        fetcher.queries['queries'] = []
+        asyncio.run(fetcher.run_with_retries([], fetcher.merge_due_retries(None)))
+    # Its first failure scheduled a retry, the budget of 2 allows one more
+    assert len(batches) == 2
+    assert fetcher.get_query_from_queries("https://b")['status'] == Status.FAILED.value
+    assert not scheduler.has_pending()
+    assert scheduler.attempts == {}
@@ -0,0 +1,63 @@
+import json
+import asyncio
+
+from utils.maps_rpc import XSSI_PREFIX, RpcCapture, parse_body
+
+FEATURE_ID = "0x88f5b9ef57d2450d:0x9215cde4455474b7"
+
+
+def place_payload(feature_id, title):
+    place = [None] * 12
+    place[10] = feature_id
+    place[11] = title
+    return [None] * 6 + [place]
+
+
+class FakePage:
+    def __init__(self, initialization_state=None):
+        self.initialization_state = initialization_state
+
+    def on(self, event, handler):
+        pass
+
+    async def evaluate(self, script):
+        return self.initialization_state
+
+
+def capture_with(bodies, initialization_state=None):
+    capture = RpcCapture(FakePage(initialization_state))
+    capture.place_bodies.extend(bodies)
+    return capture
+
+
+def test_parse_body_strips_the_xssi_prefix():
+    assert parse_body(XSSI_PREFIX + '\n[1,"a"]') == [1, "a"]
+
+
+def test_place_of_the_requested_feature_id():
+    async def run():
+        capture = capture_with([place_payload(FEATURE_ID.upper(), "Acaraje"), place_payload("0x1:0x2", "Nearby")])
+        return await capture.place(FEATURE_ID)
+    assert asyncio.run(run())['title'] == "Acaraje"
+
+
+def test_place_is_none_when_no_payload_is_of_the_feature_id():
+    async def run():
+        capture = capture_with([place_payload("0x1:0x2", "Nearby"), place_payload("0x3:0x4", "Stale panel")])
+        return await capture.place(FEATURE_ID)
+    assert asyncio.run(run()) is None
+
+
+def test_place_falls_back_to_the_initialization_state():
+    async def run():
+        state = XSSI_PREFIX + json.dumps(place_payload(FEATURE_ID, "Acaraje"))
+        capture = capture_with([place_payload("0x1:0x2", "Nearby")], initialization_state=state)
+        return await capture.place(FEATURE_ID)
+    assert asyncio.run(run())['title'] == "Acaraje"
+
+
+def test_latest_place_without_a_feature_id():
+    async def run():
+        capture = capture_with([place_payload("0x1:0x2", "First"), place_payload("0x3:0x4", "Latest")])
+        return await capture.place()
+    assert asyncio.run(run())['title'] == "Latest"
@@ -0,0 +1,60 @@
+from utils.maps_url import decode, place_key, canonical_url, get_coordinates
+
+PLACE_URL = (
+    "https://www.google.com/maps/place/Acaraje+Restaurant/@32.2742073,-84.9989355,15z/data=!4m7!3m6"
+    "!1s0x88f5b9ef57d2450d:0x9215cde4455474b7!8m2!3d32.2742073!4d-84.9989355!10e2!16s%3Bm%3B89187155!5m1!1e2"
+)
+PLACE_KEY = "cid:10526546084347802807"
+
+
+def test_decode():
+    ref = decode(PLACE_URL)
+    assert ref.name == "Acaraje Restaurant"
+    assert ref.feature_id == "0x88f5b9ef57d2450d:0x9215cde4455474b7"
+    assert ref.cid == 10526546084347802807
+    assert ref.kg_id == ";m;89187155"
+    assert (ref.latitude, ref.longitude) == (32.2742073, -84.9989355)
+    assert ref.zoom == 15
+
+
+def test_place_key_is_the_same_for_every_variant():
+    variants = [
+        PLACE_URL,
+        PLACE_URL.replace("15z", "21z").replace("@32.2742073", "@32.28"),
+        PLACE_URL + "?entry=ttu&g_ep=EgoyMDI0",
+        "https://www.google.com/maps/place/data=!4m2!3m1!1s0x88f5b9ef57d2450d:0x9215cde4455474b7",
+        "https://www.google.com/maps/place/data=!4m2!3m1!1s0x88F5B9EF57D2450D:0x9215CDE4455474B7/am=t",
+        "https://www.google.com/maps?cid=10526546084347802807&hl=en",
+    ]
+    assert {place_key(url) for url in variants} == {PLACE_KEY}
+
+
+def test_place_key_of_canonical_url():
+    assert canonical_url(PLACE_URL) == "https://www.google.com/maps?cid=10526546084347802807"
+    assert place_key(canonical_url(PLACE_URL)) == place_key(PLACE_URL)
+    kg_only = "https://www.google.com/maps/place/Foo/@1.5,2.5,12z/data=!4m2!16s%2Fg%2F11b6xyz?entry=ttu"
+    assert place_key(kg_only) == "/g/11b6xyz"
+    assert place_key(canonical_url(kg_only)) == place_key(kg_only)
+
+
+
+def test_canonical_url_without_a_place_keeps_what_it_shows():
+    # Same search in two viewports, and two searches at the same viewport, are distinct queries
+    nyc = "https://www.google.com/maps/search/cafe/@40.7128,-74.006,13z?hl=en&entry=ttu"
+    boston = "https://www.google.com/maps/search/cafe/@42.3601,-71.0589,13z?hl=en&entry=ttu"
+    assert canonical_url(nyc) != canonical_url(boston)
+    assert place_key(nyc) != place_key(boston)
+    assert canonical_url(nyc) == "https://www.google.com/maps/search/cafe/@40.7128,-74.006,13z?hl=en"
+    by_type = "https://www.google.com/maps?q=cafe&ll=40.7,-74.0"
+    assert canonical_url(by_type) != canonical_url("https://www.google.com/maps?q=bakery&ll=40.7,-74.0")
+    # Tracking parameters and their order don't make another query
+    assert canonical_url(by_type + "&g_ep=EgoyMDI0&utm_source=x") == canonical_url("https://www.google.com/maps?ll=40.7,-74.0&q=cafe")
+
+
+def test_get_coordinates_prefers_the_pin():
+    assert get_coordinates(PLACE_URL.replace("@32.2742073,-84.9989355", "@33,-85")) == {
+        'latitude': 32.2742073, 'longitude': -84.9989355,
+    }
+    assert get_coordinates("https://www.google.com/maps/search/cafe/@33.5,-85.25,13z") == {
+        'latitude': 33.5, 'longitude': -85.25,
+    }
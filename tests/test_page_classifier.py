@@ -0,0 +1,36 @@
+import asyncio
+
+from utils.enums import PageVerdict
+from utils.page_classifier import classify_page, wait_for_place_or_block
+
+PLACE_HTML = "<html><body><div role='main'><h1>Acaraje Restaurant</h1></div></body></html>"
+
+
+class FakePage:
+    def __init__(self, html, url="https://www.google.com/maps/place/Acaraje"):
+        self.html = html
+        self.url = url
+        self.waited = False
+
+    async def wait_for_selector(self, selector, timeout):
+        self.waited = True
+
+    async def query_selector(self, selector):
+        return object() if selector == "h1" and '<h1' in self.html else None
+
+    async def content(self):
+        return self.html
+
+
+def test_blocking_status_with_a_normal_body():
+    assert classify_page("https://www.google.com/maps/place/Acaraje", PLACE_HTML, status=429) == PageVerdict.BLOCKED
+
+
+def test_wait_classifies_a_429_at_once():
+    page = FakePage(PLACE_HTML)
+    assert asyncio.run(wait_for_place_or_block(page, status=429)) == PageVerdict.BLOCKED
+    assert not page.waited
+
+
+def test_wait_with_an_ok_status_finds_the_place():
+    assert asyncio.run(wait_for_place_or_block(FakePage(PLACE_HTML), status=200)) == PageVerdict.OK
@@ -0,0 +1,96 @@
+import asyncio
+
+from crawlee import service_locator
+from crawlee.sessions import SessionPool
+
+from utils.crawlee_storage import BatchRequestQueue, create_storage_client
+from utils.page_pool import PagePool
+from utils.pooled_crawler import PooledPageCrawler
+
+
+class FakeBrowserContext:
+    async def add_cookies(self, cookies):
+        pass
+
+    async def cookies(self):
+        return [{'name': 'CONSENT', 'value': 'YES', 'domain': '.google.com', 'path': '/'}]
+
+
+class FakePage:
+    opened = 0
+
+    def __init__(self):
+        FakePage.opened += 1
+        self.id = FakePage.opened
+        self.url = "https://www.google.com/maps"
+        self.closed = False
+        self.context = FakeBrowserContext()
+
+    def is_closed(self):
+        return self.closed
+
+    async def evaluate(self, script):
+        return 1
+
+    async def close(self):
+        self.closed = True
+
+    async def set_extra_http_headers(self, headers):
+        pass
+
+    async def eval_on_selector_all(self, selector, script):
+        return ["/maps/place/a", "https://www.google.com/maps/place/b", None]
+
+
+# crawlee's storage client is global and can't be replaced once a crawler used it
+service_locator.set_storage_client(create_storage_client('memory'))
+
+
+class FakeBrowserPool:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+def crawl(urls, handler):
+    async def create(proxy_info=None):
+        return FakePage()
+
+    pool = PagePool(create, max_idle=2)
+    crawler = PooledPageCrawler(
+        pool, FakeBrowserPool(), session_isolation=True, session_pool=SessionPool(max_pool_size=1),
+        request_manager=BatchRequestQueue(),
+        configure_logging=False, max_request_retries=0,
+    )
+    crawler.router.default_handler(handler)
+    asyncio.run(crawler.run(urls))
+    return pool
+
+
+def test_pages_are_reused_until_their_session_is_retired():
+    pages = []
+
+    async def handler(context):
+        pages.append(context.page)
+        if context.request.url.endswith('/block'):
+            context.session.retire()
+
+    crawl(["https://example.com/1", "https://example.com/2", "https://example.com/block", "https://example.com/3"], handler)
+    assert pages[0] is pages[1] is pages[2] is not pages[3]
+    # The retired session's page is closed, not handed to the next request
+    assert pages[2].closed
+
+
+def test_enqueue_links_adds_the_page_links():
+    enqueued = []
+
+    async def handler(context):
+        if context.request.url.endswith('/start'):
+            await context.enqueue_links(strategy='all')
+        else:
+            enqueued.append(context.request.url)
+
+    crawl(["https://www.google.com/start"], handler)
+    assert sorted(enqueued) == ["https://www.google.com/maps/place/a", "https://www.google.com/maps/place/b"]
@@ -0,0 +1,20 @@
+from utils.query_scheduler import YieldScheduler
+
+
+def query(industry, latitude, zoom):
+    return {'metadata': {'industry': industry, 'latitude': latitude, 'longitude': 0, 'zoom_level': zoom}}
+
+
+def test_min_share_floors_every_class_not_only_every_industry():
+    scheduler = YieldScheduler(min_share=0.25)
+    # Same industry, the poor class only differs by its region cell
+    for _ in range(20):
+        scheduler.record(query('bakery', 10, 15)['metadata'], 100, 10)
+        scheduler.record(query('bakery', 40, 15)['metadata'], 0, 60)
+    rich = [query('bakery', 10, 15) for _ in range(30)]
+    poor = [query('bakery', 40, 15) for _ in range(10)]
+
+    ordered = scheduler.order(rich + poor)
+    assert len(ordered) == 40
+    # The poor class keeps getting slots early instead of coming after the whole rich one
+    assert sum(1 for q in ordered[:20] if q['metadata']['latitude'] == 40) >= 3
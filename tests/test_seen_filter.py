@@ -0,0 +1,64 @@
+import os
+
+import fetcher
+from utils.enums import Status
+from utils.result_reporter import StreamingReporter
+from utils.seen_filter import SeenPlaceFilter
+from tests.test_maps_url import PLACE_URL, PLACE_KEY
+
+
+def make_filter(tmp_path, node_id):
+    return SeenPlaceFilter(
+        str(tmp_path / node_id), node_id, capacity=1000, window_hours=1, shared_dir=str(tmp_path / 'shared')
+    )
+
+
+def test_sync_merges_other_nodes(tmp_path):
+    a, b = make_filter(tmp_path, 'a'), make_filter(tmp_path, 'b')
+    a.add("cid:1")
+    a.sync()
+    b.sync()
+    assert b.seen("cid:1")
+    assert not b.seen("cid:2")
+
+
+def test_sync_deletes_expired_shared_snapshots(tmp_path):
+    a = make_filter(tmp_path, 'a')
+    a.add("cid:1")
+    a.sync()
+    window = a.current_window()
+    shared = tmp_path / 'shared'
+    for name in (f"b-{window - 2}.bloom", f"a-{window - 5}.bloom", f"b-{window - 1}.bloom"):
+        (shared / name).write_bytes((shared / f"a-{window}.bloom").read_bytes())
+    (tmp_path / 'a' / f"a-{window - 3}.bloom").write_bytes(b"")
+    a.sync()
+    # b's live snapshot is merged into a's previous window, which a publishes too
+    assert sorted(os.listdir(shared)) == [f"a-{window - 1}.bloom", f"a-{window}.bloom", f"b-{window - 1}.bloom"]
+    assert sorted(os.listdir(tmp_path / 'a')) == [f"a-{window - 1}.bloom", f"a-{window}.bloom"]
+
+
+def test_skipped_queries_point_at_the_seen_place(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # cache_queries writes queries_cache.json
+    seen = make_filter(tmp_path, 'a')
+    seen.add(PLACE_KEY)
+    reporter = StreamingReporter("http://task-spreader.invalid", "US", "node")
+    monkeypatch.setattr(fetcher, 'seen_filter', seen)
+    monkeypatch.setattr(fetcher, 'reporter', reporter)
+    monkeypatch.setattr(fetcher, 'queries', {'queries': [
+        {'url': PLACE_URL, 'id': 1, 'status': Status.PENDING.value},
+        {'url': "https://www.google.com/maps/search/bakery", 'id': 2, 'status': Status.PENDING.value},
+    ]})
+
+    assert fetcher.skip_seen_queries([PLACE_URL, "https://www.google.com/maps/search/bakery"]) == [
+        "https://www.google.com/maps/search/bakery"
+    ]
+    skipped = {'reason': 'seen', 'place_key': PLACE_KEY}
+    assert reporter.pending_statuses == [{"id": 1, "status": Status.PROCESSED.value, "skipped": skipped}]
+    assert reporter.pending_rows == []
+
+    # The batch push sends the same status, a skipped query has no rows to carry it
+    posted = []
+    monkeypatch.setattr(fetcher, 'reporter', None)
+    monkeypatch.setattr(fetcher, 'post_results', posted.append)
+    fetcher.push_results_to_db()
+    assert posted[-1]['statuses'] == [{"id": 1, "status": Status.PROCESSED.value, "skipped": skipped}]
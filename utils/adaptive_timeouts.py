@@ -0,0 +1,61 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class AdaptiveTimeouts:
+    """
+    Per-stage timeouts learned from recent latencies: a rolling percentile of successful
+    timings times `multiplier`, clamped to [floor, ceiling]. The fixed worst-case values are
+    the ceilings and are used as-is until a stage has `min_samples` timings.
+    All values are in milliseconds, like Playwright's timeouts.
+    """
+
+    def __init__(self, ceilings, multiplier=3, floor=5_000, percentile=95, window=200, min_samples=20):
+        self.ceilings = ceilings
+        self.multiplier = multiplier
+        self.floor = floor
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.samples = {stage: deque(maxlen=window) for stage in ceilings}
+        self.timeouts_hit = {stage: 0 for stage in ceilings}
+
+    def get(self, stage):
+        samples = self.samples[stage]
+        ceiling = self.ceilings[stage]
+        if len(samples) < self.min_samples:
+            return ceiling
+        learned = self._percentile(samples, self.percentile) * self.multiplier
+        return int(min(ceiling, max(min(self.floor, ceiling), learned)))
+
+    def record(self, stage, elapsed_ms):
+        self.samples[stage].append(elapsed_ms)
+
+    def record_timeout(self, stage):
+        # Timed out stages are not latency samples, they would only drag the timeout up
+        self.timeouts_hit[stage] += 1
+
+    @contextmanager
+    def measure(self, stage):
+        """Records the elapsed time of the block if it completes without raising."""
+        started = time.perf_counter()
+        yield
+        self.record(stage, (time.perf_counter() - started) * 1000)
+
+    def stats(self):
+        stats = {}
+        for stage, samples in self.samples.items():
+            stats[stage] = {
+                'ceiling_ms': self.ceilings[stage],
+                'current_ms': self.get(stage),
+                'p50_ms': round(self._percentile(samples, 50)) if samples else None,
+                f'p{self.percentile}_ms': round(self._percentile(samples, self.percentile)) if samples else None,
+                'samples': len(samples),
+                'timeouts': self.timeouts_hit[stage],
+            }
+        return stats
+
+    @staticmethod
+    def _percentile(samples, pct):
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
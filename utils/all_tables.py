@@ -1,14 +1,20 @@
+import os
 import psycopg2
+from dotenv import load_dotenv
 
-# Connection details for 'usa' database
-host = "82.112.254.77"
-user = "supernova"
-password = "TRAwir515025"
-database = "usa"
+load_dotenv('.env')
+
+# Connection details for the results database
+host = os.getenv("PG_HOST", "localhost")
+port = int(os.getenv("PG_PORT", 5432))
+user = os.getenv("PG_USER", "postgres")
+password = os.getenv("PG_PASSWORD")
+database = os.getenv("PG_DATABASE", "usa")
 
 try:
     conn = psycopg2.connect(
         host=host,
+        port=port,
         user=user,
         password=password,
         dbname=database
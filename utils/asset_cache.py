@@ -0,0 +1,177 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+CACHEABLE_RESOURCE_TYPES = ('script', 'stylesheet', 'font', 'image')
+# Place photos (googleusercontent.com) differ per place and are left out
+STATIC_HOST_SUFFIXES = ('gstatic.com', 'googleapis.com')
+# Maps' own bundles are served from /maps/_/js/k=...,/_/ss/... with the build hash in the URL
+STATIC_PATH_PATTERN = re.compile(r"/_/(js|ss)/|/maps-api-v3/|\.(js|css|woff2?|ttf)$")
+HASHED_URL_PATTERN = re.compile(r"[0-9a-f]{16,}|[A-Za-z0-9_-]{24,}|/k=|/rs=")
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+# Headers describing the body as transferred, the cached body is stored decoded
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+def is_static_url(url):
+    parsed = urlparse(url)
+    return parsed.hostname is not None and (
+        parsed.hostname.endswith(STATIC_HOST_SUFFIXES) or bool(STATIC_PATH_PATTERN.search(parsed.path))
+    )
+
+
+class AssetCache:
+    """
+    Size-capped LRU disk cache for the Maps front end's static assets, served to pages through
+    Playwright request interception (`route.fulfill`). Responses are stored when their headers
+    allow it: `immutable` or a max-age, or no max-age but a content hash in the URL.
+    Entries expire with their max-age, hashed URLs without one are kept for `default_ttl`.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, default_ttl=30 * 86400):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()  # key -> (size, expires_at), least recently used first
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    meta = json.load(f)
+                body_stat = os.stat(self._body_path(key))
+            except (OSError, ValueError):
+                self._remove_files(key)
+                continue
+            found.append((body_stat.st_mtime, key, body_stat.st_size, meta['expires_at']))
+        # Last use is kept as the body's mtime, oldest first
+        for _, key, size, expires_at in sorted(found):
+            self.entries[key] = (size, expires_at)
+            self.size += size
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, f"{key}.body")
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remove_files(self, key):
+        for path in (self._body_path(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def ttl(self, url, headers):
+        """Seconds a response may be cached for, 0 if it must not be."""
+        cache_control = headers.get('cache-control', '').lower()
+        if 'no-store' in cache_control or 'private' in cache_control or 'set-cookie' in headers:
+            return 0
+        if 'immutable' in cache_control:
+            return self.default_ttl
+        match = MAX_AGE_PATTERN.search(cache_control)
+        if match:
+            return int(match.group(1))
+        return self.default_ttl if HASHED_URL_PATTERN.search(url) else 0
+
+    def _read(self, key):
+        with open(self._meta_path(key)) as f:
+            meta = json.load(f)
+        with open(self._body_path(key), 'rb') as f:
+            body = f.read()
+        os.utime(self._body_path(key))
+        return meta, body
+
+    def _write(self, key, meta, body):
+        with open(self._body_path(key), 'wb') as f:
+            f.write(body)
+        with open(self._meta_path(key), 'w') as f:
+            json.dump(meta, f)
+
+    async def handle(self, route):
+        """Route handler, install with `page.route(is_static_url, cache.handle)`."""
+        request = route.request
+        if request.method != 'GET' or request.resource_type not in CACHEABLE_RESOURCE_TYPES:
+            await route.fallback()
+            return
+        key = hashlib.sha256(request.url.encode('utf-8')).hexdigest()
+        entry = self.entries.get(key)
+        if entry and entry[1] > time.time():
+            try:
+                meta, body = await asyncio.to_thread(self._read, key)
+            except OSError:
+                self._evict(key)
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                self.bytes_saved += len(body)
+                await route.fulfill(status=meta['status'], headers=meta['headers'], body=body)
+                return
+        elif entry:
+            self._evict(key)
+
+        self.misses += 1
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception:
+            # Closed page or network error, the browser deals with the request itself
+            try:
+                await route.fallback()
+            except Exception:
+                pass
+            return
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in DROPPED_HEADERS}
+        await route.fulfill(status=response.status, headers=headers, body=body)
+        ttl = self.ttl(request.url, {name.lower(): value for name, value in response.headers.items()})
+        if response.status == 200 and ttl > 0 and len(body) <= self.max_bytes // 10:
+            meta = {'url': request.url, 'status': response.status, 'headers': headers, 'expires_at': time.time() + ttl}
+            self._evict(key)  # An expired entry of the same URL
+            try:
+                await asyncio.to_thread(self._write, key, meta, body)
+            except OSError as e:
+                print(f"[WARNING] Could not cache {request.url}: {e}")
+                self._remove_files(key)
+                return
+            self.entries[key] = (len(body), meta['expires_at'])
+            self.size += len(body)
+            self.stores += 1
+            while self.size > self.max_bytes and self.entries:
+                self._evict(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _evict(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.size -= entry[0]
+            self._remove_files(key)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'size_bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+            'bytes_saved': self.bytes_saved,
+            'stores': self.stores,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,215 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import threading
+from collections import Counter
+
+from utils.loop_watchdog import REPO_ROOT
+
+ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+def frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(REPO_ROOT):
+        filename = os.path.relpath(filename, REPO_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{code.co_qualname}"
+
+
+def coroutine_name(task):
+    coro = task.get_coro()
+    return getattr(coro, '__qualname__', None) or type(coro).__name__
+
+
+def awaiting_stack(task):
+    """Labels of the coroutine chain a suspended task is parked in, outermost first."""
+    labels = []
+    coro = task.get_coro()
+    while coro is not None and len(labels) < 64:
+        code = getattr(coro, 'cr_code', None) or getattr(coro, 'gi_code', None) or getattr(coro, 'ag_code', None)
+        if code is None:
+            labels.append(type(coro).__name__)  # A future or a C-level awaitable
+            break
+        labels.append(frame_label(code))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None) or getattr(coro, 'ag_await', None)
+    return labels
+
+
+class AsyncProfiler:
+    """
+    Sampling profiler for an asyncio event loop. A thread wakes up every `interval` seconds and
+    records, for the task running on the loop thread, its Python stack and the loop thread's CPU
+    time since the previous sample, and for every other task the coroutine chain it is awaiting in.
+    Each `window` seconds (or when stopped) it writes two flamegraph-compatible collapsed-stack
+    files, `<ts>-cpu.collapsed` (on-loop stacks weighted by CPU microseconds) and `<ts>-wall.collapsed`
+    (all tasks, weighted by wall microseconds), and keeps a top-N summary of coroutines by wall
+    and CPU time. Toggled with `signal_number` once `install` ran on the loop.
+
+    The sampler needs the GIL, which the loop thread only hands over when it waits in select or
+    after the interpreter's switch interval. The switch interval is lowered to `switch_interval`
+    while sampling so task steps longer than that are caught mid-run. CPU spent in shorter steps
+    between two samples can't be attributed and is reported as `unattributed_cpu_seconds`.
+    """
+
+    def __init__(self, directory='profiles', interval=0.02, window=300, top_n=20, signal_number=signal.SIGUSR2,
+                 switch_interval=0.001):
+        self.directory = directory
+        self.interval = interval
+        self.switch_interval = switch_interval
+        self._saved_switch_interval = None
+        self.window = window
+        self.top_n = top_n
+        self.signal_number = signal_number
+        self.loop = None
+        self.loop_thread = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._reset()
+        self.windows_written = 0
+        self.last_summary = None
+        self.sampler_cpu_seconds = 0.0
+        self.sampled_seconds = 0.0
+
+    def _reset(self):
+        self.cpu_stacks = Counter()  # ';'-joined stack -> CPU microseconds
+        self.wall_stacks = Counter()  # ';'-joined stack -> wall microseconds
+        self.cpu_by_coroutine = Counter()  # seconds
+        self.wall_by_coroutine = Counter()
+        self.unattributed_cpu = 0.0
+        self.window_started = time.time()
+
+    def install(self, enabled=False):
+        """Binds the profiler to the running loop, idempotent. Starts sampling if `enabled`."""
+        if self.loop is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        if self.signal_number is not None and threading.current_thread() is threading.main_thread():
+            try:
+                self.loop.add_signal_handler(self.signal_number, self.toggle)
+            except (NotImplementedError, RuntimeError):
+                pass
+        if enabled:
+            self.start()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def toggle(self):
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def start(self):
+        if self.running or self.loop is None:
+            return
+        print(f"Profiler started, writing to {self.directory} every {self.window}s")
+        self._stop.clear()
+        self._reset()
+        self._saved_switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._saved_switch_interval, self.switch_interval))
+        self._thread = threading.Thread(target=self._run, name='async-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops sampling and writes the current window."""
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._saved_switch_interval)
+        print(f"Profiler stopped, profiles in {self.directory}")
+
+    def _run(self):
+        cpu_clock = time.pthread_getcpuclockid(self.loop_thread)
+        last_wall, last_cpu = time.monotonic(), time.clock_gettime(cpu_clock)
+        while not self._stop.wait(self.interval):
+            sampler_started = time.thread_time()
+            wall, cpu = time.monotonic(), time.clock_gettime(cpu_clock)
+            self._sample(wall - last_wall, cpu - last_cpu)
+            last_wall, last_cpu = wall, cpu
+            self.sampler_cpu_seconds += time.thread_time() - sampler_started
+            if time.time() - self.window_started >= self.window:
+                self._write_window()
+        self._write_window()
+
+    def _sample(self, wall_delta, cpu_delta):
+        self.sampled_seconds += wall_delta
+        frame = sys._current_frames().get(self.loop_thread)
+        current = asyncio.current_task(self.loop)
+        if frame is not None:
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                # The loop's own frames (run_forever, _run_once, Handle._run) are cut off
+                if code.co_filename.startswith(ASYNCIO_DIR) and code.co_name == '_run':
+                    break
+                stack.append(frame_label(code))
+                frame = frame.f_back
+            stack.reverse()
+            if current is None:
+                idle = frame is None and stack and stack[-1].startswith('selectors.py')
+                root = '[idle]' if idle or not stack else '[callbacks]'
+                stack = [root] + (stack[-3:] if idle else stack)
+                if idle:
+                    # Whatever ran since the previous sample finished before this one
+                    self.unattributed_cpu += cpu_delta
+                    cpu_delta = 0
+            else:
+                name = coroutine_name(current)
+                stack = [name] + stack
+                self.cpu_by_coroutine[name] += cpu_delta
+                self.wall_by_coroutine[name] += wall_delta
+            self.cpu_stacks[';'.join(stack)] += round(cpu_delta * 1e6)
+            self.wall_stacks[';'.join(stack)] += round(wall_delta * 1e6)
+        try:
+            tasks = asyncio.all_tasks(self.loop)
+        except RuntimeError:
+            return  # The task set kept changing while copied, the next sample counts them
+        for task in tasks:
+            if task is current:
+                continue
+            name = coroutine_name(task)
+            self.wall_by_coroutine[name] += wall_delta
+            self.wall_stacks[';'.join([name, '[awaiting]'] + awaiting_stack(task)[1:])] += round(wall_delta * 1e6)
+
+    def _write_window(self):
+        if not self.cpu_stacks and not self.wall_stacks:
+            return
+        prefix = os.path.join(self.directory, time.strftime('%Y%m%dT%H%M%S', time.localtime(self.window_started)))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for suffix, stacks in (('cpu', self.cpu_stacks), ('wall', self.wall_stacks)):
+                with open(f"{prefix}-{suffix}.collapsed", 'w') as f:
+                    for stack, weight in stacks.most_common():
+                        if weight > 0:
+                            f.write(f"{stack} {weight}\n")
+        except OSError as e:
+            print(f"[WARNING] Could not write profile {prefix}: {e}")
+        self.last_summary = self.summary()
+        self.windows_written += 1
+        self._reset()
+
+    def summary(self):
+        """Top coroutines of the current window by wall time (in flight) and CPU time (on the loop)."""
+        return {
+            'window_started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.window_started)),
+            'top_wall_seconds': {name: round(seconds, 2) for name, seconds in self.wall_by_coroutine.most_common(self.top_n)},
+            'top_cpu_seconds': {name: round(seconds, 3) for name, seconds in self.cpu_by_coroutine.most_common(self.top_n)},
+            'unattributed_cpu_seconds': round(self.unattributed_cpu, 3),
+        }
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'windows_written': self.windows_written,
+            'overhead_pct': round(self.sampler_cpu_seconds / self.sampled_seconds * 100, 2) if self.sampled_seconds else None,
+            'current': self.summary() if self.running else None,
+            'last_window': self.last_summary,
+        }
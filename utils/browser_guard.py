@@ -0,0 +1,101 @@
+import asyncio
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from utils.process_stats import get_browser_memory
+
+
+class BrowserRecycleGuard:
+    """
+    Keeps long-running crawlers at a steady memory footprint by recycling browsers.
+
+    A browser is retired once it has served `max_pages` pages, or when the Chromium process
+    tree grows past `max_rss_mb`. Retiring moves it to the pool's inactive list: it takes no
+    new pages, finishes the ones it has open and is closed by crawlee once drained, while the
+    next page launches a fresh browser. Nothing queued is dropped.
+
+    crawlee has no public way to retire a browser, so this moves it between BrowserPool's private
+    lists. crawlee is pinned in requirements.txt and tests/test_browser_guard.py checks the lists
+    are still there, the guard refuses to start without them.
+    """
+
+    def __init__(self, browser_pool, max_pages=200, max_rss_mb=2048, min_pages=10, check_interval=30):
+        for name in ('_active_browsers', '_inactive_browsers'):
+            if not isinstance(getattr(browser_pool, name, None), list):
+                raise Exception(f"BrowserRecycleGuard requires crawlee's BrowserPool.{name}, check the crawlee version")
+        self.browser_pool = browser_pool
+        self.max_pages = max_pages
+        self.max_rss_bytes = max_rss_mb * 2**20
+        self.min_pages = min_pages  # Don't recycle fresh browsers, their memory can't be the leak
+        self.check_interval = check_interval
+        self.pages_served = {}
+        self.recycle_counts = Counter()
+        self.recent_recycles = deque(maxlen=20)
+        self.last_memory = {}
+
+    def page_served(self, page):
+        browser = self._find_browser(page)
+        if browser is None:
+            return
+        self.pages_served[browser] = self.pages_served.get(browser, 0) + 1
+        if self.pages_served[browser] >= self.max_pages:
+            self.retire(browser, 'pages')
+
+    def retire(self, browser, reason):
+        # Same move crawlee itself does for idle browsers in BrowserPool._identify_inactive_browsers
+        active = self.browser_pool._active_browsers
+        if browser not in active:
+            return
+        active.remove(browser)
+        self.browser_pool._inactive_browsers.append(browser)
+        pages = self.pages_served.pop(browser, 0)
+        self.recycle_counts[reason] += 1
+        self.recent_recycles.append({
+            'reason': reason,
+            'pages_served': pages,
+            'browser_rss_mb': round(self.last_memory.get('browser_rss_bytes', 0) / 2**20, 1),
+            'at': datetime.now(timezone.utc).isoformat(),
+        })
+        print(f"Recycling browser after {pages} pages ({reason})")
+
+    def is_retired(self, page):
+        """True once the page's browser takes no new pages (retired here or idle in crawlee), pooled pages on it are closed."""
+        return not any(page in browser.pages for browser in self.browser_pool.active_browsers)
+
+    def check_memory(self):
+        self.last_memory = get_browser_memory()
+        if self.last_memory['browser_rss_bytes'] < self.max_rss_bytes:
+            return
+        for browser in list(self.browser_pool._active_browsers):
+            if self.pages_served.get(browser, 0) >= self.min_pages:
+                self.retire(browser, 'rss')
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await asyncio.to_thread(self.check_memory)
+            except Exception as e:
+                print(f"[WARNING] Browser memory check failed: {e}")
+            # Forget browsers crawlee has closed
+            known = set(self.browser_pool.active_browsers) | set(self.browser_pool.inactive_browsers)
+            for browser in [b for b in self.pages_served if b not in known]:
+                del self.pages_served[browser]
+
+    def stats(self):
+        return {
+            'browser_rss_mb': round(self.last_memory.get('browser_rss_bytes', 0) / 2**20, 1),
+            'renderer_rss_mb': round(self.last_memory.get('renderer_rss_bytes', 0) / 2**20, 1),
+            'renderer_count': self.last_memory.get('renderer_count', 0),
+            'active_browsers': len(self.browser_pool.active_browsers),
+            'draining_browsers': len(self.browser_pool.inactive_browsers),
+            'pages_served': list(self.pages_served.values()),
+            'recycle_counts': dict(self.recycle_counts),
+            'recent_recycles': list(self.recent_recycles),
+        }
+
+    def _find_browser(self, page):
+        for browser in self.browser_pool.active_browsers:
+            if page in browser.pages:
+                return browser
+        return None
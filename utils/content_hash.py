@@ -0,0 +1,129 @@
+import json
+import time
+import sqlite3
+import hashlib
+from collections import Counter
+
+# Fields that change on every crawl and are not part of a record's content
+VOLATILE_FIELDS = ('id', 'source_url', 'scraped_at')
+
+
+def normalize_value(value):
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, list):
+        return sorted({normalize_value(item) for item in value if item})
+    return value
+
+
+def normalize_record(row):
+    return {
+        field: normalize_value(value)
+        for field, value in row.items() if field not in VOLATILE_FIELDS
+    }
+
+
+def _digest(value):
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def content_hash(row):
+    """Stable hash of a record's normalized content, the same place crawled twice hashes the same."""
+    return _digest(normalize_record(row))
+
+
+class ContentHashIndex:
+    """
+    Local SQLite index of the last pushed content hash (and per-field hashes) of every place,
+    used to push only new and changed records. Hashes are staged per query and only committed
+    once the spreader acknowledged the query, so a failed push is resent in full.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.staged = {}  # query id -> {place key: (hash, field hashes)}
+        self.changes = Counter()
+        self.full_bytes = 0
+        self.delta_bytes = 0
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS content_hashes ("
+                "place_key TEXT PRIMARY KEY, hash TEXT NOT NULL, fields TEXT NOT NULL, seen_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def diff(self, query_id, place_key, row):
+        """
+        Returns the row to push: the full row for a new place, only the changed fields for a
+        changed one, or a "seen at" touch when nothing changed.
+        """
+        normalized = normalize_record(row)
+        row_hash = _digest(normalized)
+        field_hashes = {field: _digest(value) for field, value in normalized.items()}
+        self.staged.setdefault(query_id, {})[place_key] = (row_hash, field_hashes)
+
+        stored = self.conn.execute(
+            "SELECT hash, fields FROM content_hashes WHERE place_key = ?", (place_key,)
+        ).fetchone()
+        header = {'id': row['id'], 'place_key': place_key, 'content_hash': row_hash}
+        if stored is None:
+            change, delta = 'new', {**row, **header}
+        elif stored[0] == row_hash:
+            change, delta = 'unchanged', {**header, 'seen_at': row.get('scraped_at')}
+        else:
+            previous = json.loads(stored[1])
+            changed = {
+                field: row[field] for field, value_hash in field_hashes.items()
+                if previous.get(field) != value_hash
+            }
+            change, delta = 'changed', {
+                **header,
+                'source_url': row.get('source_url'),
+                'scraped_at': row.get('scraped_at'),
+                'changed_fields': changed,
+            }
+        delta['change'] = change
+        self.changes[change] += 1
+        self.full_bytes += len(json.dumps(row, separators=(',', ':')))
+        self.delta_bytes += len(json.dumps(delta, separators=(',', ':')))
+        return delta
+
+    def commit(self, query_ids):
+        entries = []
+        now = time.time()
+        for query_id in query_ids:
+            for place_key, (row_hash, field_hashes) in self.staged.pop(query_id, {}).items():
+                entries.append((place_key, row_hash, json.dumps(field_hashes), now))
+        if entries:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO content_hashes (place_key, hash, fields, seen_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (place_key) DO UPDATE SET "
+                    "hash = excluded.hash, fields = excluded.fields, seen_at = excluded.seen_at",
+                    entries
+                )
+
+    def discard(self):
+        """Drops staged hashes of a push that will be retried from scratch."""
+        self.staged.clear()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self):
+        return {
+            'changes': dict(self.changes),
+            'full_bytes': self.full_bytes,
+            'delta_bytes': self.delta_bytes,
+            'saved_ratio': round(1 - self.delta_bytes / self.full_bytes, 3) if self.full_bytes else None,
+        }
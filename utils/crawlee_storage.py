@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+import itertools
+
+from collections import deque
+from datetime import datetime, timezone
+
+from crawlee import Request
+from crawlee.configuration import Configuration
+from crawlee.request_loaders import RequestManager
+from crawlee.storage_clients import MemoryStorageClient
+from crawlee.storage_clients.models import ProcessedRequest
+
+STORAGE_MODES = ('disk', 'memory')
+
+
+def create_storage_client(mode):
+    """
+    Storage client for crawlee's request queue, key-value store and datasets. Both modes keep
+    everything in memory, "disk" also writes every change under storage/ (crawlee's default),
+    "memory" never touches the disk.
+    """
+    if mode not in STORAGE_MODES:
+        raise Exception(f"Unknown crawlee storage mode {mode!r}, expected one of {STORAGE_MODES}")
+    if mode == 'disk':
+        return MemoryStorageClient.from_config(Configuration())
+    return MemoryStorageClient.from_config(Configuration(persist_storage=False, write_metadata=False))
+
+
+class BatchRequestQueue(RequestManager):
+    """
+    In-memory request manager of the long-lived crawler. It holds only what is pending or in
+    progress, a handled request is counted and forgotten, so memory stays flat however many
+    batches run. Unique keys are deduplicated within a batch, `next_batch()` starts a new one.
+    crawlee's RequestQueue keeps every request it was given instead, and a dropped queue stays
+    referenced by its event listeners, so neither one queue nor a fresh one per batch is flat.
+    """
+
+    def __init__(self):
+        self.pending = deque()
+        self.in_progress = {}  # request id -> Request
+        self.unique_keys = set()  # Of the current batch
+        self.total_count = 0
+        self.handled_count = 0
+
+    async def next_batch(self):
+        self.unique_keys = {request.unique_key for request in [*self.pending, *self.in_progress.values()]}
+
+    async def add_request(self, request, *, forefront=False):
+        if isinstance(request, str):
+            request = Request.from_url(request)
+        present = request.unique_key in self.unique_keys
+        if not present:
+            self.unique_keys.add(request.unique_key)
+            self.total_count += 1
+            if forefront:
+                self.pending.appendleft(request)
+            else:
+                self.pending.append(request)
+        return ProcessedRequest(
+            id=request.id, unique_key=request.unique_key, was_already_present=present, was_already_handled=False
+        )
+
+    async def add_requests_batched(self, requests, **kwargs):
+        for request in requests:
+            await self.add_request(request)
+
+    async def reclaim_request(self, request, *, forefront=False):
+        self.in_progress.pop(request.id, None)
+        if forefront:
+            self.pending.appendleft(request)
+        else:
+            self.pending.append(request)
+        return ProcessedRequest(
+            id=request.id, unique_key=request.unique_key, was_already_present=True, was_already_handled=False
+        )
+
+    async def fetch_next_request(self):
+        if not self.pending:
+            return None
+        request = self.pending.popleft()
+        self.in_progress[request.id] = request
+        return request
+
+    async def mark_request_as_handled(self, request):
+        if self.in_progress.pop(request.id, None) is None:
+            return None
+        if request.handled_at is None:
+            request.handled_at = datetime.now(timezone.utc)
+        self.handled_count += 1
+        return ProcessedRequest(
+            id=request.id, unique_key=request.unique_key, was_already_present=True, was_already_handled=False
+        )
+
+    async def is_empty(self):
+        return not self.pending
+
+    async def is_finished(self):
+        return not self.pending and not self.in_progress
+
+    async def get_total_count(self):
+        return self.total_count
+
+    async def get_handled_count(self):
+        return self.handled_count
+
+    async def drop(self):
+        self.pending.clear()
+        self.in_progress.clear()
+        self.unique_keys.clear()
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, dir=os.path.dirname(path), suffix='.tmp') as f:
+        json.dump(data, f, default=str)
+        temp_path = f.name
+    os.replace(temp_path, path)
+
+
+class StorageSnapshotter:
+    """
+    Periodically writes what an in-memory storage client holds to `directory`: per request queue
+    its counts and pending requests, per key-value store its JSON records. Queries are durable in
+    the task spreader and the local query cache, the snapshots are for looking into a live or
+    crashed crawler, at a fraction of the writes of the "disk" mode.
+    """
+
+    def __init__(self, storage_client, directory, interval=60, request_managers=None, chunk_size=500):
+        self.storage_client = storage_client
+        self.directory = directory
+        self.interval = interval
+        self.request_managers = request_managers or {}  # name -> BatchRequestQueue
+        self.chunk_size = chunk_size
+        self.snapshots = 0
+        self.last_snapshot_seconds = None
+        self.errors = 0
+
+    async def collect(self):
+        """
+        Snapshot contents. Only pending requests are serialized, `chunk_size` at a time with the
+        event loop running in between, so a queue full of handled requests doesn't stall it.
+        """
+        request_queues = {}
+        for name, manager in self.request_managers.items():
+            requests = [*manager.pending, *manager.in_progress.values()]
+            request_queues[name] = {
+                'handled_request_count': manager.handled_count,
+                'pending_request_count': len(requests),
+                'pending': await self._dump(requests),
+            }
+        for queue in self.storage_client.request_queues_handled:
+            # dict's own view, a C-level copy of the references rather than the sorted dict's iteration
+            internals = list(dict.values(queue.requests))
+            request_queues[queue.name or queue.id] = {
+                'handled_request_count': queue.handled_request_count,
+                'pending_request_count': queue.pending_request_count,
+                'pending': await self._dump(internal.request for internal in internals if internal.handled_at is None),
+            }
+        key_value_stores = {}
+        for store in self.storage_client.key_value_stores_handled:
+            records = {}
+            for key, record in store.records.items():
+                if 'application/json' in (record.content_type or ''):
+                    value = record.value
+                    records[key] = json.loads(value) if isinstance(value, (bytes, str)) else value
+            key_value_stores[store.name or store.id] = records
+        return {'request_queues': request_queues, 'key_value_stores': key_value_stores}
+
+    async def _dump(self, requests):
+        dumped = []
+        requests = iter(requests)
+        while chunk := list(itertools.islice(requests, self.chunk_size)):
+            dumped += [request.model_dump(mode='json', by_alias=True) for request in chunk]
+            await asyncio.sleep(0)
+        return dumped
+
+    def write(self, snapshot):
+        for kind, storages in snapshot.items():
+            for name, data in storages.items():
+                _write_json(os.path.join(self.directory, kind, f"{name}.json"), data)
+
+    async def snapshot(self):
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.write, await self.collect())
+        except Exception as e:
+            self.errors += 1
+            print(f"[WARNING] crawlee storage snapshot to {self.directory} failed: {e}")
+            return
+        self.snapshots += 1
+        self.last_snapshot_seconds = round(time.perf_counter() - started, 3)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.snapshot()
+
+    def stats(self):
+        return {
+            'snapshots': self.snapshots,
+            'last_snapshot_seconds': self.last_snapshot_seconds,
+            'errors': self.errors,
+        }
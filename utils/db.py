@@ -1,15 +1,21 @@
+import os
 import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv('.env')
 
 # Connection details
-host = "82.112.254.77"
-user = "supernova"
-password = "TRAwir515025"
+host = os.getenv("PG_HOST", "localhost")
+port = int(os.getenv("PG_PORT", 5432))
+user = os.getenv("PG_USER", "postgres")
+password = os.getenv("PG_PASSWORD")
 database = "postgres"  # Connect to a default DB to access others
 
 try:
     # Connect to the PostgreSQL server
     conn = psycopg2.connect(
         host=host,
+        port=port,
         user=user,
         password=password,
         dbname=database
@@ -6,3 +6,18 @@ class Status(Enum):
   IN_PROGRESS = 'in_progress'
   PROCESSED = 'processed'
   FAILED = 'failed'
+
+
+class PageVerdict(Enum):
+  OK = 'ok'
+  CONSENT = 'consent'
+  CAPTCHA = 'captcha'
+  BLOCKED = 'blocked'
+  EMPTY = 'empty'
+
+
+class FailureReason(Enum):
+  TIMEOUT = 'timeout'
+  BLOCK = 'block'
+  PARSE = 'parse'
+  NAVIGATION = 'navigation'
@@ -0,0 +1,66 @@
+import time
+import asyncio
+from collections import Counter
+
+# A place always gets its core tier, the others only while its budget lasts
+TIERS = ('core', 'about', 'photos', 'reviews')
+
+
+class ExtractionBudget:
+    """
+    Time budget of one place. Optional tiers run with `run(tier, extract, default)` under
+    whatever is left of the budget: a tier is skipped when less than `min_tier_seconds` are left,
+    and cut off when the budget runs out while it runs. A failing optional tier is logged and
+    left out instead of failing the place. The record says which tiers it holds and why the
+    others are missing, so they can be filled by a later pass.
+    """
+
+    def __init__(self, seconds, min_tier_seconds=2, outcomes=None):
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds
+        self.min_tier_seconds = min_tier_seconds
+        self.outcomes = outcomes if outcomes is not None else Counter()  # (tier, outcome) -> places
+        self.tiers = []
+        self.missing = {}  # tier -> skipped, timeout or error
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def done(self, tier):
+        """Marks a tier extracted outside `run`, the core tier is never cut off."""
+        self.tiers.append(tier)
+        self.outcomes[(tier, 'extracted')] += 1
+
+    async def run(self, tier, extract, default=None):
+        """Awaits `extract()` within the remaining budget, returns its result or `default`."""
+        remaining = self.remaining()
+        if remaining < self.min_tier_seconds:
+            return self._miss(tier, 'skipped', default)
+        try:
+            result = await asyncio.wait_for(extract(), remaining)
+        except asyncio.TimeoutError:
+            return self._miss(tier, 'timeout', default)
+        except Exception as e:
+            print(f"Extracting {tier} failed: {e}")
+            return self._miss(tier, 'error', default)
+        self.done(tier)
+        return result
+
+    def _miss(self, tier, reason, default):
+        self.missing[tier] = reason
+        self.outcomes[(tier, reason)] += 1
+        return default
+
+    def annotate(self, record):
+        record['tiers'] = list(self.tiers)
+        record['tiers_missing'] = dict(self.missing)
+        record['extraction_seconds'] = round(time.monotonic() - self.started, 1)
+        return record
+
+
+def tier_stats(outcomes):
+    """Places per tier and outcome, for register_stats."""
+    stats = {}
+    for (tier, outcome), places in outcomes.items():
+        stats.setdefault(tier, {})[outcome] = places
+    return {tier: stats[tier] for tier in TIERS if tier in stats}
@@ -0,0 +1,46 @@
+import time
+import random
+import asyncio
+
+
+class HostThrottle:
+    """
+    Per-host adaptive backoff. Every block doubles the delay between requests to that host
+    (up to `max_delay`), every success shrinks it again by `decay` until it drops back to zero.
+    """
+
+    def __init__(self, base_delay=5, max_delay=600, decay=0.5):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.decay = decay
+        self.delays = {}
+        self.next_allowed_at = {}
+        self.blocks = {}
+
+    async def wait(self, host):
+        while True:
+            remaining = self.next_allowed_at.get(host, 0) - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+        delay = self.delays.get(host, 0)
+        if delay:
+            # Spread requests of concurrent tabs over the delay instead of releasing them together
+            self.next_allowed_at[host] = time.monotonic() + delay * random.uniform(0.5, 1.5)
+
+    def record_block(self, host):
+        delay = min(self.max_delay, max(self.base_delay, self.delays.get(host, 0) * 2))
+        self.delays[host] = delay
+        self.next_allowed_at[host] = time.monotonic() + delay
+        self.blocks[host] = self.blocks.get(host, 0) + 1
+        print(f"[WARNING] {host} is blocking, backing off for {delay:.0f}s")
+
+    def record_success(self, host):
+        delay = self.delays.get(host, 0) * self.decay
+        self.delays[host] = delay if delay >= 1 else 0
+
+    def stats(self):
+        return {
+            'delays': {host: round(delay, 1) for host, delay in self.delays.items() if delay},
+            'blocks': dict(self.blocks),
+        }
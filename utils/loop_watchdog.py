@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import Counter, deque
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def call_site(frame):
+    """Innermost frame of this repository's code (else the innermost frame) as `file:line function`."""
+    innermost = frame
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(REPO_ROOT) and 'loop_watchdog' not in frame.f_code.co_filename:
+            break
+        frame = frame.f_back
+    frame = frame or innermost
+    filename = frame.f_code.co_filename
+    if filename.startswith(REPO_ROOT):
+        filename = os.path.relpath(filename, REPO_ROOT)
+    return f"{filename}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag with a task that sleeps `interval` and checks how late it wakes up.
+    A watcher thread notices when the loop hasn't ticked for `threshold` seconds and captures
+    the loop thread's stack while it is still blocked, so the stall is attributed to the
+    synchronous call that caused it. Stalls are counted per call site.
+    """
+
+    def __init__(self, interval=0.1, threshold=0.25, recent=20):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags = deque(maxlen=1000)
+        self.max_lag = 0.0
+        self.stalls = Counter()
+        self.recent_stalls = deque(maxlen=recent)
+        self._last_tick = time.monotonic()
+        self._pending_stall = None
+        self._loop_thread = None
+
+    async def run(self):
+        self._loop_thread = threading.get_ident()
+        self._last_tick = time.monotonic()
+        watcher = threading.Thread(target=self._watch, name='loop-lag-watcher', daemon=True)
+        watcher.start()
+        try:
+            while True:
+                started = time.monotonic()
+                await asyncio.sleep(self.interval)
+                self._last_tick = time.monotonic()
+                lag = self._last_tick - started - self.interval
+                self.lags.append(lag)
+                self.max_lag = max(self.max_lag, lag)
+                stall, self._pending_stall = self._pending_stall, None
+                if stall:
+                    stall['lag_ms'] = round(lag * 1000)
+                    self.stalls[stall['site']] += 1
+                    self.recent_stalls.append(stall)
+                    print(f"[WARNING] Event loop blocked for {stall['lag_ms']} ms at {stall['site']}")
+        finally:
+            self._loop_thread = None
+
+    def _watch(self):
+        while self._loop_thread is not None:
+            time.sleep(self.threshold / 2)
+            blocked_for = time.monotonic() - self._last_tick - self.interval
+            if blocked_for < self.threshold or self._pending_stall:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self._pending_stall = {
+                'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'site': call_site(frame),
+                'stack': traceback.format_stack(frame)[-12:],
+            }
+
+    def stats(self):
+        ordered = sorted(self.lags)
+        return {
+            'p50_lag_ms': round(ordered[len(ordered) // 2] * 1000, 1) if ordered else None,
+            'p99_lag_ms': round(ordered[int(len(ordered) * 0.99)] * 1000, 1) if ordered else None,
+            'max_lag_ms': round(self.max_lag * 1000, 1),
+            'stalls_by_site': dict(self.stalls.most_common()),
+            'recent_stalls': list(self.recent_stalls),
+        }
+
+
+class WatchedPage:
+    def __init__(self, page, url):
+        self.page = page
+        self.url = url
+        self.stage_name = 'start'
+        self.stage_started = time.monotonic()
+        self.closed_by_watchdog = False
+
+    def stage(self, name):
+        self.stage_name = name
+        self.stage_started = time.monotonic()
+
+
+class PageWatchdog:
+    """
+    Tracks the current stage of every page handler and force-closes pages that stay in a
+    stage longer than its deadline, so a page stuck in a never-resolving call fails fast and
+    frees its slot instead of holding it until the request handler timeout.
+    `deadline` maps a stage name to seconds.
+    """
+
+    def __init__(self, deadline, check_interval=1):
+        self.deadline = deadline
+        self.check_interval = check_interval
+        self.active = set()
+        self.closed = Counter()
+
+    def start(self, page, url):
+        watched = WatchedPage(page, url)
+        self.active.add(watched)
+        return watched
+
+    def finish(self, watched):
+        self.active.discard(watched)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            now = time.monotonic()
+            for watched in list(self.active):
+                if watched.closed_by_watchdog or now - watched.stage_started <= self.deadline(watched.stage_name):
+                    continue
+                watched.closed_by_watchdog = True
+                self.closed[watched.stage_name] += 1
+                print(f"[WARNING] Closing page stuck in {watched.stage_name} for "
+                      f"{now - watched.stage_started:.0f}s: {watched.url}")
+                try:
+                    await asyncio.wait_for(watched.page.close(), timeout=10)
+                except Exception as e:
+                    print(f"[WARNING] Could not close stuck page: {e}")
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            'active': [
+                {'url': watched.url, 'stage': watched.stage_name, 'elapsed_s': round(now - watched.stage_started, 1)}
+                for watched in self.active
+            ],
+            'closed_by_stage': dict(self.closed),
+        }
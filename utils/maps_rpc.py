@@ -0,0 +1,255 @@
+import re
+import json
+import asyncio
+from collections import Counter
+
+# Keep this module free of crawlee imports, the decoders are plain functions over parsed JSON
+
+# Every Maps RPC body starts with this anti-JSON-hijacking prefix
+XSSI_PREFIX = ")]}'"
+PLACE_RPC_PATHS = ('/maps/preview/place',)
+REVIEWS_RPC_PATHS = ('/maps/rpc/listugcposts', '/maps/preview/review/listentitiesreviews')
+# Page token of listugcposts (`!2s<token>` after the page size), offset of listentitiesreviews
+PAGE_TOKEN_PATTERN = re.compile(r"(!2m2!1i\d+!2s)([^!]*)")
+PAGE_OFFSET_PATTERN = re.compile(r"(!2m2!1i)(\d+)(!2i)(\d+)")
+# Review order of listugcposts, 1 is "most relevant" and 2 "newest"
+SORT_PATTERN = re.compile(r"!13m1!1e\d")
+
+
+def parse_body(text):
+    """Body of a Maps RPC response as JSON, None if it isn't one."""
+    if text.startswith(XSSI_PREFIX):
+        text = text[len(XSSI_PREFIX):]
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def get(data, *path):
+    """data[path[0]][path[1]]..., None as soon as an index is missing."""
+    for index in path:
+        try:
+            data = data[index]
+        except (IndexError, KeyError, TypeError):
+            return None
+    return data
+
+
+def _number(value, cast):
+    return cast(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def decode_place(data):
+    """
+    Place RPC payload (the array whose 7th element describes the place) as the overview fields
+    of crawler.process_business, None if the payload doesn't look like a place.
+    """
+    place = get(data, 6)
+    if not isinstance(place, list) or not isinstance(get(place, 11), str):
+        return None
+    categories = get(place, 13)
+    latitude, longitude = get(place, 9, 2), get(place, 9, 3)
+    open_hours = {}
+    for day in get(place, 34, 1) or []:
+        hours = get(day, 1)
+        if isinstance(get(day, 0), str) and isinstance(hours, list):
+            open_hours[day[0]] = ', '.join(hour for hour in hours if isinstance(hour, str))
+    return {
+        'title': place[11],
+        'star': _number(get(place, 4, 7), float),
+        'review_count': _number(get(place, 4, 8), int),
+        'category': categories[0] if isinstance(categories, list) and categories else None,
+        'address': get(place, 39) or ', '.join(get(place, 2) or []) or "",
+        'website': get(place, 7, 0),
+        'phone': get(place, 178, 0, 0),
+        'pluscode': get(place, 183, 2, 2, 0),
+        'coordinates': (
+            {'latitude': latitude, 'longitude': longitude}
+            if _number(latitude, float) is not None and _number(longitude, float) is not None else None
+        ),
+        'open_hours': open_hours,
+        'feature_id': get(place, 10),
+    }
+
+
+def _ugc_review(entry):
+    review = get(entry, 0)
+    name = get(review, 1, 4, 5, 0)
+    if not isinstance(name, str):
+        return None
+    rating = get(review, 2, 0, 0)
+    return {
+        'user': {
+            'name': name,
+            'link': get(review, 1, 4, 2, 0),
+            'thumbnail': get(review, 1, 4, 5, 1),
+            'localGuide': True if get(review, 1, 4, 5, 10, 0) else None,
+            'reviews': _number(get(review, 1, 4, 5, 5), int),
+        },
+        'rating': _number(rating, float),
+        'snippet': get(review, 2, 15, 0, 0),
+        'date': get(review, 1, 6),
+    }
+
+
+def _entity_review(entry):
+    name = get(entry, 0, 1)
+    if not isinstance(name, str):
+        return None
+    return {
+        'user': {
+            'name': name,
+            'link': get(entry, 0, 0),
+            'thumbnail': get(entry, 0, 2),
+            'localGuide': True if get(entry, 12, 1, 0) else None,
+            'reviews': _number(get(entry, 12, 1, 1), int),
+        },
+        'rating': _number(get(entry, 4), float),
+        'snippet': get(entry, 3),
+        'date': get(entry, 1),
+    }
+
+
+def decode_reviews(url, data):
+    """
+    Review page RPC payload as (reviews in the schema of crawler.process_reviews, next page URL),
+    None if it doesn't decode. Dates are left relative ("2 months ago") for the post-processing.
+    """
+    if '/listugcposts' in url:
+        entries, token = get(data, 2), get(data, 1)
+        decode_entry = _ugc_review
+        next_url = (
+            PAGE_TOKEN_PATTERN.sub(lambda m: m.group(1) + token, url, count=1)
+            if isinstance(token, str) and token and PAGE_TOKEN_PATTERN.search(url) else None
+        )
+    else:
+        entries = get(data, 2)
+        decode_entry = _entity_review
+        match = PAGE_OFFSET_PATTERN.search(url)
+        next_url = None
+        if match and isinstance(entries, list) and entries:
+            offset = int(match.group(2)) + len(entries)
+            next_url = PAGE_OFFSET_PATTERN.sub(lambda m: f"{m.group(1)}{offset}{m.group(3)}{m.group(4)}", url, count=1)
+    if entries is None and isinstance(data, list):
+        # A place without reviews, or past the last page
+        return [], None
+    if not isinstance(entries, list):
+        return None
+    reviews = [decode_entry(entry) for entry in entries]
+    if entries and not any(reviews):
+        return None
+    return [review for review in reviews if review], next_url
+
+
+def newest_first(url):
+    """Same review RPC URL, sorted by newest if the URL carries an order."""
+    return SORT_PATTERN.sub('!13m1!1e2', url, count=1)
+
+
+class RpcCapture:
+    """
+    Captures the place and review RPC responses of one page through `page.on("response")`.
+    Bodies are read lazily, only for the URLs the decoders understand, and the first review
+    page is exposed as a future so the handler can wait for it after opening the Reviews tab.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.place_bodies = []
+        self.first_reviews = asyncio.get_running_loop().create_future()
+        page.on("response", self._on_response)
+
+    async def _on_response(self, response):
+        url = response.url
+        is_place = any(path in url for path in PLACE_RPC_PATHS)
+        is_reviews = not self.first_reviews.done() and any(path in url for path in REVIEWS_RPC_PATHS)
+        if not (is_place or is_reviews) or response.status != 200:
+            return
+        try:
+            body = parse_body(await response.text())
+        except Exception:
+            # The page navigated or closed before the body was read
+            return
+        if body is None:
+            return
+        if is_place:
+            self.place_bodies.append(body)
+        elif not self.first_reviews.done():
+            self.first_reviews.set_result((url, body))
+
+    async def place(self, feature_id=None):
+        """
+        Decoded overview of the place `feature_id`, or of the latest place response without one.
+        A page opened directly on a place URL gets its place payload inlined in the document
+        instead of a separate response, it is read from the page's initialization state then.
+        None if nothing decodes, or if no payload is of `feature_id`: the latest one can be a
+        stale panel or a nearby result, the DOM is read instead.
+        """
+        places = [place for place in map(decode_place, reversed(self.place_bodies)) if place]
+        if not places or (feature_id and not any(self._is_place(place, feature_id) for place in places)):
+            try:
+                state = await self.page.evaluate("() => window.APP_INITIALIZATION_STATE?.[3]?.[6]")
+            except Exception:
+                state = None
+            place = decode_place(parse_body(state)) if isinstance(state, str) else None
+            if place:
+                places.append(place)
+        if feature_id:
+            return next((place for place in places if self._is_place(place, feature_id)), None)
+        return places[0] if places else None
+
+    @staticmethod
+    def _is_place(place, feature_id):
+        return str(place['feature_id']).lower() == feature_id.lower()
+
+    async def reviews(self, timeout, max_pages=30, stop=None):
+        """
+        Reviews from the first captured review page, then from the following pages fetched
+        directly with the page's cookies. `stop(reviews)` ends the paging early. None if no
+        page was captured in time or the first one doesn't decode.
+        """
+        try:
+            url, body = await asyncio.wait_for(asyncio.shield(self.first_reviews), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if newest_first(url) != url:
+            # The tab opened on "most relevant", the first page is fetched again sorted by newest
+            url = newest_first(url)
+            body = await self._fetch(url)
+        decoded = decode_reviews(url, body) if body is not None else None
+        if decoded is None:
+            return None
+        reviews, next_url = decoded
+        pages = 1
+        while next_url and pages < max_pages and not (stop and stop(reviews)):
+            body = await self._fetch(next_url)
+            decoded = decode_reviews(next_url, body) if body is not None else None
+            if decoded is None:
+                # Keep what decoded so far rather than starting over in the DOM
+                break
+            page_reviews, next_url = decoded
+            reviews.extend(page_reviews)
+            pages += 1
+        return reviews
+
+    async def _fetch(self, url):
+        # APIRequestContext of the page's browser context, it sends the same cookies as the page
+        response = await self.page.request.get(url)
+        return parse_body(await response.text()) if response.ok else None
+
+    def close(self):
+        self.page.remove_listener("response", self._on_response)
+
+
+class RpcStats:
+    """Counts how often each kind of data came from the RPC responses vs the DOM fallback."""
+
+    def __init__(self):
+        self.sources = Counter()
+
+    def record(self, kind, source):
+        self.sources[f"{kind}_{source}"] += 1
+
+    def stats(self):
+        return dict(self.sources)
@@ -0,0 +1,144 @@
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qsl, unquote, unquote_plus, urlencode, urlsplit
+
+# Keep this module free of crawlee/playwright imports, it is used by the post-processing workers
+
+# Query parameters that only track where a link was opened from, they never change what a URL shows
+TRACKING_PARAMS = {'entry', 'g_ep', 'g_st', 'ved', 'ei', 'sa', 'source', 'authuser'}
+
+
+class PlaceRef(NamedTuple):
+    """What a Google Maps URL says about a place."""
+    name: Optional[str] = None
+    feature_id: Optional[str] = None  # 0x<cell>:0x<cid>, lowercased
+    cid: Optional[int] = None  # Customer id, the decimal of the feature id's second half
+    kg_id: Optional[str] = None  # !16s id, e.g. /g/11b6... or ;m;89187155
+    latitude: Optional[float] = None  # Pin (!3d!4d)
+    longitude: Optional[float] = None
+    viewport_latitude: Optional[float] = None  # Map center (@lat,lng)
+    viewport_longitude: Optional[float] = None
+    zoom: Optional[float] = None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _token(data, marker):
+    """Value of the first !<marker> token in data=, up to the next `!`."""
+    start = data.find(marker)
+    if start < 0:
+        return None
+    start += len(marker)
+    end = data.find('!', start)
+    return data[start:end] if end >= 0 else data[start:]
+
+
+def decode(url):
+    """
+    Decodes a Maps URL into a PlaceRef. Accepts /maps/place/<name>/@lat,lng,zoom/data=!...,
+    /maps?cid=... and variants with extra path segments or query strings. Fields are located
+    with str.find instead of regexes or a full tokenization of data=, as this runs for every
+    lookup of a query or place.
+    """
+    fields = {}
+    url, _, query = url.partition('?')
+    if query:
+        for param in query.split('&'):
+            key, _, value = param.partition('=')
+            if key == 'cid' and value.isdigit():
+                fields['cid'] = int(value)
+
+    path, _, data = url.partition('/data=')
+    data = '!' + data.partition('/')[0] if data else ''
+
+    start = path.find('/place/')
+    if start >= 0:
+        name = path[start + 7:].partition('/')[0]
+        if name and not name.startswith('@'):
+            fields['name'] = unquote_plus(name)
+    start = path.find('/@')
+    if start >= 0:
+        parts = path[start + 2:].partition('/')[0].split(',')
+        if len(parts) >= 2:
+            fields['viewport_latitude'] = _float(parts[0])
+            fields['viewport_longitude'] = _float(parts[1])
+        if len(parts) >= 3 and parts[2].endswith('z'):
+            fields['zoom'] = _float(parts[2][:-1])
+
+    if data:
+        feature_id = _token(data, '!1s0x')
+        if feature_id and ':0x' in feature_id:
+            feature_id = '0x' + feature_id.lower()
+            fields['feature_id'] = feature_id
+            if 'cid' not in fields:
+                try:
+                    fields['cid'] = int(feature_id.partition(':')[2], 16)
+                except ValueError:
+                    pass
+        latitude, longitude = _token(data, '!3d'), _token(data, '!4d')
+        if latitude and longitude:
+            fields['latitude'] = _float(latitude)
+            fields['longitude'] = _float(longitude)
+        kg_id = _token(data, '!16s')
+        if kg_id:
+            # Ids are /g/... or ;m;..., the two escapes are replaced directly as unquote is slow
+            kg_id = kg_id.replace('%2F', '/').replace('%3B', ';')
+            fields['kg_id'] = unquote(kg_id) if '%' in kg_id else kg_id
+    return PlaceRef(**fields)
+
+
+def place_key(url):
+    """
+    Stable key of the place a URL points to, the same for every variant (zoom, viewport,
+    tracking segments) of its URL and for its canonical URL: `cid:<cid>` when the URL has a
+    feature id or a cid, else the !16s id, else the canonical URL.
+    """
+    # Fast path, most URLs carry a feature id and the hex after its `:0x` is the cid
+    start = url.find('!1s0x')
+    if start >= 0:
+        colon = url.find(':0x', start)
+        end = url.find('!', start + 1)
+        if colon >= 0 and not 0 <= end < colon:
+            cid = url[colon + 3:end] if end >= 0 else url[colon + 3:].partition('?')[0].partition('/')[0]
+            try:
+                return f"cid:{int(cid, 16)}"
+            except ValueError:
+                pass
+    ref = decode(url)
+    if ref.cid:
+        return f"cid:{ref.cid}"
+    if ref.kg_id:
+        return ref.kg_id
+    return canonical_url(url, ref)
+
+
+def canonical_url(url, ref=None):
+    """Shortest URL that opens the same place."""
+    ref = ref or decode(url)
+    if ref.cid:
+        return f"https://www.google.com/maps?cid={ref.cid}"
+    if ref.feature_id:
+        return f"https://www.google.com/maps/place/data=!4m2!3m1!1s{ref.feature_id}"
+    # Nothing identifies a place (a search, a map view): the viewport and the query decide what it
+    # shows, only the tracking parameters and the fragment are dropped
+    parts = urlsplit(url)
+    params = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name not in TRACKING_PARAMS and not name.startswith('utm_')
+    )
+    query = f"?{urlencode(params)}" if params else ''
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path}{query}"
+
+
+def get_coordinates(url):
+    """The place's pin if the URL has one, else the viewport center."""
+    ref = decode(url)
+    if ref.latitude is not None and ref.longitude is not None:
+        return {'latitude': ref.latitude, 'longitude': ref.longitude}
+    if ref.viewport_latitude is not None and ref.viewport_longitude is not None:
+        return {'latitude': ref.viewport_latitude, 'longitude': ref.viewport_longitude}
+    return None
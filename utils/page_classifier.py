@@ -0,0 +1,57 @@
+import re
+import asyncio
+
+from utils.enums import PageVerdict
+
+# Verdicts that mean the session is burned and the host should be backed off
+BLOCK_VERDICTS = (PageVerdict.CAPTCHA, PageVerdict.BLOCKED)
+
+PLACE_SELECTOR = "h1"
+# Elements of Google's interstitials, waited for together with the place title so a wall is seen at once
+BLOCK_SELECTOR = "form#captcha-form, div#recaptcha, iframe[src*='recaptcha'], div.g-recaptcha"
+CAPTCHA_PATTERN = re.compile(
+    r"unusual traffic|recaptcha|detected unusual|not a robot|/sorry/index",
+    re.IGNORECASE
+)
+BLOCKED_STATUS_CODES = (403, 429, 503)
+
+
+def classify_page(url, html, status=None):
+    """Classify a loaded page from its final URL, HTML and HTTP status."""
+    if 'consent.google.com' in url:
+        return PageVerdict.CONSENT
+    if '/sorry/' in url or CAPTCHA_PATTERN.search(html or ''):
+        return PageVerdict.CAPTCHA
+    if status in BLOCKED_STATUS_CODES:
+        return PageVerdict.BLOCKED
+    if not html or '<h1' not in html:
+        return PageVerdict.EMPTY
+    return PageVerdict.OK
+
+
+async def wait_for_place_or_block(page, timeout=60_000, status=None):
+    """
+    Wait until either the place panel or a block page shows up and classify the result,
+    instead of waiting the full timeout for an h1 that will never come. `status` is the HTTP
+    status of the page load, a blocking status is classified at once whatever the page shows.
+    """
+    if status in BLOCKED_STATUS_CODES:
+        return classify_page(page.url, await _content(page), status)
+    try:
+        await page.wait_for_selector(f"{PLACE_SELECTOR}, {BLOCK_SELECTOR}", timeout=timeout)
+    except Exception:
+        pass
+    if 'consent.google.com' in page.url or '/sorry/' in page.url:
+        return classify_page(page.url, '', status)
+    if await page.query_selector(BLOCK_SELECTOR):
+        return PageVerdict.CAPTCHA
+    if await page.query_selector(PLACE_SELECTOR):
+        return PageVerdict.OK
+    return classify_page(page.url, await _content(page), status)
+
+
+async def _content(page):
+    try:
+        return await asyncio.wait_for(page.content(), timeout=10)
+    except Exception:
+        return ''
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections import Counter, deque
+
+
+class PooledPage:
+    def __init__(self, page, key=None):
+        self.page = page
+        self.key = key  # Session and proxy the page was created for, see PagePool.checkout
+        self.uses = 0
+        self.healthy = True  # Cleared by the request handler when the page is left in an unknown state
+        self.warm = False  # Used by WarmTabPool, the page has the Maps app loaded
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else None
+
+
+class PagePool:
+    """
+    Pages that are set up once (context, cookies, routes, viewport, init scripts) and reused
+    across requests. `create(**kwargs)` opens a page and `setup(page)` prepares it, both async. On
+    checkout an idle page with the same key (the session and proxy it was created for) is health
+    checked, on release it is reset with `reset(page)` and goes back to the pool, or is closed once
+    it served `max_uses` requests, failed its health check or reset, was released unhealthy, or once
+    `usable(page)` says its browser was retired. At most `max_idle` pages are kept idle.
+    Setup time saved is estimated as the mean create + setup time times the number of reuses.
+    """
+
+    def __init__(self, create, setup=None, reset=None, usable=None, max_uses=50, max_idle=4, health_timeout=2):
+        self.create = create
+        self.setup = setup
+        self.reset = reset
+        self.usable = usable
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+        self.health_timeout = health_timeout
+        self.idle = []  # Oldest first
+        self.entries = set()
+        self.created = 0
+        self.reused = 0
+        self.recycled = Counter()
+        self.setup_ms = deque(maxlen=200)
+        self.checkout_ms = deque(maxlen=500)
+
+    async def checkout(self, key=None, **create_kwargs):
+        started = time.perf_counter()
+        entry = None
+        while entry is None:
+            # Most recently used first, its renderer is the most likely to still be warm
+            candidate = next((idle for idle in reversed(self.idle) if idle.key == key), None)
+            if candidate is None:
+                break
+            self.idle.remove(candidate)
+            if self.usable and not self.usable(candidate.page):
+                self.recycled['retired'] += 1
+                await self._close(candidate)
+            elif await self._healthy(candidate.page):
+                entry = candidate
+                self.reused += 1
+            else:
+                self.recycled['health_check'] += 1
+                await self._close(candidate)
+        if entry is None:
+            entry = PooledPage(await self.create(**create_kwargs), key)
+            self.entries.add(entry)
+            try:
+                if self.setup:
+                    await self.setup(entry.page)
+            except Exception:
+                await self._close(entry)
+                raise
+            self.created += 1
+            self.setup_ms.append((time.perf_counter() - started) * 1000)
+        entry.uses += 1
+        entry.healthy = True
+        self.checkout_ms.append((time.perf_counter() - started) * 1000)
+        return entry
+
+    async def release(self, entry, healthy=True):
+        if entry.page.is_closed():
+            reason = 'closed'
+        elif not (healthy and entry.healthy):
+            reason = 'unhealthy'
+        elif self.usable and not self.usable(entry.page):
+            reason = 'retired'
+        elif entry.uses >= self.max_uses:
+            reason = 'max_uses'
+        else:
+            try:
+                if self.reset:
+                    await self.reset(entry.page)
+            except Exception:
+                reason = 'reset'
+            else:
+                self.idle.append(entry)
+                while len(self.idle) > self.max_idle:
+                    self.recycled['idle_overflow'] += 1
+                    await self._close(self.idle.pop(0))
+                return
+        self.recycled[reason] += 1
+        await self._close(entry)
+
+    def entry_for(self, page):
+        return next((entry for entry in self.entries if entry.page is page), None)
+
+    def owns(self, page):
+        return self.entry_for(page) is not None
+
+    async def close(self):
+        for entry in list(self.entries):
+            await self._close(entry)
+        self.idle = []
+
+    async def _healthy(self, page):
+        if page.is_closed():
+            return False
+        try:
+            # A round trip to the renderer, a crashed or hung page doesn't answer
+            return await asyncio.wait_for(page.evaluate("1"), self.health_timeout) == 1
+        except Exception:
+            return False
+
+    async def _close(self, entry):
+        self.entries.discard(entry)
+        try:
+            await entry.page.close()
+        except Exception:
+            pass  # Already closed along with its browser
+
+    def stats(self):
+        mean_setup_ms = sum(self.setup_ms) / len(self.setup_ms) if self.setup_ms else 0
+        checkout_p50, checkout_p95 = percentile(self.checkout_ms, 50), percentile(self.checkout_ms, 95)
+        return {
+            'open_pages': len(self.entries),
+            'idle_pages': len(self.idle),
+            'created': self.created,
+            'reused': self.reused,
+            'recycled': dict(self.recycled),
+            'checkout_p50_ms': round(checkout_p50, 1) if checkout_p50 is not None else None,
+            'checkout_p95_ms': round(checkout_p95, 1) if checkout_p95 is not None else None,
+            'mean_setup_ms': round(mean_setup_ms, 1),
+            'setup_saved_s': round(self.reused * mean_setup_ms / 1000, 1),
+        }
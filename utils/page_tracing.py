@@ -0,0 +1,111 @@
+import os
+import re
+import time
+import random
+import asyncio
+from collections import Counter
+
+
+class Trace:
+    def __init__(self, browser_context, url):
+        self.browser_context = browser_context
+        self.url = url
+        self.started = time.perf_counter()
+
+
+def trace_slug(url, limit=60):
+    return re.sub(r'[^A-Za-z0-9]+', '-', url.split('/maps/place/', 1)[-1]).strip('-')[:limit] or 'page'
+
+
+class PageTracer:
+    """
+    Playwright tracing for a `sample_rate` fraction of the pages. A trace (screenshots, DOM
+    snapshots, network and every Playwright call) is only written to `directory` when its request
+    failed or took longer than `latency_threshold` seconds, otherwise it is dropped. Kept traces
+    are deleted oldest first once they take more than `max_bytes`. Open them with
+    `playwright show-trace <file>`.
+
+    Tracing is per browser context and a context traces one session at a time, so a page whose
+    context is already traced is not sampled. Pages sharing the context show up in the trace too.
+    """
+
+    def __init__(self, directory='traces', sample_rate=0.05, latency_threshold=30, max_bytes=500 * 1024 * 1024):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.latency_threshold = latency_threshold
+        self.max_bytes = max_bytes
+        self.tracing_contexts = set()
+        self.counts = Counter()  # started, busy, kept_failed, kept_slow, dropped, errors, rotated
+
+    async def start(self, page, url):
+        """Starts tracing the page's context if it is sampled, returns the Trace to finish or None."""
+        if random.random() >= self.sample_rate:
+            return None
+        browser_context = page.context
+        if browser_context in self.tracing_contexts:
+            self.counts['busy'] += 1
+            return None
+        try:
+            await browser_context.tracing.start(title=url, screenshots=True, snapshots=True)
+        except Exception as e:
+            self.counts['errors'] += 1
+            print(f"[WARNING] Could not start tracing {url}: {e}")
+            return None
+        self.tracing_contexts.add(browser_context)
+        self.counts['started'] += 1
+        return Trace(browser_context, url)
+
+    async def finish(self, trace, failed):
+        """Stops the trace, writes it if the request failed or was slow. Returns the path written or None."""
+        elapsed = time.perf_counter() - trace.started
+        reason = 'failed' if failed else 'slow' if elapsed >= self.latency_threshold else None
+        path = None
+        if reason:
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{reason}-{round(elapsed)}s-{trace_slug(trace.url)}.zip"
+            path = os.path.join(self.directory, name)
+        try:
+            if path:
+                os.makedirs(self.directory, exist_ok=True)
+                await trace.browser_context.tracing.stop(path=path)
+            else:
+                await trace.browser_context.tracing.stop()
+        except Exception as e:
+            self.counts['errors'] += 1
+            print(f"[WARNING] Could not stop tracing {trace.url}: {e}")
+            return None
+        finally:
+            self.tracing_contexts.discard(trace.browser_context)
+        if not path:
+            self.counts['dropped'] += 1
+            return None
+        self.counts[f'kept_{reason}'] += 1
+        await asyncio.to_thread(self.rotate)
+        return path
+
+    def rotate(self):
+        """Deletes the oldest traces until the kept ones fit in max_bytes."""
+        try:
+            traces = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.zip')]
+            traces.sort(key=lambda entry: entry.stat().st_mtime)
+            total = sum(entry.stat().st_size for entry in traces)
+            for entry in traces:
+                if total <= self.max_bytes:
+                    break
+                total -= entry.stat().st_size
+                os.remove(entry.path)
+                self.counts['rotated'] += 1
+        except OSError as e:
+            print(f"[WARNING] Could not rotate traces in {self.directory}: {e}")
+
+    def disk_bytes(self):
+        try:
+            return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.zip'))
+        except OSError:
+            return 0
+
+    def stats(self):
+        return {
+            **self.counts,
+            'tracing': len(self.tracing_contexts),
+            'disk_mb': round(self.disk_bytes() / 1024 / 1024, 1),
+        }
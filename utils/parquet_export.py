@@ -0,0 +1,168 @@
+import os
+import re
+import time
+import uuid
+import queue
+import threading
+
+# Flat columns and their Arrow types, the nested ones are declared in get_schema
+SCALAR_COLUMNS = {
+    'query_id': 'int64',
+    'place_key': 'string',
+    'title': 'string',
+    'category': 'string',
+    'address': 'string',
+    'phone': 'string',
+    'website': 'string',
+    'email': 'string',
+    'star_rating': 'float64',
+    'review_count': 'int64',
+    'price_level': 'string',
+    'current_status': 'string',
+    'source_url': 'string',
+    'last_review_date': 'string',
+    'scraped_at': 'string',
+}
+PARTITION_COLUMNS = ('country', 'industry', 'scrape_date')
+
+
+def get_schema():
+    import pyarrow as pa
+    fields = [pa.field(name, getattr(pa, type_name)()) for name, type_name in SCALAR_COLUMNS.items()]
+    fields += [
+        pa.field('social_links', pa.list_(pa.string())),
+        pa.field('coordinates', pa.struct([('latitude', pa.float64()), ('longitude', pa.float64())])),
+        pa.field('open_hours', pa.map_(pa.string(), pa.string())),
+        pa.field('review_summary', pa.struct([('total', pa.int64()), ('avg_rating', pa.float64())])),
+    ]
+    return pa.schema(fields)
+
+
+def _number(value, cast):
+    try:
+        return cast(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def to_export_row(query_id, record):
+    """Record of fetcher.py or crawler.py as a row of the export schema."""
+    row = {}
+    for name, type_name in SCALAR_COLUMNS.items():
+        value = record.get(name)
+        if type_name == 'float64':
+            value = _number(value, float)
+        elif type_name == 'int64':
+            value = _number(value, int)
+        elif value is not None:
+            value = str(value)
+        row[name] = value
+    row['query_id'] = _number(query_id, int)
+    row['source_url'] = row['source_url'] or record.get('url')
+    row['star_rating'] = row['star_rating'] if row['star_rating'] is not None else _number(record.get('star'), float)
+    row['social_links'] = list(record.get('social_links') or [])
+    row['coordinates'] = record.get('coordinates') or None
+    row['open_hours'] = list((record.get('open_hours') or {}).items())
+    summary = record.get('review_summary') or {}
+    row['review_summary'] = {'total': summary.get('total'), 'avg_rating': summary.get('avg_rating')} if summary else None
+    return row
+
+
+def partition_value(value):
+    return re.sub(r"[^\w.-]+", '_', str(value)) if value not in (None, '') else '__unknown__'
+
+
+class ParquetExporter:
+    """
+    Writes scraped records as Parquet files under `<root>/country=../industry=../scrape_date=../`,
+    with nested columns for social links, coordinates, open hours and the review summary.
+    `add` only enqueues, a background thread buffers rows per partition and writes a file once
+    a partition has `batch_size` rows or `flush_interval` seconds passed. Requires `pyarrow`.
+    """
+
+    def __init__(self, root, batch_size=5000, flush_interval=60, compression='zstd'):
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise Exception("The Parquet export requires pyarrow (pip install pyarrow)")
+        self.root = root
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compression = compression
+        self.schema = get_schema()
+        self.queue = queue.Queue()
+        self.buffers = {}  # partition -> rows
+        self.buffered_rows = 0
+        self.files_written = 0
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name='parquet-export', daemon=True)
+        self._thread.start()
+
+    def add(self, country, industry, query_id, record):
+        scrape_date = (record.get('scraped_at') or '')[:10] or time.strftime('%Y-%m-%d')
+        partition = (partition_value(country), partition_value(industry), partition_value(scrape_date))
+        self.queue.put((partition, query_id, record))
+
+    def close(self):
+        """Writes everything still buffered, blocks until done."""
+        self.queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=1)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                self._flush(list(self.buffers))
+                return
+            if item:
+                partition, query_id, record = item
+                rows = self.buffers.setdefault(partition, [])
+                rows.append(to_export_row(query_id, record))
+                self.buffered_rows += 1
+                if len(rows) >= self.batch_size:
+                    self._flush([partition])
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self._flush(list(self.buffers))
+                last_flush = time.monotonic()
+
+    def _flush(self, partitions):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        for partition in partitions:
+            rows = self.buffers.pop(partition, [])
+            self.buffered_rows -= len(rows)
+            if not rows:
+                continue
+            directory = os.path.join(self.root, *(f"{name}={value}" for name, value in zip(PARTITION_COLUMNS, partition)))
+            name = f"part-{uuid.uuid4().hex}.parquet"
+            path = os.path.join(directory, name)
+            # Dot files are skipped by dataset readers, so a partial file is never read
+            temp_path = os.path.join(directory, f".{name}.tmp")
+            try:
+                os.makedirs(directory, exist_ok=True)
+                table = pa.Table.from_pylist(rows, schema=self.schema)
+                pq.write_table(table, temp_path, compression=self.compression)
+                os.replace(temp_path, path)
+            except Exception as e:
+                self.errors += 1
+                print(f"[WARNING] Parquet export of {len(rows)} rows to {directory} failed: {e}")
+                continue
+            self.files_written += 1
+            self.rows_written += len(rows)
+            self.bytes_written += os.path.getsize(path)
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'buffered_rows': self.buffered_rows,
+            'files_written': self.files_written,
+            'rows_written': self.rows_written,
+            'bytes_written': self.bytes_written,
+            'errors': self.errors,
+        }
@@ -0,0 +1,197 @@
+import io
+import os
+import csv
+import json
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv('.env')
+
+# Connection settings, never hard-code credentials
+PG_HOST = os.getenv("PG_HOST", "localhost")
+PG_PORT = int(os.getenv("PG_PORT", 5432))
+PG_USER = os.getenv("PG_USER", "postgres")
+PG_PASSWORD = os.getenv("PG_PASSWORD")
+PG_DATABASE = os.getenv("PG_DATABASE", "usa")
+
+PG_SINK_TABLE = os.getenv("PG_SINK_TABLE", "places")
+PG_SINK_BATCH_SIZE = int(os.getenv("PG_SINK_BATCH_SIZE", 5000))
+PG_SINK_POOL_SIZE = int(os.getenv("PG_SINK_POOL_SIZE", 4))
+
+# Column name -> SQL type, in COPY order
+COLUMNS = {
+    'place_id': 'text NOT NULL',
+    'query_id': 'bigint NOT NULL',
+    'title': 'text',
+    'category': 'text',
+    'address': 'text',
+    'phone': 'text',
+    'website': 'text',
+    'email': 'text',
+    'social_links': 'jsonb',
+    'star_rating': 'numeric',
+    'review_count': 'integer',
+    'price_level': 'text',
+    'current_status': 'text',
+    'source_url': 'text',
+    'scraped_at': 'timestamptz',
+}
+KEY_COLUMNS = ('place_id', 'query_id')
+JSON_COLUMNS = ('social_links',)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_params():
+    return {
+        'host': PG_HOST,
+        'port': PG_PORT,
+        'user': PG_USER,
+        'password': PG_PASSWORD,
+        'dbname': PG_DATABASE,
+    }
+
+
+def get_pool():
+    """Process-wide connection pool, shared by every sink instance."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                from psycopg2.pool import ThreadedConnectionPool
+            except ImportError:
+                raise Exception("The Postgres sink requires psycopg2 (pip install psycopg2-binary)")
+            _pool = ThreadedConnectionPool(1, PG_SINK_POOL_SIZE, **get_connection_params())
+        return _pool
+
+
+class PostgresSink:
+    """
+    Writes result rows straight into Postgres: each batch is COPY'd into a temporary staging
+    table, then upserted into the target table with a single INSERT ... ON CONFLICT keyed on
+    (place_id, query_id). Rows are committed on flush(), the fetcher flushes each set of rows
+    before their queries' statuses are reported, so no status points at rows still uncommitted.
+
+    Not thread-safe, use one sink per writer thread (they share the connection pool).
+    """
+
+    def __init__(self, table=PG_SINK_TABLE, batch_size=PG_SINK_BATCH_SIZE):
+        self.table = table
+        self.staging_table = f"{table}_staging"
+        self.batch_size = batch_size
+        self.buffer = []
+        self.uncommitted = []
+        self.rows_written = 0
+        self._conn = None
+        self._ensure_table()
+
+    def write(self, rows):
+        self.buffer.extend(rows)
+        while len(self.buffer) >= self.batch_size:
+            batch, self.buffer = self.buffer[:self.batch_size], self.buffer[self.batch_size:]
+            self._copy_batch(batch)
+
+    def flush(self):
+        if self.buffer:
+            batch, self.buffer = self.buffer, []
+            self._copy_batch(batch)
+        self._commit()
+
+    def close(self):
+        self.flush()
+
+    def reset(self):
+        """Drop rows that were not committed, for callers that retry them as a whole."""
+        self._rollback()
+        self.buffer = []
+        self.uncommitted = []
+
+    def _ensure_table(self):
+        columns = ",\n".join(f"{name} {sql_type}" for name, sql_type in COLUMNS.items())
+        pool = get_pool()
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {self.table} (
+                        {columns},
+                        PRIMARY KEY ({", ".join(KEY_COLUMNS)})
+                    )
+                """)
+            conn.commit()
+        finally:
+            pool.putconn(conn)
+
+    def _begin(self):
+        if self._conn is None:
+            self._conn = get_pool().getconn()
+            with self._conn.cursor() as cur:
+                cur.execute(f"""
+                    CREATE TEMP TABLE IF NOT EXISTS {self.staging_table}
+                    (LIKE {self.table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+                """)
+        return self._conn
+
+    def _copy_batch(self, rows):
+        conn = self._begin()
+        names = list(COLUMNS)
+        updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in names if name not in KEY_COLUMNS)
+        try:
+            with conn.cursor() as cur:
+                cur.copy_expert(
+                    f"COPY {self.staging_table} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv)",
+                    rows_to_csv(rows, names)
+                )
+                # DISTINCT ON keeps ON CONFLICT from touching the same row twice in one statement
+                cur.execute(f"""
+                    INSERT INTO {self.table} ({', '.join(names)})
+                    SELECT DISTINCT ON ({', '.join(KEY_COLUMNS)}) {', '.join(names)}
+                    FROM {self.staging_table}
+                    ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET {updates}
+                """)
+                cur.execute(f"TRUNCATE {self.staging_table}")
+            self.uncommitted.extend(rows)
+        except Exception:
+            # Earlier batches of this transaction are lost with it, queue them again
+            self.buffer = self.uncommitted + rows + self.buffer
+            self.uncommitted = []
+            self._rollback()
+            raise
+
+    def _commit(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.commit()
+            self.rows_written += len(self.uncommitted)
+            self.uncommitted = []
+        except Exception:
+            self.buffer = self.uncommitted + self.buffer
+            self.uncommitted = []
+            raise
+        finally:
+            get_pool().putconn(self._conn)
+            self._conn = None
+
+    def _rollback(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.rollback()
+        finally:
+            get_pool().putconn(self._conn)
+            self._conn = None
+
+
+def rows_to_csv(rows, names):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            json.dumps(row.get(name)) if name in JSON_COLUMNS and row.get(name) is not None else row.get(name)
+            for name in names
+        ])
+    buffer.seek(0)
+    return buffer
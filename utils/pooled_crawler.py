@@ -0,0 +1,127 @@
+import asyncio
+from urllib.parse import urljoin
+
+from crawlee import Request
+from crawlee.crawlers import BasicCrawler, ContextPipeline, PlaywrightCrawlingContext, PlaywrightPreNavCrawlingContext
+
+# Static assets, what crawlee's block_requests blocks by default
+BLOCKED_URL_PATTERNS = ('.css', '.webp', '.jpg', '.jpeg', '.png', '.svg', '.gif', '.woff', '.pdf', '.zip')
+
+
+def page_key(context, session_isolation):
+    """Pooled pages are only shared by requests with the same proxy, and the same session when sessions are isolated."""
+    session_id = context.session.id if session_isolation and context.session else None
+    proxy_url = context.proxy_info.url if context.proxy_info else None
+    return session_id, proxy_url
+
+
+async def block_requests(page, url_patterns=None, extra_url_patterns=None):
+    """Aborts the page's requests whose url contains one of the patterns."""
+    patterns = [*(url_patterns or BLOCKED_URL_PATTERNS), *(extra_url_patterns or [])]
+
+    async def handle(route):
+        if any(pattern in route.request.url for pattern in patterns):
+            await route.abort()
+        else:
+            await route.fallback()
+
+    await page.route('**/*', handle)
+
+
+async def infinite_scroll(page, idle_rounds=4):
+    """Scrolls to the bottom until the page stops growing for `idle_rounds` scrolls in a row."""
+    height, idle = None, 0
+    while idle < idle_rounds:
+        new_height = await page.evaluate('() => document.body.scrollHeight')
+        idle = idle + 1 if new_height == height else 0
+        height = new_height
+        await page.mouse.wheel(delta_x=0, delta_y=height or 10_000)
+        await asyncio.sleep(0.25)
+
+
+async def enqueue_links(context, page, *, selector='a', label=None, user_data=None, transform_request_function=None, **kwargs):
+    """Adds the links of the page's elements matching selector with context.add_requests, like crawlee's enqueue_links."""
+    kwargs.setdefault('strategy', 'same-hostname')
+    base_url = page.url or context.request.url
+    hrefs = await page.eval_on_selector_all(selector, "elements => elements.map(element => element.getAttribute('href'))")
+    requests = []
+    for href in hrefs:
+        if not href or not href.strip():
+            continue
+        options = {'url': urljoin(base_url, href.strip()), 'user_data': {**(user_data or {})}, 'label': label}
+        if transform_request_function:
+            transformed = transform_request_function(options)
+            if transformed == 'skip':
+                continue
+            if transformed != 'unchanged':
+                options = transformed
+        try:
+            requests.append(Request.from_url(**options))
+        except ValueError as e:
+            context.log.debug(f"Skipping link {options['url']}: {e}")
+    await context.add_requests(requests, **kwargs)
+
+
+class PooledPageCrawler(BasicCrawler):
+    """
+    Crawler whose requests run in pages checked out of a PagePool (see utils/page_pool.py) instead
+    of a page opened and closed for every request, as crawlee's PlaywrightCrawler does. It is a
+    BasicCrawler with one step of its own in the context pipeline: the page is checked out by
+    `page_key` and created with the request's proxy, the session's cookies and the request's
+    headers are applied, and the request handler gets a PlaywrightCrawlingContext. The handler
+    navigates the page itself, so there is no response and no status code or blocked page check,
+    the handler classifies the pages it loads. After the handler the session's cookies are saved
+    and the page goes back to the pool, unhealthy if the handler marked it so or the session was
+    retired. The browser pool is started and closed with the crawler.
+    """
+
+    def __init__(self, page_pool, browser_pool, session_isolation=False, **kwargs):
+        self.page_pool = page_pool
+        self.session_isolation = session_isolation
+        self.pre_navigation_hooks = []
+        kwargs['_context_pipeline'] = ContextPipeline().compose(self._pooled_page)
+        kwargs['_additional_context_managers'] = [browser_pool]
+        super().__init__(**kwargs)
+
+    def pre_navigation_hook(self, hook):
+        """Registers a hook called with a PlaywrightPreNavCrawlingContext before the request handler."""
+        self.pre_navigation_hooks.append(hook)
+        return hook
+
+    async def _pooled_page(self, context):
+        entry = await self.page_pool.checkout(page_key(context, self.session_isolation), proxy_info=context.proxy_info)
+        page = entry.page
+        try:
+            fields = dict(
+                request=context.request,
+                session=context.session,
+                add_requests=context.add_requests,
+                send_request=context.send_request,
+                push_data=context.push_data,
+                use_state=context.use_state,
+                proxy_info=context.proxy_info,
+                get_key_value_store=context.get_key_value_store,
+                log=context.log,
+                page=page,
+                block_requests=lambda **kwargs: block_requests(page, **kwargs),
+            )
+            for hook in self.pre_navigation_hooks:
+                await hook(PlaywrightPreNavCrawlingContext(**fields))
+            if context.session:
+                await page.context.add_cookies(context.session.cookies.get_cookies_as_playwright_format())
+            if context.request.headers:
+                await page.set_extra_http_headers(context.request.headers.model_dump())
+            yield PlaywrightCrawlingContext(
+                **fields,
+                response=None,
+                infinite_scroll=lambda: infinite_scroll(page),
+                enqueue_links=lambda **kwargs: enqueue_links(context, page, **kwargs),
+            )
+        finally:
+            if context.session and not page.is_closed():
+                try:
+                    context.session.cookies.set_cookies_from_playwright_format(await page.context.cookies())
+                except Exception as e:
+                    context.log.warning(f"Could not save the session's cookies: {e}")
+            # A retired session's cookies must not be carried over to the next request
+            await self.page_pool.release(entry, healthy=context.session is None or context.session.is_usable)
@@ -0,0 +1,229 @@
+import re
+import sys
+import time
+import types
+import asyncio
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from utils.maps_url import get_coordinates
+
+# Keep this module free of crawlee/playwright imports, it is loaded by every worker process
+
+# Email & Social Patterns
+EMAIL_PATTERN = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+OBFUSCATED_EMAIL_PATTERN = r"([a-zA-Z0-9._%+-]+)\s*$$at$$\s*([a-zA-Z0-9.-]+)\s*$$dot$$\s*([a-zA-Z]{2,})"
+SOCIAL_DOMAINS = {
+    'twitter.com', 'x.com', 'facebook.com', 'linkedin.com',
+    'instagram.com', 'youtube.com', 'tiktok.com'
+}
+
+
+def extract_emails(text):
+    """Extract both standard and obfuscated emails"""
+    matches = set(re.findall(EMAIL_PATTERN, text))
+    obfuscated_matches = [f"{m[0]}@{m[1]}.{m[2]}" for m in re.findall(OBFUSCATED_EMAIL_PATTERN, text)]
+    return list(matches.union(obfuscated_matches))
+
+
+def normalize_phone(phone):
+    phone = re.sub(r"[^\d+]", "", phone)
+    if not phone.startswith('+'):
+        phone = f"+1{phone}"
+    return phone
+
+
+def parse_text_duration(duration_text):
+    """
+    Parses a duration string like "2 days ago", "3 weeks ago", etc., into a duration in seconds.
+    """
+    match = re.match(r"(\d+)\s*(second|minute|hour|day|week|month|year)s?\s*ago", duration_text.lower())
+    if not match:
+        return 0
+    value, unit = int(match.group(1)), match.group(2)
+    multiplier = {
+        "second": 1,
+        "minute": 60,
+        "hour": 3600,
+        "day": 86400,
+        "week": 604800,
+        "month": 2592000,  # Approximate, assumes 30 days per month
+        "year": 31536000,  # Approximate, assumes 365 days per year
+    }
+    return value * multiplier.get(unit, 0)
+
+
+def validate_result(result):
+    if not result['title'] and not result['address'] and not result['website']:
+        return False
+    return True
+
+
+def finalize_record(result):
+    """
+    Turns the raw fields collected from the page into the final record:
+    `phone_text` and `body_text` are raw inputs and are dropped from the result.
+    """
+    phone_text = result.pop('phone_text', None)
+    body_text = result.pop('body_text', None)
+    if phone_text:
+        result['phone'] = normalize_phone(phone_text)
+    if not result.get('email') and body_text:
+        emails = extract_emails(body_text)
+        if emails:
+            result['email'] = emails[0]
+    result['social_links'] = [
+        link for link in result.get('social_links', [])
+        if any(domain in link for domain in SOCIAL_DOMAINS)
+    ]
+    result['coordinates'] = get_coordinates(result['source_url'])
+    return result, validate_result(result)
+
+
+def parse_review_dates(reviews):
+    now = datetime.now()
+    for review in reviews:
+        if review.get("date"):
+            seconds_ago = parse_text_duration(review["date"])
+            review["date"] = (now - timedelta(seconds=seconds_ago)).isoformat()
+    return reviews
+
+
+STAGES = {
+    'record': finalize_record,
+    'reviews': parse_review_dates,
+}
+
+
+def run_batch(stage, items):
+    """Runs in a worker process. Errors are returned per item so one bad page doesn't fail the batch."""
+    outputs = []
+    for item in items:
+        try:
+            outputs.append((True, STAGES[stage](item)))
+        except Exception as e:
+            outputs.append((False, f"{type(e).__name__}: {e}"))
+    return outputs
+
+
+@contextmanager
+def main_module_hidden():
+    """
+    Spawned workers re-import the parent's __main__ (fetcher.py or crawler.py, with crawlee,
+    Playwright and all their module-level setup) before running anything. While workers are
+    started __main__ is swapped for an empty module, so they only import this module.
+    """
+    main_module = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main_module
+
+
+class PostProcessor:
+    """
+    Runs the CPU-bound post-processing stages in a process pool, so regexes and parsing
+    don't add lag to the event loop that drives every tab. Items go through a bounded
+    queue and are sent to the pool in batches. With `workers=0` stages run inline.
+    """
+
+    def __init__(self, workers=2, queue_size=200, batch_size=16, batch_wait=0.05):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue_size = queue_size
+        self.queue = None
+        self.executor = None
+        self.max_queue_depth = 0
+        self.stage_stats = {stage: {'items': 0, 'batches': 0, 'errors': 0, 'busy_seconds': 0.0} for stage in STAGES}
+        self._worker_task = None
+
+    async def process(self, stage, item):
+        if not self.workers:
+            return STAGES[stage](item)
+        if self._worker_task is None:
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        # Blocks the caller when the pool falls behind instead of piling up pages in memory
+        await self.queue.put((stage, item, future))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        ok, value = await future
+        if not ok:
+            raise Exception(f"Post-processing stage {stage} failed: {value}")
+        return value
+
+    def _start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        # spawn: forking a process that runs Playwright's event loop and threads is not safe
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        # Workers are spawned on submit while none is idle, so one empty batch per worker starts them all
+        with main_module_hidden():
+            for _ in range(self.workers):
+                self.executor.submit(run_batch, 'record', [])
+        self._worker_task = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        in_flight = set()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # One pool call per stage present in the batch
+            for stage in {entry[0] for entry in batch}:
+                entries = [entry for entry in batch if entry[0] == stage]
+                task = asyncio.create_task(self._run(loop, stage, entries))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+    async def _run(self, loop, stage, entries):
+        started = time.perf_counter()
+        try:
+            outputs = await loop.run_in_executor(self.executor, run_batch, stage, [entry[1] for entry in entries])
+        except Exception as e:
+            outputs = [(False, f"{type(e).__name__}: {e}")] * len(entries)
+        stats = self.stage_stats[stage]
+        stats['items'] += len(entries)
+        stats['batches'] += 1
+        stats['busy_seconds'] += time.perf_counter() - started
+        for (_, _, future), output in zip(entries, outputs):
+            if not output[0]:
+                stats['errors'] += 1
+            if not future.done():
+                future.set_result(output)
+
+    def close(self):
+        if self._worker_task:
+            self._worker_task.cancel()
+            self._worker_task = None
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def stats(self):
+        stages = {}
+        for stage, stats in self.stage_stats.items():
+            stages[stage] = {
+                **stats,
+                'busy_seconds': round(stats['busy_seconds'], 2),
+                'items_per_second': round(stats['items'] / stats['busy_seconds'], 1) if stats['busy_seconds'] else None,
+            }
+        return {
+            'workers': self.workers,
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'stages': stages,
+        }
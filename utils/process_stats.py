@@ -0,0 +1,84 @@
+import os
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def get_rss_bytes(pid=None):
+    """Resident set size of a single process, read from /proc."""
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        pass
+    # /proc is not available (macOS, Windows): fall back to the peak RSS of this process
+    if resource and pid == os.getpid() and not os.path.isdir('/proc'):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return 0
+
+
+def get_child_pids(pid=None):
+    """All descendants of a process, e.g. the Chromium browser and renderer processes."""
+    pid = pid or os.getpid()
+    parents = {}
+    try:
+        entries = os.listdir('/proc')
+    except FileNotFoundError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                stat = f.read()
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+        # The command name may contain spaces, the ppid is the 2nd field after it
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        parents.setdefault(ppid, []).append(int(entry))
+
+    children = []
+    stack = [pid]
+    while stack:
+        for child in parents.get(stack.pop(), []):
+            children.append(child)
+            stack.append(child)
+    return children
+
+
+def get_process_tree_rss(pid=None):
+    """RSS of a process and all of its descendants, in bytes."""
+    pid = pid or os.getpid()
+    return get_rss_bytes(pid) + sum(get_rss_bytes(child) for child in get_child_pids(pid))
+
+
+def get_cmdline(pid):
+    try:
+        with open(f"/proc/{pid}/cmdline", 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode('utf-8', 'replace')
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        return ''
+
+
+def get_browser_memory(pid=None):
+    """RSS of the Chromium processes started below this process, with renderers split out."""
+    browser_rss = renderer_rss = renderer_count = 0
+    for child in get_child_pids(pid):
+        cmdline = get_cmdline(child)
+        if 'chrom' not in cmdline and 'headless_shell' not in cmdline:
+            continue
+        rss = get_rss_bytes(child)
+        browser_rss += rss
+        if '--type=renderer' in cmdline:
+            renderer_rss += rss
+            renderer_count += 1
+    return {
+        'browser_rss_bytes': browser_rss,
+        'renderer_rss_bytes': renderer_rss,
+        'renderer_count': renderer_count,
+    }
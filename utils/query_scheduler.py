@@ -0,0 +1,122 @@
+import json
+import math
+import shutil
+import tempfile
+
+DIMENSIONS = ('industry', 'cell', 'zoom')
+
+
+class YieldScheduler:
+    """
+    Orders a batch of queries by expected valid results per second of tab time, learned per
+    industry, region cell and zoom level. Queries are interleaved per (industry, cell, zoom)
+    class by weighted round robin, every class gets at least `min_share` of the slots so the
+    estimate for a class that looks poor keeps being refreshed. The statistics persist across
+    batches. This is ordering only, not a budget: the whole batch is crawled whatever the yield,
+    `min_share` decides how early a poor class comes in, not how much of it is crawled.
+    """
+
+    def __init__(self, path=None, cell_degrees=0.5, min_share=0.05, prior_results=1, prior_seconds=30):
+        self.path = path
+        self.cell_degrees = cell_degrees
+        self.min_share = min_share
+        # Prior of an unseen class, one result per 30s, so new classes are neither starved nor favored
+        self.prior_results = prior_results
+        self.prior_seconds = prior_seconds
+        self.totals = {dimension: {} for dimension in DIMENSIONS}  # dimension -> key -> [queries, results, seconds]
+        if path:
+            self.load()
+
+    def class_keys(self, metadata):
+        metadata = metadata or {}
+        latitude, longitude = metadata.get('latitude'), metadata.get('longitude')
+        cell = None
+        if latitude is not None and longitude is not None:
+            cell = f"{math.floor(float(latitude) / self.cell_degrees)}:{math.floor(float(longitude) / self.cell_degrees)}"
+        return {
+            'industry': str(metadata.get('industry')),
+            'cell': str(cell),
+            'zoom': str(metadata.get('zoom_level')),
+        }
+
+    def record(self, metadata, results, seconds):
+        for dimension, key in self.class_keys(metadata).items():
+            totals = self.totals[dimension].setdefault(key, [0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += results
+            totals[2] += seconds
+
+    def rate(self, dimension, key):
+        _, results, seconds = self.totals[dimension].get(key, (0, 0, 0.0))
+        return (results + self.prior_results) / (seconds + self.prior_seconds)
+
+    def score(self, metadata):
+        """Expected valid results per second of a query, the geometric mean over its classes."""
+        rates = [self.rate(dimension, key) for dimension, key in self.class_keys(metadata).items()]
+        return math.prod(rates) ** (1 / len(rates))
+
+    def order(self, queries):
+        """Queries (dicts with `metadata`) in crawl order."""
+        by_class = {}
+        for query in queries:
+            query_score = self.score(query.get('metadata'))
+            class_key = tuple(self.class_keys(query.get('metadata')).values())
+            by_class.setdefault(class_key, []).append((query_score, query))
+        if not by_class:
+            return []
+        for entries in by_class.values():
+            entries.sort(key=lambda entry: entry[0], reverse=True)
+
+        # Weight of a class is its share of the total expected yield, floored at min_share
+        expected = {class_key: sum(score for score, _ in entries) for class_key, entries in by_class.items()}
+        total = sum(expected.values())
+        weights = {class_key: max(self.min_share, value / total) for class_key, value in expected.items()}
+
+        # Smooth weighted round robin
+        ordered = []
+        current = {class_key: 0.0 for class_key in by_class}
+        positions = {class_key: 0 for class_key in by_class}
+        while len(ordered) < len(queries):
+            active = [class_key for class_key in by_class if positions[class_key] < len(by_class[class_key])]
+            active_weight = sum(weights[class_key] for class_key in active)
+            for class_key in active:
+                current[class_key] += weights[class_key]
+            chosen = max(active, key=lambda class_key: current[class_key])
+            current[chosen] -= active_weight
+            ordered.append(by_class[chosen][positions[chosen]][1])
+            positions[chosen] += 1
+        return ordered
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            print(f"Invalid JSON in {self.path}, starting with empty yield statistics")
+            return
+        for dimension in DIMENSIONS:
+            self.totals[dimension].update(saved.get(dimension, {}))
+
+    def save(self):
+        if not self.path:
+            return
+        with tempfile.NamedTemporaryFile(mode='w', delete=False) as f:
+            json.dump(self.totals, f)
+            temp_path = f.name
+        shutil.move(temp_path, self.path)
+
+    def stats(self, top=10):
+        stats = {}
+        for dimension, totals in self.totals.items():
+            ranked = sorted(totals, key=lambda key: self.rate(dimension, key), reverse=True)
+            stats[dimension] = {
+                key: {
+                    'queries': totals[key][0],
+                    'results': totals[key][1],
+                    'results_per_minute': round(self.rate(dimension, key) * 60, 2),
+                }
+                for key in ranked[:top]
+            }
+        return stats
@@ -0,0 +1,131 @@
+import asyncio
+
+import requests
+
+from utils.enums import Status
+
+
+class StreamingReporter:
+    """
+    Reports each query's status and results to the task spreader as soon as it completes,
+    in small batched requests, and extends the lease of queries still in flight with
+    periodic IN_PROGRESS heartbeats.
+    """
+
+    def __init__(self, api_url, country, machine_id, batch_size=20, flush_interval=5, heartbeat_interval=60,
+                 on_reported=None, sink=None):
+        self.api_url = api_url
+        self.country = country
+        self.machine_id = machine_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.on_reported = on_reported  # Called with the ids the spreader acknowledged
+        self.sink = sink  # Optional callable that stores the rows itself, only statuses are posted then
+        self.in_flight = set()
+        self.pending_statuses = []
+        self.pending_rows = []
+        self._flush_event = asyncio.Event()
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._flush_loop()),
+            asyncio.create_task(self._heartbeat_loop()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Final flush, whatever is left must reach the spreader before the batch is closed
+        for i in range(3):  # Retry up to 3 times
+            if await self.flush():
+                return
+            await asyncio.sleep(10 * (i + 1))
+        raise Exception("Failed to report results to database after multiple attempts.")
+
+    def track(self, query_id):
+        self.in_flight.add(query_id)
+
+    def report(self, query_id, status, rows, skipped=None):
+        self.in_flight.discard(query_id)
+        entry = {"id": query_id, "status": status}
+        if skipped:
+            entry['skipped'] = skipped  # Reason and place key of a query that was not crawled
+        self.pending_statuses.append(entry)
+        self.pending_rows.extend(rows)
+        if len(self.pending_statuses) >= self.batch_size:
+            self._flush_event.set()
+
+    async def flush(self):
+        if not self.pending_statuses:
+            return True
+        statuses, rows = self.pending_statuses, self.pending_rows
+        self.pending_statuses, self.pending_rows = [], []
+        payload = {
+            "country": self.country,
+            "machine_id": self.machine_id,
+            "queries": [] if self.sink else rows,
+            "statuses": statuses,
+        }
+        reported = False
+        try:
+            if self.sink and rows:
+                # Rows must be stored before their queries are acknowledged
+                await asyncio.to_thread(self.sink, rows)
+            reported = await self._post(f"{self.api_url}/queries/results", payload, timeout=60)
+        except Exception as e:
+            print(f"Failed to store results: {e}")
+        finally:
+            if not reported:
+                # Keep them for the next flush, also when cancelled half-way through a post
+                self.pending_statuses = statuses + self.pending_statuses
+                self.pending_rows = rows + self.pending_rows
+        if reported:
+            print(f"Reported {len(statuses)} queries ({len(rows)} results)")
+            if self.on_reported:
+                self.on_reported([status['id'] for status in statuses])
+        return reported
+
+    async def heartbeat(self):
+        if not self.in_flight:
+            return
+        payload = {
+            "country": self.country,
+            "machine_id": self.machine_id,
+            "queries": [{"id": query_id, "status": Status.IN_PROGRESS.value} for query_id in self.in_flight],
+        }
+        await self._post(f"{self.api_url}/queries/heartbeat", payload, timeout=30)
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.heartbeat()
+
+    async def _post(self, url, payload, timeout):
+        try:
+            response = await asyncio.to_thread(
+                requests.post,
+                url,
+                json=payload,
+                headers={'Content-Type': 'application/json'},
+                timeout=timeout
+            )
+            if response.status_code != 200:
+                print(f"Failed to post to {url}: {response.status_code}, {response.text}")
+                return False
+            return True
+        except requests.RequestException as e:
+            print(f"Failed to post to {url}: {e}")
+            return False
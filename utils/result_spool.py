@@ -0,0 +1,58 @@
+import os
+import json
+
+
+class ResultSpool:
+    """
+    Append-only JSONL segment holding scraped records until they are pushed, so a batch's
+    results don't have to stay in memory. Each line is {"query_id": ..., "result": {...}}.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def append(self, query_id, results):
+        """Write the results of a query, returns the offset of its first line."""
+        if self._file is None:
+            self._file = open(self.path, 'a+b')
+            # Terminate a line torn by a crash so it doesn't swallow the next entry
+            if self._file.tell() > 0:
+                self._file.seek(-1, os.SEEK_END)
+                if self._file.read(1) != b'\n':
+                    self._file.write(b'\n')
+        offset = self._file.tell()
+        for result in results:
+            line = json.dumps({"query_id": query_id, "result": result}, separators=(',', ':'))
+            self._file.write(line.encode('utf-8') + b'\n')
+        self._file.flush()
+        return offset
+
+    def __iter__(self):
+        """Yields (offset, query_id, result) in write order."""
+        if self._file is not None:
+            self._file.flush()
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            offset = 0
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line after a crash
+                    print(f"Skipping corrupted entry in {self.path} at offset {offset}")
+                else:
+                    yield offset, entry['query_id'], entry['result']
+                offset += len(line)
+
+    def clear(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
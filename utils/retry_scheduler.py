@@ -0,0 +1,86 @@
+import time
+import heapq
+import random
+from collections import Counter
+
+from utils.enums import FailureReason
+
+
+class RetryScheduler:
+    """
+    Delayed retries for failed queries. Each failure reason has its own attempt budget and
+    the delay grows exponentially with the attempts made so far, so a throttled host gets
+    time to recover instead of being hit again right away. Retries that are not due by the end
+    of a batch are carried into a later one, so waiting for them never holds up the next lease.
+    """
+
+    def __init__(self, budgets, base_delay=30, max_delay=900):
+        self.budgets = budgets  # FailureReason -> max retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempts = {}  # url -> Counter of FailureReason
+        self.due = []  # heap of (due_at, url)
+        self.scheduled = Counter()
+        self.exhausted = Counter()
+
+    def schedule(self, url, reason):
+        """Schedule a retry, returns False once the budget for this reason is used up."""
+        attempts = self.attempts.setdefault(url, Counter())
+        if attempts[reason] >= self.budgets.get(reason, 0):
+            self.exhausted[reason.value] += 1
+            return False
+        attempts[reason] += 1
+        retries = sum(attempts.values())
+        delay = min(self.max_delay, self.base_delay * 2 ** (retries - 1)) * random.uniform(0.8, 1.2)
+        heapq.heappush(self.due, (time.monotonic() + delay, url))
+        self.scheduled[reason.value] += 1
+        print(f"Retrying {url} in {delay:.0f}s ({reason.value}, attempt {retries})")
+        return True
+
+    def has_pending(self):
+        return bool(self.due)
+
+    def next_due_in(self):
+        if not self.due:
+            return None
+        return max(0, self.due[0][0] - time.monotonic())
+
+    def pop_due(self):
+        """Urls whose retry is due, with their retry number."""
+        now = time.monotonic()
+        ready = []
+        while self.due and self.due[0][0] <= now:
+            _, url = heapq.heappop(self.due)
+            ready.append((url, sum(self.attempts[url].values())))
+        return ready
+
+    def pending_urls(self):
+        return {url for _, url in self.due}
+
+    def discard(self, urls):
+        """Drops the pending retries of urls, e.g. when they were leased again as new queries."""
+        urls = set(urls)
+        self.due = [(due_at, url) for due_at, url in self.due if url not in urls]
+        heapq.heapify(self.due)
+        for url in urls:
+            self.attempts.pop(url, None)
+
+    def prune(self):
+        """Forgets the attempts of urls with no retry pending, their queries reached a final status."""
+        pending = self.pending_urls()
+        self.attempts = {url: attempts for url, attempts in self.attempts.items() if url in pending}
+
+    def stats(self):
+        return {
+            'pending': len(self.due),
+            'scheduled': dict(self.scheduled),
+            'exhausted': dict(self.exhausted),
+            'budgets': {reason.value: budget for reason, budget in self.budgets.items()},
+        }
+
+
+def classify_exception(exc):
+    name = type(exc).__name__
+    if isinstance(exc, TimeoutError) or 'Timeout' in name or 'timeout' in str(exc).lower():
+        return FailureReason.TIMEOUT
+    return FailureReason.PARSE
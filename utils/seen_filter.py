@@ -0,0 +1,197 @@
+import os
+import glob
+import json
+import math
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+
+class BloomFilter:
+    """Plain Bloom filter over string keys, ~1.2 bytes per key at a 1% false positive rate."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def compatible(self, other):
+        return self.num_bits == other.num_bits and self.num_hashes == other.num_hashes
+
+    def copy(self):
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        bloom.bits = bytearray(self.bits)
+        return bloom
+
+    def merge(self, other):
+        merged = int.from_bytes(self.bits, 'little') | int.from_bytes(other.bits, 'little')
+        self.bits = bytearray(merged.to_bytes(len(self.bits), 'little'))
+
+    def estimated_count(self):
+        set_bits = int.from_bytes(self.bits, 'little').bit_count()
+        if set_bits >= self.num_bits:
+            return self.capacity
+        return round(-self.num_bits / self.num_hashes * math.log(1 - set_bits / self.num_bits))
+
+    def write(self, f):
+        header = {'capacity': self.capacity, 'error_rate': self.error_rate,
+                  'num_bits': self.num_bits, 'num_hashes': self.num_hashes}
+        f.write(json.dumps(header).encode('utf-8') + b'\n')
+        f.write(self.bits)
+
+    @classmethod
+    def read(cls, f):
+        header = json.loads(f.readline())
+        bloom = cls(header['capacity'], header['error_rate'])
+        bits = f.read()
+        if (bloom.num_bits, bloom.num_hashes) != (header['num_bits'], header['num_hashes']) or len(bits) != len(bloom.bits):
+            raise ValueError("Snapshot doesn't match its header")
+        bloom.bits = bytearray(bits)
+        return bloom
+
+
+class SeenPlaceFilter:
+    """
+    Fleet-wide "seen recently" filter over place ids. Time is cut into windows with one Bloom
+    filter each, a place counts as seen while it is in the current or the previous window.
+    Every node persists its filters as `<node>-<window>.bloom` snapshots. Snapshots of other
+    nodes found in `shared_dir` are merged in, merging is a bitwise OR so it is idempotent.
+    Snapshots of expired windows are deleted from both directories, whichever node wrote them.
+    `sync` reads and writes multi-MB snapshots, run it in a thread, `add` and `seen` can be
+    called meanwhile.
+    """
+
+    def __init__(self, directory, node_id, capacity=10_000_000, error_rate=0.01, window_hours=24, shared_dir=None):
+        self.directory = directory
+        self.node_id = node_id
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.window_seconds = window_hours * 3600
+        self.shared_dir = shared_dir
+        self.filters = {}  # window -> BloomFilter
+        self.merged_snapshots = 0
+        self.lock = threading.Lock()  # Guards filters, sync runs in a thread
+        os.makedirs(directory, exist_ok=True)
+        self._load(directory, own_only=True)
+
+    def current_window(self):
+        return int(time.time() // self.window_seconds)
+
+    def live_windows(self):
+        window = self.current_window()
+        return (window - 1, window)
+
+    def add(self, key):
+        window = self.current_window()
+        with self.lock:
+            if window not in self.filters:
+                self.filters[window] = BloomFilter(self.capacity, self.error_rate)
+                self._expire()
+            self.filters[window].add(key)
+
+    def seen(self, key):
+        with self.lock:
+            return any(key in self.filters[window] for window in self.live_windows() if window in self.filters)
+
+    def sync(self):
+        """Merges the other nodes' snapshots from the shared directory, then persists and publishes this node's."""
+        with self.lock:
+            self._expire()
+        self._remove_expired(self.directory)
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+            self._remove_expired(self.shared_dir)
+            self._load(self.shared_dir, own_only=False)
+        windows = self.save()
+        if self.shared_dir:
+            for window in windows:
+                # Copied under a temporary name first, other nodes never read a half-written snapshot
+                temp_path = self._path(self.shared_dir, window) + '.tmp'
+                shutil.copy(self._path(self.directory, window), temp_path)
+                os.replace(temp_path, self._path(self.shared_dir, window))
+
+    def save(self):
+        """Persists this node's filters, returns their windows."""
+        with self.lock:
+            # Copies, so adds go on while the snapshots are written
+            filters = {window: bloom.copy() for window, bloom in self.filters.items()}
+        for window, bloom in filters.items():
+            with tempfile.NamedTemporaryFile(mode='wb', delete=False, dir=self.directory) as f:
+                bloom.write(f)
+                temp_path = f.name
+            shutil.move(temp_path, self._path(self.directory, window))
+        return list(filters)
+
+    def _path(self, directory, window):
+        return os.path.join(directory, f"{self.node_id}-{window}.bloom")
+
+    def _load(self, directory, own_only):
+        live = self.live_windows()
+        for path in glob.glob(os.path.join(directory, '*.bloom')):
+            node_id, _, window = os.path.basename(path)[:-len('.bloom')].rpartition('-')
+            if not window.isdigit() or int(window) not in live or (node_id == self.node_id) != own_only:
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    snapshot = BloomFilter.read(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Skipping seen filter snapshot {path}: {e}")
+                continue
+            with self.lock:
+                bloom = self.filters.get(int(window))
+                if bloom is None:
+                    self.filters[int(window)] = snapshot
+                elif bloom.compatible(snapshot):
+                    bloom.merge(snapshot)
+                else:
+                    print(f"[WARNING] Skipping seen filter snapshot {path}: different capacity or error rate")
+                    continue
+            if not own_only:
+                self.merged_snapshots += 1
+
+    def _remove_expired(self, directory):
+        """Deletes the snapshots of windows before the live ones, of every node."""
+        oldest = self.live_windows()[0]
+        for path in glob.glob(os.path.join(directory, '*.bloom')):
+            window = os.path.basename(path)[:-len('.bloom')].rpartition('-')[2]
+            if window.isdigit() and int(window) < oldest:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # Removed by another node
+
+    def _expire(self):
+        live = self.live_windows()
+        for window in [window for window in self.filters if window not in live]:
+            del self.filters[window]
+            try:
+                os.remove(self._path(self.directory, window))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self.lock:
+            filters = dict(self.filters)
+        return {
+            'windows': {
+                str(window): {'estimated_places': bloom.estimated_count(), 'bytes': len(bloom.bits)}
+                for window, bloom in filters.items()
+            },
+            'merged_snapshots': self.merged_snapshots,
+        }
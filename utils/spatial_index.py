@@ -0,0 +1,143 @@
+import re
+import math
+import time
+import sqlite3
+from difflib import SequenceMatcher
+
+METERS_PER_DEGREE = 111_320
+
+
+def normalize_title(title):
+    return ' '.join(re.sub(r"[^\w\s]", ' ', (title or '').lower()).split())
+
+
+def normalize_phone_digits(phone):
+    # Last 10 digits, so "+1 555..." and "(555) ..." compare equal
+    return re.sub(r"\D", '', phone or '')[-10:]
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    # Equirectangular approximation, exact enough at the tens of meters that matter here
+    x = math.radians(lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return math.hypot(x, y) * 6_371_000
+
+
+class SpatialIndex:
+    """
+    Persistent grid index over scraped places to find the same business scraped under a
+    different URL. Cells are `radius_m` wide (longitude steps widen towards the poles), so all
+    candidates within the radius are in the 3x3 block around a point, which is a single
+    indexed SQLite query. Two places are the same if they are within the radius and share the
+    phone number or have near-identical titles.
+    """
+
+    def __init__(self, path, radius_m=50, title_similarity=0.85, commit_every=1000):
+        self.path = path
+        self.radius_m = radius_m
+        self.title_similarity = title_similarity
+        self.commit_every = commit_every
+        self.lat_step = radius_m / METERS_PER_DEGREE
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+        self.added = 0
+        self.merged = 0
+        self._uncommitted = 0
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS places ("
+                "place_key TEXT PRIMARY KEY, cell INTEGER NOT NULL, "
+                "lat REAL NOT NULL, lng REAL NOT NULL, title TEXT, phone TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS places_cell ON places (cell)")
+        return self._conn
+
+    def _lng_step(self, row):
+        # Width at the cell row's poleward edge, so a cell is never narrower than the radius
+        edge = max(abs(row * self.lat_step - 90), abs((row + 1) * self.lat_step - 90))
+        return self.lat_step / max(math.cos(math.radians(min(edge, 89.9))), 1e-3)
+
+    def _cell(self, row, lng):
+        col = math.floor((lng + 180) / self._lng_step(row))
+        return (row << 32) + col
+
+    def cell_of(self, lat, lng):
+        return self._cell(math.floor((lat + 90) / self.lat_step), lng)
+
+    def neighbor_cells(self, lat, lng):
+        row = math.floor((lat + 90) / self.lat_step)
+        cells = []
+        for r in (row - 1, row, row + 1):
+            center = self._cell(r, lng)
+            cells.extend((center - 1, center, center + 1))
+        return cells
+
+    def find_duplicate(self, lat, lng, title, phone):
+        """Key of an indexed place that is the same business, or None."""
+        started = time.perf_counter()
+        title, phone = normalize_title(title), normalize_phone_digits(phone)
+        cells = self.neighbor_cells(lat, lng)
+        candidates = self.conn.execute(
+            f"SELECT place_key, lat, lng, title, phone FROM places WHERE cell IN ({','.join('?' * len(cells))})",
+            cells
+        ).fetchall()
+        match = None
+        for place_key, other_lat, other_lng, other_title, other_phone in candidates:
+            if distance_m(lat, lng, other_lat, other_lng) > self.radius_m:
+                continue
+            if phone and phone == other_phone:
+                match = place_key
+                break
+            if title and other_title and SequenceMatcher(None, title, other_title).ratio() >= self.title_similarity:
+                match = place_key
+                break
+        self.lookups += 1
+        self.lookup_seconds += time.perf_counter() - started
+        return match
+
+    def add(self, place_key, lat, lng, title, phone):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO places (place_key, cell, lat, lng, title, phone) VALUES (?, ?, ?, ?, ?, ?)",
+            (place_key, self.cell_of(lat, lng), lat, lng, normalize_title(title), normalize_phone_digits(phone))
+        )
+        self.added += 1
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.flush()
+
+    def resolve(self, place_key, lat, lng, title, phone):
+        """Canonical key of a place: its own if new or already indexed, else the key of its duplicate."""
+        if self.conn.execute("SELECT 1 FROM places WHERE place_key = ?", (place_key,)).fetchone():
+            return place_key
+        duplicate = self.find_duplicate(lat, lng, title, phone)
+        if duplicate:
+            self.merged += 1
+            return duplicate
+        self.add(place_key, lat, lng, title, phone)
+        return place_key
+
+    def flush(self):
+        if self._conn is not None:
+            self._conn.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def stats(self):
+        return {
+            'lookups': self.lookups,
+            'avg_lookup_us': round(self.lookup_seconds / self.lookups * 1e6, 1) if self.lookups else None,
+            'added': self.added,
+            'merged': self.merged,
+        }
@@ -0,0 +1,38 @@
+import json
+import asyncio
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+# name -> callable returning a JSON-serializable dict
+_providers = {}
+
+
+def register_stats(name, provider):
+    _providers[name] = provider
+
+
+def collect_stats():
+    stats = {'collected_at': datetime.now(timezone.utc).isoformat()}
+    for name, provider in _providers.items():
+        try:
+            stats[name] = provider()
+        except Exception as e:
+            stats[name] = {'error': str(e)}
+    return stats
+
+
+def write_stats(path):
+    with tempfile.NamedTemporaryFile(mode='w', delete=False) as f:
+        json.dump(collect_stats(), f, indent=4)
+        temp_path = f.name
+    shutil.move(temp_path, path)
+
+
+async def export_stats_periodically(path, interval):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            write_stats(path)
+        except Exception as e:
+            print(f"[WARNING] Could not export stats to {path}: {e}")
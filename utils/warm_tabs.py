@@ -0,0 +1,82 @@
+import time
+from collections import Counter, deque
+
+from utils.page_pool import PagePool, percentile
+from utils.maps_url import decode
+
+# Pushes the place URL onto the app's history and replays it as a back/forward navigation,
+# Maps routes popstate events like its own links, without reloading the app
+IN_APP_NAVIGATE_JS = """
+([url, featureId]) => {
+    const panel = document.querySelector("div[role='main']");
+    window.__warmTabPanel = panel;
+    window.__warmTabText = panel?.innerText || null;
+    window.__warmTabHadTarget = !!panel && panel.innerHTML.includes(featureId);
+    history.pushState(history.state, '', url);
+    window.dispatchEvent(new PopStateEvent('popstate', {state: history.state}));
+}
+"""
+# The rendered place panel is the target's: its links carry the target's feature id. Places with the
+# same name (chain branches) can reuse the panel and its title, so the title is not compared. If the
+# previous panel already mentioned the target (e.g. under "People also search for"), it must have changed too
+PANEL_SWAPPED_JS = """
+featureId => {
+    const panel = document.querySelector("div[role='main']");
+    if (!panel || !panel.querySelector("h1") || !panel.innerHTML.includes(featureId)) return false;
+    return !window.__warmTabHadTarget || panel !== window.__warmTabPanel || panel.innerText !== window.__warmTabText;
+}
+"""
+
+
+async def navigate_in_app(page, url, timeout):
+    """Opens url inside the running app, False if the place panel didn't swap in time or url has no feature id."""
+    feature_id = decode(url).feature_id
+    if not feature_id:
+        return False
+    try:
+        await page.evaluate(IN_APP_NAVIGATE_JS, [url, feature_id])
+        await page.wait_for_function(PANEL_SWAPPED_JS, arg=feature_id, timeout=timeout, polling=100)
+        return True
+    except Exception:
+        return False
+
+
+class WarmTabPool(PagePool):
+    """
+    Page pool whose tabs keep the Maps single-page app loaded between places. A fresh tab loads
+    its first place with a full navigation, later places are opened with in-app navigation and
+    only wait for the place panel to swap. Tabs are not reset between places, instead they are
+    closed after `max_uses` places, and after any place that left them in an unknown state, so
+    a tab never drifts too far from a fresh load.
+    """
+
+    def __init__(self, create, setup=None, usable=None, max_uses=50, max_idle=4):
+        super().__init__(create, setup=setup, usable=usable, max_uses=max_uses, max_idle=max_idle)
+        self.navigations = Counter()  # in_app, in_app_failed, full
+        self.in_app_ms = deque(maxlen=500)
+
+    async def open(self, entry, url, timeout, full_navigation):
+        """
+        Opens url in the tab, in-app if the tab is warm. `full_navigation()` does a regular
+        page load instead and returns a failure or None. Returns that failure or None.
+        """
+        if entry.warm:
+            started = time.perf_counter()
+            if await navigate_in_app(entry.page, url, timeout):
+                self.in_app_ms.append((time.perf_counter() - started) * 1000)
+                self.navigations['in_app'] += 1
+                return None
+            self.navigations['in_app_failed'] += 1
+        self.navigations['full'] += 1
+        failure = await full_navigation()
+        entry.warm = failure is None
+        return failure
+
+    def stats(self):
+        in_app_p50, in_app_p95 = percentile(self.in_app_ms, 50), percentile(self.in_app_ms, 95)
+        return {
+            **super().stats(),
+            'navigations': dict(self.navigations),
+            'in_app_p50_ms': round(in_app_p50) if in_app_p50 is not None else None,
+            'in_app_p95_ms': round(in_app_p95) if in_app_p95 is not None else None,
+        }